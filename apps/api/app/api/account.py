@@ -3,29 +3,31 @@ Account API endpoints for TutorWise
 Handles user account settings and professional info (templates)
 """
 import logging
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Header, Depends
+import time
+from typing import TYPE_CHECKING, Annotated, Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Header, Depends, Response
+import jwt
 from pydantic import BaseModel
-import os
-from supabase import create_client, Client
 
-logger = logging.getLogger(__name__)
-
-router = APIRouter(prefix="/api/account", tags=["account"])
+from app.cache import MISSING, claims_ttl, hash_token, professional_info_etag_cache, supabase_token_cache
+from app.circuit_breaker import CircuitOpenError
+from app.db import get_supabase
+from app.etag import compute_etag, etag_matches, not_modified, set_validator
+from app.serialization import FastJSONRoute
+from app.singleflight import professional_info_flight
+from app.token_verifier import (
+    SigningKeyUnavailable,
+    TokenVerificationError,
+    get_token_verifier,
+    remote_fallback_enabled,
+)
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
 
-# Supabase client setup
-def get_supabase() -> Client:
-    """Get Supabase client"""
-    supabase_url = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-
-    if not supabase_url or not supabase_key:
-        raise HTTPException(
-            status_code=500,
-            detail="Supabase configuration missing"
-        )
+logger = logging.getLogger(__name__)
 
-    return create_client(supabase_url, supabase_key)
+router = APIRouter(prefix="/api/account", tags=["account"], route_class=FastJSONRoute)
 
 # Request/Response Models
 class ProfessionalInfoResponse(BaseModel):
@@ -52,57 +54,133 @@ class UpdateProfessionalInfoRequest(BaseModel):
     availability: Optional[Dict[str, Any]] = None
     specializations: Optional[list[str]] = None
 
+class UpdateProfessionalInfoResponse(BaseModel):
+    success: bool
+    message: str
+    data: ProfessionalInfoResponse
+
 # Helper function to verify JWT token
 async def verify_token(authorization: Optional[str] = Header(None)) -> str:
-    """Verify JWT token and return user ID"""
+    """
+    Verify a Supabase JWT and return the user ID.
+
+    Tokens are verified locally against the cached project secret or JWKS.
+    The network call to supabase.auth.get_user is only made when no local
+    signing key is available and SUPABASE_AUTH_REMOTE_FALLBACK is enabled;
+    only then is the Supabase client needed, so locally verifiable tokens
+    are accepted even if it failed to initialise.
+    Verified claims are cached by token hash until the token expires.
+    """
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
 
     token = authorization.replace("Bearer ", "")
+    cache_key = hash_token(token)
 
-    # In production, verify the JWT token with Supabase
-    # For now, we'll extract the user ID from the token
-    # This is a simplified version - in production use proper JWT verification
-    supabase = get_supabase()
+    cached = await supabase_token_cache.get(cache_key)
+    if cached is not MISSING and cached["exp"] > time.time():
+        return cached["sub"]
+
+    try:
+        claims = await get_token_verifier().verify(token)
+        await _cache_verified_token(cache_key, claims["sub"], claims["exp"])
+        return claims["sub"]
+    except SigningKeyUnavailable as e:
+        if not remote_fallback_enabled():
+            logger.error(f"Token verification failed: {e}")
+            raise HTTPException(status_code=401, detail="Invalid token")
+        logger.warning(f"Falling back to remote token verification: {e}")
+    except TokenVerificationError as e:
+        logger.warning(f"Token verification failed: {e}")
+        raise HTTPException(status_code=401, detail="Invalid token")
 
+    supabase = get_supabase()
     try:
-        user = supabase.auth.get_user(token)
+        user = await supabase.auth.get_user(token)
         if not user or not user.user:
             raise HTTPException(status_code=401, detail="Invalid token")
-        return user.user.id
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Token verification failed: {e}")
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    # Supabase vouched for the token, so its own exp claim can bound the cache TTL
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.PyJWTError:
+        exp = None
+    if exp:
+        await _cache_verified_token(cache_key, user.user.id, exp)
+    return user.user.id
+
+async def _cache_verified_token(cache_key: str, user_id: str, exp: float) -> None:
+    """Remember a verified token's subject until the token expires"""
+    claims = {"sub": user_id, "exp": exp}
+    await supabase_token_cache.set(cache_key, claims, claims_ttl(claims, supabase_token_cache.default_ttl))
+
 @router.get("/professional-info", response_model=ProfessionalInfoResponse)
 async def get_professional_info(
     role_type: str,
+    response: Response,
     user_id: str = Depends(verify_token),
-    supabase: Client = Depends(get_supabase)
+    supabase: "AsyncClient" = Depends(get_supabase),
+    if_none_match: Annotated[Optional[str], Header()] = None
 ):
     """
     Get professional info (template) for a specific role
 
+    Responses carry a strong ETag. A matching If-None-Match gets a 304. When
+    the ETag is cached, only the row's updated_at is read to confirm it is
+    still current; role_details is also written directly through Supabase,
+    so the cached validator alone cannot be trusted.
+
     Query params:
     - role_type: 'seeker', 'provider', or 'agent'
     """
+    cache_key = f"{user_id}:{role_type}"
+
     try:
-        # Fetch role_details for the user and role
-        response = (supabase.table("role_details")
-            .select("*")
-            .eq("profile_id", user_id)
-            .eq("role_type", role_type)
-            .execute())
+        if if_none_match:
+            validator = await professional_info_etag_cache.get(cache_key)
+            if validator is not MISSING and etag_matches(if_none_match, validator["etag"]):
+                # The updated_at trigger bumps the column on every write
+                current = await (supabase.table("role_details")
+                    .select("updated_at")
+                    .eq("profile_id", user_id)
+                    .eq("role_type", role_type)
+                    .execute())
+                if current.data and current.data[0]["updated_at"] == validator["updated_at"]:
+                    return not_modified(validator["etag"])
+
+        # Fetch role_details for the user and role; concurrent identical reads share one query
+        result = await professional_info_flight.do(
+            cache_key,
+            lambda: (supabase.table("role_details")
+                .select("*")
+                .eq("profile_id", user_id)
+                .eq("role_type", role_type)
+                .execute())
+        )
 
-        if not response.data or len(response.data) == 0:
+        if not result.data or len(result.data) == 0:
             raise HTTPException(
                 status_code=404,
                 detail=f"No professional info found for role: {role_type}"
             )
 
-        return response.data[0]
+        professional_info = result.data[0]
+        etag = compute_etag(professional_info)
+        await professional_info_etag_cache.set(
+            cache_key, {"etag": etag, "updated_at": professional_info["updated_at"]}
+        )
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
 
-    except HTTPException:
+        set_validator(response, etag)
+        return professional_info
+
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception as e:
         logger.error(f"Error fetching professional info: {e}")
@@ -111,11 +189,11 @@ async def get_professional_info(
             detail=f"Failed to fetch professional info: {str(e)}"
         )
 
-@router.patch("/professional-info")
+@router.patch("/professional-info", response_model=UpdateProfessionalInfoResponse)
 async def update_professional_info(
     data: UpdateProfessionalInfoRequest,
     user_id: str = Depends(verify_token),
-    supabase: Client = Depends(get_supabase)
+    supabase: "AsyncClient" = Depends(get_supabase)
 ):
     """
     Update professional info (template) for a specific role
@@ -148,7 +226,7 @@ async def update_professional_info(
             update_data["specializations"] = data.specializations
 
         # Upsert (update or insert) the template
-        response = (supabase.table("role_details")
+        response = await (supabase.table("role_details")
             .upsert(update_data, on_conflict="profile_id,role_type")
             .execute())
 
@@ -157,6 +235,7 @@ async def update_professional_info(
                 status_code=500,
                 detail="Failed to update professional info"
             )
+        await professional_info_etag_cache.delete(f"{user_id}:{data.role_type}")
 
         return {
             "success": True,
@@ -164,7 +243,7 @@ async def update_professional_info(
             "data": response.data[0]
         }
 
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception as e:
         logger.error(f"Error updating professional info: {e}")
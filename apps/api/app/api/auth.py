@@ -2,14 +2,34 @@
 Authentication endpoints for the Tutorwise backend.
 """
 import logging
+import os
+import time
+import uuid
 from datetime import datetime, timedelta
+from typing import Optional
 
 import bcrypt
 import jwt
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-from app.db import neo4j_driver, redis_client
+from app.cache import (
+    MISSING,
+    USER_CACHE_NEGATIVE_TTL,
+    claims_ttl,
+    hash_token,
+    session_token_cache,
+    supabase_token_cache,
+    user_cache,
+)
+from app.circuit_breaker import CircuitOpenError, dependency_call
+from app.db import (
+    get_neo4j_driver,
+    get_redis_client,
+    neo4j_execute_read,
+    neo4j_execute_write,
+)
+from app.hashing import bcrypt_executor
 from app.models import (
     AuthTokenResponse,
     UserCreateRequest,
@@ -18,13 +38,36 @@ from app.models import (
     UserRole,
     UserStatus,
 )
+from app.rate_limit import auth_rate_limit
+from app.serialization import FastJSONRoute
+from app.singleflight import user_lookup_flight
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=FastJSONRoute)
 security = HTTPBearer()
 
 # JWT Configuration
-SECRET_KEY = "your-secret-key-here"  # TODO: Move to environment variables
+DEVELOPMENT_SECRET_KEY = "your-secret-key-here"
+
+
+def load_secret_key() -> Optional[str]:
+    """
+    Signing key for /auth tokens from JWT_SECRET_KEY, or None if it is unset.
+
+    Only development falls back to the public placeholder key; anywhere else
+    tokens signed with it could be forged, so app.main leaves the /auth
+    routes unmounted instead.
+    """
+    secret_key = os.getenv("JWT_SECRET_KEY")
+    if secret_key:
+        return secret_key
+    if os.getenv("ENV") == "development":
+        logger.warning("JWT_SECRET_KEY not set - using the insecure development signing key")
+        return DEVELOPMENT_SECRET_KEY
+    return None
+
+
+SECRET_KEY = load_secret_key()
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
@@ -44,6 +87,16 @@ class AuthService:
         """Verify a password against its hash."""
         return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """Hash a password on the bounded bcrypt executor."""
+        return await bcrypt_executor.run("hash", AuthService.hash_password, password)
+
+    @staticmethod
+    async def verify_password_async(password: str, hashed_password: str) -> bool:
+        """Verify a password on the bounded bcrypt executor."""
+        return await bcrypt_executor.run("verify", AuthService.verify_password, password, hashed_password)
+
     @staticmethod
     def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
         """Create a JWT access token."""
@@ -68,16 +121,22 @@ class AuthService:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token has expired"
             )
-        except jwt.JWTError:
+        except jwt.InvalidTokenError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token"
             )
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    """Get current user from JWT token."""
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Get current user from JWT token, reusing cached claims when available."""
     token = credentials.credentials
+    cache_key = hash_token(token)
+
+    payload = await session_token_cache.get(cache_key)
+    if payload is not MISSING and payload["exp"] > time.time():
+        return payload
+
     payload = AuthService.verify_token(token)
 
     if not payload or "sub" not in payload:
@@ -86,58 +145,63 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             detail="Invalid token payload"
         )
 
+    await session_token_cache.set(cache_key, payload, claims_ttl(payload, session_token_cache.default_ttl))
     return payload
 
 
-def create_user_in_db(user_data: UserCreateRequest) -> str:
+# Conflict checks and the insert run as one statement, so registration is a
+# single round trip. The :User uniqueness constraints catch concurrent
+# registrations that race past the OPTIONAL MATCH checks.
+USER_CONFLICTS_QUERY = """
+    OPTIONAL MATCH (by_email:User {email: $email})
+    WITH count(by_email) > 0 AS email_taken
+    OPTIONAL MATCH (by_username:User {username: $username})
+    WITH email_taken, count(by_username) > 0 AS username_taken
+"""
+CREATE_USER_QUERY = USER_CONFLICTS_QUERY + """
+    FOREACH (_ IN CASE WHEN email_taken OR username_taken THEN [] ELSE [1] END |
+        CREATE (:User {
+            id: $id,
+            email: $email,
+            username: $username,
+            full_name: $full_name,
+            password_hash: $password_hash,
+            role: $role,
+            status: $status,
+            created_at: $created_at,
+            updated_at: $updated_at
+        })
+    )
+    RETURN email_taken, username_taken
+"""
+
+
+async def find_user_conflicts(email: str, username: str) -> tuple[bool, bool]:
+    """Whether a :User already holds this email and this username"""
+    async def _find_conflicts(tx):
+        result = await tx.run(USER_CONFLICTS_QUERY + "RETURN email_taken, username_taken", email=email, username=username)
+        record = await result.single()
+        return record["email_taken"], record["username_taken"]
+
+    return await neo4j_execute_read(_find_conflicts)
+
+
+async def create_user_in_db(user_data: UserCreateRequest) -> str:
     """Create a user in Neo4j database."""
-    if not neo4j_driver:
+    if not get_neo4j_driver():
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Database connection not available"
         )
 
-    def _create_user(tx):
-        # Check if user already exists
-        result = tx.run(
-            "MATCH (u:User {email: $email}) RETURN u",
-            email=user_data.email
-        )
-        if result.single():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User with this email already exists"
-            )
-
-        # Check if username is taken
-        result = tx.run(
-            "MATCH (u:User {username: $username}) RETURN u",
-            username=user_data.username
-        )
-        if result.single():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username is already taken"
-            )
+    # Hash before opening the write transaction so it is held only for the insert
+    hashed_password = await AuthService.hash_password_async(user_data.password)
+    user_id = f"user_{uuid.uuid4().hex}"
+    now = datetime.utcnow().isoformat()
 
-        # Create new user
-        user_id = f"user_{datetime.utcnow().timestamp()}"
-        hashed_password = AuthService.hash_password(user_data.password)
-        now = datetime.utcnow().isoformat()
-
-        tx.run("""
-            CREATE (u:User {
-                id: $id,
-                email: $email,
-                username: $username,
-                full_name: $full_name,
-                password_hash: $password_hash,
-                role: $role,
-                status: $status,
-                created_at: $created_at,
-                updated_at: $updated_at
-            })
-        """,
+    async def _create_user(tx):
+        result = await tx.run(
+            CREATE_USER_QUERY,
             id=user_id,
             email=user_data.email,
             username=user_data.username,
@@ -148,52 +212,108 @@ def create_user_in_db(user_data: UserCreateRequest) -> str:
             created_at=now,
             updated_at=now
         )
+        record = await result.single()
+        return record["email_taken"], record["username_taken"]
 
-        return user_id
+    from neo4j.exceptions import ConstraintError
 
     try:
-        with neo4j_driver.session() as session:
-            user_id = session.write_transaction(_create_user)
-            return user_id
+        try:
+            email_taken, username_taken = await neo4j_execute_write(_create_user)
+        except ConstraintError as e:
+            # Most likely a concurrent registration won the race. The error does
+            # not say which constraint failed in a structured way, so look up
+            # what the winner took instead of parsing the message.
+            logger.info(f"Registration conflict caught by constraint: {e}")
+            email_taken, username_taken = await find_user_conflicts(user_data.email, user_data.username)
+            if not (email_taken or username_taken):
+                raise
+    except CircuitOpenError:
+        raise
     except Exception as e:
         logger.error(f"Error creating user: {e}")
-        if isinstance(e, HTTPException):
-            raise e
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create user"
         )
 
+    if email_taken:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this email already exists"
+        )
+    if username_taken:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username is already taken"
+        )
+
+    # Drop any negative "unknown email" entry left by an earlier login attempt
+    await user_cache.delete(user_data.email)
+    return user_id
 
-def get_user_by_email(email: str) -> dict | None:
-    """Get user by email from Neo4j database."""
-    if not neo4j_driver:
+
+async def get_user_by_email(email: str) -> dict | None:
+    """Get user by email, without the password hash."""
+    user = await get_user_credentials(email)
+    if user is None:
+        return None
+    return {field: value for field, value in user.items() if field != "password_hash"}
+
+
+async def get_user_credentials(email: str) -> dict | None:
+    """
+    Get user by email including password_hash, for checking a login.
+
+    Reads through the user cache to Neo4j. Unknown emails are cached as None
+    for a short time; lookup errors are never cached. Concurrent misses for
+    the same email share one query.
+    """
+    cached = await user_cache.get(email)
+    if cached is not MISSING:
+        return cached
+
+    if not get_neo4j_driver():
         return None
 
-    def _get_user(tx):
-        result = tx.run(
-            "MATCH (u:User {email: $email}) RETURN u",
+    return await user_lookup_flight.do(email, lambda: _load_user(email), recheck=lambda: user_cache.get(email))
+
+
+async def _load_user(email: str) -> dict | None:
+    """Query Neo4j for a user and cache the result"""
+    async def _get_user(tx):
+        result = await tx.run(
+            """
+            MATCH (u:User {email: $email})
+            RETURN u {.id, .email, .username, .full_name, .password_hash, .role, .status,
+                      .created_at, .updated_at} AS u
+            """,
             email=email
         )
-        record = result.single()
+        record = await result.single()
         return dict(record["u"]) if record else None
 
     try:
-        with neo4j_driver.session() as session:
-            return session.read_transaction(_get_user)
+        user = await neo4j_execute_read(_get_user)
+    except CircuitOpenError:
+        # Not an unknown email: fail fast with a 503 instead of a 401
+        raise
     except Exception as e:
         logger.error(f"Error fetching user: {e}")
         return None
 
+    await user_cache.set(email, user, ttl=None if user else USER_CACHE_NEGATIVE_TTL)
+    return user
 
-@router.post("/register", response_model=AuthTokenResponse)
+
+@router.post("/register", response_model=AuthTokenResponse, dependencies=[Depends(auth_rate_limit("register"))])
 async def register(user_data: UserCreateRequest):
     """Register a new user."""
     logger.info(f"Registration attempt for email: {user_data.email}")
 
     try:
         # Create user in database
-        user_id = create_user_in_db(user_data)
+        user_id = await create_user_in_db(user_data)
 
         # Create access token
         token_data = {"sub": user_id, "email": user_data.email, "role": user_data.role.value}
@@ -217,7 +337,7 @@ async def register(user_data: UserCreateRequest):
             user=user_response
         )
 
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception as e:
         logger.error(f"Registration error: {e}")
@@ -227,13 +347,13 @@ async def register(user_data: UserCreateRequest):
         )
 
 
-@router.post("/login", response_model=AuthTokenResponse)
+@router.post("/login", response_model=AuthTokenResponse, dependencies=[Depends(auth_rate_limit("login"))])
 async def login(login_data: UserLoginRequest):
     """Authenticate user and return access token."""
     logger.info(f"Login attempt for email: {login_data.email}")
 
     # Get user from database
-    user = get_user_by_email(login_data.email)
+    user = await get_user_credentials(login_data.email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -241,7 +361,7 @@ async def login(login_data: UserLoginRequest):
         )
 
     # Verify password
-    if not AuthService.verify_password(login_data.password, user["password_hash"]):
+    if not await AuthService.verify_password_async(login_data.password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -259,6 +379,7 @@ async def login(login_data: UserLoginRequest):
     access_token = AuthService.create_access_token(token_data)
 
     # Store session in Redis if available
+    redis_client = get_redis_client()
     if redis_client:
         try:
             session_key = f"session:{user['id']}"
@@ -268,7 +389,8 @@ async def login(login_data: UserLoginRequest):
                 "role": user["role"],
                 "login_time": datetime.utcnow().isoformat()
             }
-            redis_client.setex(session_key, 3600, str(session_data))  # 1 hour expiry
+            with dependency_call("redis", "session_set"):
+                await redis_client.setex(session_key, 3600, str(session_data))  # 1 hour expiry
         except Exception as e:
             logger.warning(f"Failed to store session in Redis: {e}")
 
@@ -292,16 +414,26 @@ async def login(login_data: UserLoginRequest):
 
 
 @router.post("/logout")
-async def logout(current_user: dict = Depends(get_current_user)):
+async def logout(
+    current_user: dict = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
     """Logout user and invalidate session."""
     user_id = current_user["sub"]
     logger.info(f"Logout for user: {user_id}")
 
+    # Drop cached token claims so the token is re-verified from scratch
+    cache_key = hash_token(credentials.credentials)
+    await session_token_cache.delete(cache_key)
+    await supabase_token_cache.delete(cache_key)
+
     # Remove session from Redis if available
+    redis_client = get_redis_client()
     if redis_client:
         try:
             session_key = f"session:{user_id}"
-            redis_client.delete(session_key)
+            with dependency_call("redis", "session_delete"):
+                await redis_client.delete(session_key)
         except Exception as e:
             logger.warning(f"Failed to remove session from Redis: {e}")
 
@@ -312,7 +444,7 @@ async def logout(current_user: dict = Depends(get_current_user)):
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     """Get current user information."""
     user_email = current_user["email"]
-    user = get_user_by_email(user_email)
+    user = await get_user_by_email(user_email)
 
     if not user:
         raise HTTPException(
@@ -0,0 +1,45 @@
+# app/api/debug.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from app.loop_monitor import loop_monitor
+from app.profiling import is_debug_token, request_profiler
+from app.serialization import FastJSONRoute
+from app.startup import startup_timer
+
+async def require_debug_token(x_debug_token: Optional[str] = Header(None)):
+    """Allow access only with the X-Debug-Token header matching DEBUG_TOKEN"""
+    if not is_debug_token(x_debug_token):
+        # Indistinguishable from a missing route, so debug endpoints are not discoverable
+        raise HTTPException(status_code=404, detail="Not Found")
+
+router = APIRouter(prefix="/debug", dependencies=[Depends(require_debug_token)], include_in_schema=False, route_class=FastJSONRoute)
+
+@router.get("/profiles", tags=["Debug"])
+async def list_profiles():
+    """List stored request profiles, newest first."""
+    return {"profiles": request_profiler.list_profiles()}
+
+@router.get("/profiles/{name}", tags=["Debug"])
+async def get_profile(name: str):
+    """Download a speedscope profile written by the request profiler."""
+    path = request_profiler.profile_path(name)
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=name)
+
+@router.get("/loop-stalls", tags=["Debug"])
+async def list_loop_stalls():
+    """Recent event-loop stalls on this worker, with the route and stack that caused them."""
+    return {
+        "lag_percentiles_seconds": loop_monitor.percentiles(),
+        "threshold_seconds": loop_monitor.threshold,
+        "stalls": list(reversed(loop_monitor.stalls)),
+    }
+
+@router.get("/startup", tags=["Debug"])
+async def get_startup_timing():
+    """How long each startup phase of this worker took (imports, app setup, routes, connections)."""
+    return startup_timer.report()
@@ -3,14 +3,15 @@ import datetime
 
 from fastapi import APIRouter, HTTPException
 
-from app.db import neo4j_driver
+from app.db import get_neo4j_driver, neo4j_execute_write
+from app.serialization import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
-def _create_test_node(tx):
-    tx.run("MATCH (n:SystemTestNode) DETACH DELETE n")
+async def _create_test_node(tx):
+    await tx.run("MATCH (n:SystemTestNode) DETACH DELETE n")
     timestamp = datetime.datetime.now().isoformat()
-    tx.run(
+    await tx.run(
         "CREATE (n:SystemTestNode { source: $source, timestamp: $timestamp })",
         source="Railway Backend",
         timestamp=timestamp
@@ -18,30 +19,15 @@ def _create_test_node(tx):
 
 @router.post("/test-neo4j-write", tags=["Development"])
 async def test_neo4j_write():
-    # Use global driver if available, otherwise create a temporary one
-    driver_to_use = neo4j_driver
-
-    if not driver_to_use:
-        try:
-            # Create a temporary driver for this request
-            from app.db import get_neo4j_config
-            from neo4j import GraphDatabase
-            neo4j_uri, neo4j_user, neo4j_password = get_neo4j_config()
-            driver_to_use = GraphDatabase.driver(
-                neo4j_uri,
-                auth=(neo4j_user, neo4j_password),
-                connection_timeout=10,
-                max_connection_lifetime=300
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=503,
-                detail=f"Neo4j configuration unavailable: {str(e)}"
-            )
+    # Use the shared pooled driver; never open a temporary driver per request
+    if not get_neo4j_driver():
+        raise HTTPException(
+            status_code=503,
+            detail="Neo4j driver not available"
+        )
 
     try:
-        with driver_to_use.session() as session:
-            session.write_transaction(_create_test_node)
+        await neo4j_execute_write(_create_test_node)
         return {"status": "ok", "message": "Successfully wrote test node to Neo4j."}
     except Exception as e:
         print(f"Neo4j write error: {e}")
@@ -1,102 +1,78 @@
 # app/api/health.py
 import asyncio
 import logging
-from typing import Any
+import os
+import time
+from typing import Any, Optional
 
 from fastapi import APIRouter
-
-from app.db import neo4j_driver, redis_client
+from fastapi.responses import JSONResponse
+
+from app.cache import get_cache_stats
+from app.circuit_breaker import get_breaker_states
+from app.db import (
+    DatabaseError,
+    get_neo4j_driver,
+    get_neo4j_schema_state,
+    get_redis_client,
+    get_supabase,
+)
+from app.serialization import FastJSONRoute
+from app.singleflight import get_flight_stats
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
+
+# Probes only ever use the shared clients and are bounded by this timeout, so a
+# slow dependency can delay the next snapshot but never a health request.
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "10"))
 
 async def check_redis_health() -> dict[str, Any]:
-    """Check Redis health with proper error handling"""
-    # Use global client if available, otherwise create a temporary one for health check
-    client_to_use = redis_client
-
-    if not client_to_use:
-        try:
-            # Create a temporary client for health check
-            from app.db import get_redis_config
-            redis_url = get_redis_config()
-            import redis
-            client_to_use = redis.from_url(
-                redis_url,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5
-            )
-        except Exception as e:
-            return {
-                "status": "not_configured",
-                "message": f"Redis configuration unavailable: {str(e)}",
-                "details": None
-            }
+    """Ping the shared Redis client"""
+    client = get_redis_client()
+    if not client:
+        return {
+            "status": "not_configured",
+            "message": "Redis client not initialized",
+            "details": None
+        }
 
-    for attempt in range(3):
-        try:
-            # Test Redis connection
-            client_to_use.ping()
-            return {
-                "status": "ok",
-                "message": "Redis is healthy",
-                "details": None
-            }
-        except Exception as e:
-            error_msg = str(e)
-            logger.warning(f"Redis health check attempt {attempt + 1}/3 failed: {error_msg}")
-
-            if attempt == 2:  # Last attempt
-                return {
-                    "status": "error",
-                    "message": "Redis connection failed",
-                    "details": error_msg
-                }
-            else:
-                await asyncio.sleep(1)  # Wait 1 second between retries
-
-    # This should never be reached due to the loop logic above
-    return {
-        "status": "error",
-        "message": "Redis health check failed unexpectedly",
-        "details": "All retry attempts failed"
-    }
+    try:
+        await asyncio.wait_for(client.ping(), timeout=HEALTH_PROBE_TIMEOUT)
+        return {
+            "status": "ok",
+            "message": "Redis is healthy",
+            "details": None
+        }
+    except Exception as e:
+        error_msg = str(e) or type(e).__name__
+        logger.warning(f"Redis health check failed: {error_msg}")
+        return {
+            "status": "error",
+            "message": "Redis connection failed",
+            "details": error_msg
+        }
 
 async def check_neo4j_health() -> dict[str, Any]:
-    """Check Neo4j health with proper error handling"""
-    # Use global driver if available, otherwise create a temporary one for health check
-    driver_to_use = neo4j_driver
-
-    if not driver_to_use:
-        try:
-            # Create a temporary driver for health check
-            from app.db import get_neo4j_config
-            from neo4j import GraphDatabase
-            neo4j_uri, neo4j_user, neo4j_password = get_neo4j_config()
-            driver_to_use = GraphDatabase.driver(
-                neo4j_uri,
-                auth=(neo4j_user, neo4j_password),
-                connection_timeout=10,
-                max_connection_lifetime=300
-            )
-        except Exception as e:
-            return {
-                "status": "not_configured",
-                "message": f"Neo4j configuration unavailable: {str(e)}",
-                "details": None
-            }
+    """Verify connectivity of the shared Neo4j driver"""
+    driver = get_neo4j_driver()
+    if not driver:
+        return {
+            "status": "not_configured",
+            "message": "Neo4j driver not initialized",
+            "details": None
+        }
 
     try:
-        # Test Neo4j connection
-        driver_to_use.verify_connectivity()
+        await asyncio.wait_for(driver.verify_connectivity(), timeout=HEALTH_PROBE_TIMEOUT)
         return {
             "status": "ok",
             "message": "Neo4j is healthy",
             "details": None
         }
     except Exception as e:
-        error_msg = str(e)
+        error_msg = str(e) or type(e).__name__
         logger.error(f"Neo4j health check failed: {error_msg}")
         return {
             "status": "error",
@@ -104,49 +80,137 @@ async def check_neo4j_health() -> dict[str, Any]:
             "details": error_msg
         }
 
-@router.get("/health", tags=["Health"])
-async def health_check():
+def check_supabase_health() -> dict[str, Any]:
+    """Report whether the shared Supabase client exists (no network call)"""
+    try:
+        get_supabase()
+    except DatabaseError:
+        return {
+            "status": "not_configured",
+            "message": "Supabase client not initialized",
+            "details": None
+        }
+    return {
+        "status": "ok",
+        "message": "Supabase client initialized",
+        "details": None
+    }
+
+async def check_neo4j_schema() -> dict[str, Any]:
+    """Report whether the :User constraints exist and their indexes are online"""
+    if not get_neo4j_driver():
+        return {"status": "unknown", "missing_constraints": [], "indexes": []}
+
+    try:
+        return await asyncio.wait_for(get_neo4j_schema_state(), timeout=HEALTH_PROBE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Neo4j schema check failed: {e}")
+        return {"status": "error", "missing_constraints": [], "indexes": [], "details": str(e)}
+
+class HealthMonitor:
     """
-    Comprehensive health check endpoint.
-    Always returns 200 OK with detailed status information.
+    Probes dependencies on an interval and keeps the latest snapshot.
+
+    Health endpoints serve the snapshot instead of probing per request, so
+    load balancer traffic never opens connections or waits on a dependency.
     """
-    try:
-        # Run health checks concurrently
-        redis_health, neo4j_health = await asyncio.gather(
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.snapshot: Optional[dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> dict[str, Any]:
+        """Probe every dependency concurrently and store the result"""
+        redis_health, neo4j_health, neo4j_schema = await asyncio.gather(
             check_redis_health(),
-            check_neo4j_health()
+            check_neo4j_health(),
+            check_neo4j_schema()
         )
+        services = {
+            "redis": redis_health,
+            "neo4j": neo4j_health,
+            "supabase": check_supabase_health()
+        }
 
-        # Determine overall status
-        redis_ok = redis_health["status"] == "ok"
-        neo4j_ok = neo4j_health["status"] == "ok"
-
-        if redis_ok and neo4j_ok:
+        if all(service["status"] == "ok" for service in services.values()):
             overall_status = "ok"
-        elif redis_health["status"] == "not_configured" or neo4j_health["status"] == "not_configured":
-            overall_status = "degraded"
         else:
             overall_status = "degraded"
 
-        return {
+        self.snapshot = {
             "status": overall_status,
-            "timestamp": asyncio.get_event_loop().time(),
-            "services": {
-                "redis": redis_health,
-                "neo4j": neo4j_health
+            "timestamp": time.time(),
+            "services": services,
+            "schema": {
+                "neo4j": neo4j_schema
             }
         }
+        return self.snapshot
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Background health check failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start probing in the background on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="health-monitor")
+
+    async def stop(self) -> None:
+        """Cancel the background probe task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self) -> None:
+        """Forget the current snapshot"""
+        self.snapshot = None
+
+    def is_ready(self) -> bool:
+        """Ready once a snapshot exists and no configured dependency is failing"""
+        if self.snapshot is None:
+            return False
+        return all(service["status"] != "error" for service in self.snapshot["services"].values())
+
+health_monitor = HealthMonitor(interval=HEALTH_CHECK_INTERVAL)
 
-    except Exception as e:
-        # This should never happen, but provide a fallback
-        logger.error(f"Unexpected error in health check: {e}")
-        return {
-            "status": "error",
-            "timestamp": asyncio.get_event_loop().time(),
-            "message": "Health check system error",
-            "details": str(e),
-            "services": {
-                "redis": {"status": "unknown", "message": "Health check failed", "details": None},
-                "neo4j": {"status": "unknown", "message": "Health check failed", "details": None}
-            }
-        }
+@router.get("/health", tags=["Health"])
+async def health_check():
+    """
+    Comprehensive health check endpoint.
+    Always returns 200 OK with the latest background-probed status.
+    """
+    snapshot = health_monitor.snapshot
+    if snapshot is None:
+        # Background monitor has not produced a snapshot yet (or is not running)
+        snapshot = await health_monitor.refresh()
+
+    return {
+        **snapshot,
+        "age_seconds": round(time.time() - snapshot["timestamp"], 3),
+        "caches": get_cache_stats(),
+        "coalescing": get_flight_stats(),
+        "circuits": get_breaker_states()
+    }
+
+@router.get("/livez", tags=["Health"])
+async def liveness_probe():
+    """Liveness probe: the worker is up and its event loop is responsive."""
+    return {"status": "ok"}
+
+@router.get("/readyz", tags=["Health"])
+async def readiness_probe():
+    """Readiness probe: 200 when the cached snapshot shows no failing dependency."""
+    if not health_monitor.is_ready():
+        status = health_monitor.snapshot["status"] if health_monitor.snapshot else "starting"
+        return JSONResponse(status_code=503, content={"status": status, "ready": False})
+    return {"status": health_monitor.snapshot["status"], "ready": True}
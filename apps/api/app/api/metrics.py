@@ -0,0 +1,27 @@
+# app/api/metrics.py
+import os
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
+
+from app.serialization import FastJSONRoute
+
+router = APIRouter(route_class=FastJSONRoute)
+
+def render_metrics() -> bytes:
+    """
+    Render every metric in Prometheus text format.
+
+    With PROMETHEUS_MULTIPROC_DIR set, values are read from the per-worker
+    files so a scrape hitting any gunicorn worker reports all of them.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+@router.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of the backend's metrics."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
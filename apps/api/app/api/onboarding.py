@@ -3,15 +3,25 @@ Onboarding API endpoints for saving and retrieving user onboarding progress.
 Supports auto-save functionality during onboarding wizard.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from pydantic import BaseModel, Field, model_validator
+from typing import TYPE_CHECKING, Annotated, Dict, Any, List, Literal, Optional
 from datetime import datetime
-from app.api.auth import verify_token
+from app.api.account import verify_token
+from app.cache import onboarding_progress_cache
+from app.circuit_breaker import CircuitOpenError
 from app.db import get_supabase
-from supabase import Client
+from app.etag import compute_etag, etag_matches, not_modified, set_validator
+from app.onboarding_buffer import VersionConflict, onboarding_write_buffer, write_behind_enabled
+from app.patching import PatchError, apply_json_patch, apply_merge_patch
+from app.serialization import FastJSONRoute
+from app.singleflight import onboarding_progress_flight
 
-router = APIRouter()
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+router = APIRouter(route_class=FastJSONRoute)
 
 
 # Request/Response Models
@@ -23,6 +33,29 @@ class OnboardingProgressRequest(BaseModel):
     is_complete: bool = Field(default=False, description="Whether onboarding is complete")
 
 
+class JsonPatchOperation(BaseModel):
+    """A single RFC 6902 JSON Patch operation"""
+    op: Literal["add", "remove", "replace", "move", "copy", "test"]
+    path: str
+    value: Any = None
+    from_: Optional[str] = Field(default=None, alias="from")
+
+
+class OnboardingProgressPatchRequest(BaseModel):
+    """Request model for patching onboarding progress with a step_data delta"""
+    version: int = Field(..., ge=0, description="Version of the progress the patch was made against (0 if none saved yet)")
+    step: Optional[int] = Field(default=None, ge=1, le=5, description="New current step, if it changed")
+    is_complete: Optional[bool] = Field(default=None, description="Whether onboarding is complete, if it changed")
+    merge_patch: Optional[Dict[str, Any]] = Field(default=None, description="RFC 7396 merge patch for step_data")
+    json_patch: Optional[List[JsonPatchOperation]] = Field(default=None, description="RFC 6902 JSON Patch for step_data")
+
+    @model_validator(mode="after")
+    def check_single_patch(self):
+        if self.merge_patch is not None and self.json_patch is not None:
+            raise ValueError("Send either merge_patch or json_patch, not both")
+        return self
+
+
 class OnboardingProgressResponse(BaseModel):
     """Response model for onboarding progress operations"""
     success: bool
@@ -31,13 +64,67 @@ class OnboardingProgressResponse(BaseModel):
     updated_at: Optional[str] = None
     current_step: Optional[int] = None
     step_data: Optional[Dict[str, Any]] = None
+    version: Optional[int] = None
+
+
+def _progress_cache_key(user_id: str, role_type: str) -> str:
+    return f"{user_id}:{role_type}"
+
+
+async def load_onboarding_progress(
+    supabase: "AsyncClient",
+    user_id: str,
+    role_type: str
+) -> Optional[Dict[str, Any]]:
+    """Load the current progress row for a wizard, or None if there is none"""
+    # Autosaves not yet flushed to Supabase are newer than the stored row
+    if write_behind_enabled():
+        buffered = await onboarding_write_buffer.get(user_id, role_type)
+        if buffered:
+            return buffered
+
+    response = await (supabase.table("onboarding_progress")
+        .select("*")
+        .eq("profile_id", user_id)
+        .eq("role_type", role_type)
+        .maybe_single()  # Returns None if not found, single record if found
+        .execute())
+
+    return response.data if response else None
+
+
+async def load_stored_version(supabase: "AsyncClient", user_id: str, role_type: str) -> int:
+    """Version of the progress row in Supabase, bypassing the cache and the buffer; 0 if there is none"""
+    response = await (supabase.table("onboarding_progress")
+        .select("version")
+        .eq("profile_id", user_id)
+        .eq("role_type", role_type)
+        .maybe_single()
+        .execute())
+
+    return (response.data or {}).get("version", 0) if response else 0
+
+
+def _new_version(after: int = 0) -> int:
+    """Versions are millisecond timestamps, so full saves never need to read the current one"""
+    return max(int(time.time() * 1000), after + 1)
+
+
+def _version_conflict(current_version: Optional[int]) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={
+            "message": "Onboarding progress has changed since this version; reload and retry",
+            "current_version": current_version,
+        }
+    )
 
 
 @router.post("/save-progress", response_model=OnboardingProgressResponse)
 async def save_onboarding_progress(
     request: OnboardingProgressRequest,
     user_id: str = Depends(verify_token),
-    supabase: Client = Depends(get_supabase)
+    supabase: "AsyncClient" = Depends(get_supabase)
 ):
     """
     Save user's onboarding progress with auto-save support.
@@ -64,12 +151,25 @@ async def save_onboarding_progress(
             "current_step": request.step,
             "step_data": request.data,
             "is_complete": request.is_complete,
-            "updated_at": datetime.utcnow().isoformat()
+            "updated_at": datetime.utcnow().isoformat(),
+            "version": _new_version()
         }
 
+        # Write-behind: acknowledge once buffered in Redis, flushed to Supabase in batches
+        if write_behind_enabled() and await onboarding_write_buffer.save(progress_data):
+            await onboarding_progress_cache.put(_progress_cache_key(user_id, request.role_type), progress_data)
+            return OnboardingProgressResponse(
+                success=True,
+                message="Onboarding progress saved successfully",
+                updated_at=progress_data["updated_at"],
+                current_step=progress_data["current_step"],
+                step_data=progress_data["step_data"],
+                version=progress_data["version"]
+            )
+
         # Upsert onboarding_progress table
         # on_conflict ensures we update existing progress for this profile_id + role_type
-        response = (supabase.table("onboarding_progress")
+        response = await (supabase.table("onboarding_progress")
             .upsert(progress_data, on_conflict="profile_id,role_type")
             .execute())
 
@@ -80,6 +180,7 @@ async def save_onboarding_progress(
             )
 
         saved_progress = response.data[0]
+        await onboarding_progress_cache.put(_progress_cache_key(user_id, request.role_type), saved_progress)
 
         return OnboardingProgressResponse(
             success=True,
@@ -87,10 +188,11 @@ async def save_onboarding_progress(
             progress_id=saved_progress.get("id"),
             updated_at=saved_progress.get("updated_at"),
             current_step=saved_progress.get("current_step"),
-            step_data=saved_progress.get("step_data")
+            step_data=saved_progress.get("step_data"),
+            version=saved_progress.get("version")
         )
 
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -102,13 +204,18 @@ async def save_onboarding_progress(
 @router.get("/progress/{role_type}", response_model=OnboardingProgressResponse)
 async def get_onboarding_progress(
     role_type: str,
+    response: Response,
     user_id: str = Depends(verify_token),
-    supabase: Client = Depends(get_supabase)
+    supabase: "AsyncClient" = Depends(get_supabase),
+    if_none_match: Annotated[Optional[str], Header()] = None
 ):
     """
     Get user's saved onboarding progress for a specific role.
 
     Used to restore onboarding state when user returns to the wizard.
+    Reads through onboarding_progress_cache, so returning users are usually
+    served without a PostgREST round trip. Responses carry a strong ETag
+    of the progress row; a matching If-None-Match gets a 304.
 
     Args:
         role_type: Role type (tutor, client, or agent)
@@ -129,33 +236,35 @@ async def get_onboarding_progress(
         )
 
     try:
-        # Query onboarding_progress for this user + role
-        response = (supabase.table("onboarding_progress")
-            .select("*")
-            .eq("profile_id", user_id)
-            .eq("role_type", role_type)
-            .maybeSingle()  # Returns None if not found, single record if found
-            .execute())
+        progress = await onboarding_progress_cache.get_or_load(
+            _progress_cache_key(user_id, role_type),
+            lambda: load_onboarding_progress(supabase, user_id, role_type),
+            flight=onboarding_progress_flight
+        )
 
-        if not response.data:
+        if not progress:
             # No progress found - return 404
             raise HTTPException(
                 status_code=404,
                 detail=f"No onboarding progress found for role: {role_type}"
             )
 
-        progress = response.data
+        etag = compute_etag(progress)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
 
+        set_validator(response, etag)
         return OnboardingProgressResponse(
             success=True,
             message="Onboarding progress retrieved successfully",
             progress_id=progress.get("id"),
             updated_at=progress.get("updated_at"),
             current_step=progress.get("current_step"),
-            step_data=progress.get("step_data")
+            step_data=progress.get("step_data"),
+            version=progress.get("version")
         )
 
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -164,11 +273,164 @@ async def get_onboarding_progress(
         )
 
 
+async def _write_patched_progress(
+    supabase: "AsyncClient",
+    progress_data: Dict[str, Any],
+    base_version: int,
+    exists: bool
+) -> Dict[str, Any]:
+    """Write a patched row only if the stored row is still at base_version"""
+    if write_behind_enabled():
+        try:
+            # With nothing buffered, compare with the stored row rather than the
+            # cached one, which may predate another worker's flush of a newer row
+            if await onboarding_write_buffer.save(
+                progress_data,
+                expected_version=base_version,
+                stored_version=lambda: load_stored_version(
+                    supabase, progress_data["profile_id"], progress_data["role_type"]
+                )
+            ):
+                return progress_data
+        except VersionConflict as e:
+            raise _version_conflict(e.current_version)
+
+    from postgrest.exceptions import APIError
+
+    table = supabase.table("onboarding_progress")
+    if not exists:
+        try:
+            response = await table.insert(progress_data).execute()
+        except APIError as e:
+            if e.code == "23505":
+                # Another device saved the first version meanwhile
+                raise _version_conflict(None)
+            raise
+    else:
+        response = await (table
+            .update(progress_data)
+            .eq("profile_id", progress_data["profile_id"])
+            .eq("role_type", progress_data["role_type"])
+            .eq("version", base_version)
+            .execute())
+        if not response.data:
+            raise _version_conflict(None)
+
+    if not response.data:
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to save onboarding progress"
+        )
+    return response.data[0]
+
+
+@router.patch("/progress/{role_type}", response_model=OnboardingProgressResponse)
+async def patch_onboarding_progress(
+    role_type: str,
+    request: OnboardingProgressPatchRequest,
+    user_id: str = Depends(verify_token),
+    supabase: "AsyncClient" = Depends(get_supabase)
+):
+    """
+    Apply a step_data delta to user's onboarding progress.
+
+    Autosave variant of save-progress that sends only what changed: an
+    RFC 7396 merge patch or an RFC 6902 JSON Patch, plus the version the
+    client last saw. The patch is applied to the cached current progress and
+    only the changed row is written back. Progress saved since that version,
+    e.g. from another tab or device, is never overwritten.
+
+    Args:
+        role_type: Role type (tutor, client, or agent)
+        request: Patch and the version it was made against
+        user_id: Authenticated user ID from JWT token
+        supabase: Supabase client instance
+
+    Returns:
+        OnboardingProgressResponse with the patched progress and its new version
+
+    Raises:
+        HTTPException: 409 if the version is stale, 422 if the patch does not apply
+    """
+    # Validate role_type
+    if role_type not in ["tutor", "client", "agent"]:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid role_type. Must be 'tutor', 'client', or 'agent'"
+        )
+
+    cache_key = _progress_cache_key(user_id, role_type)
+    try:
+        current = await onboarding_progress_cache.get_or_load(
+            cache_key,
+            lambda: load_onboarding_progress(supabase, user_id, role_type),
+            flight=onboarding_progress_flight
+        )
+        if (current or {}).get("version", 0) != request.version:
+            # The cached copy may be stale; only the stored row can reject the patch
+            current = await load_onboarding_progress(supabase, user_id, role_type)
+            await onboarding_progress_cache.put(cache_key, current)
+            current_version = (current or {}).get("version", 0)
+            if current_version != request.version:
+                raise _version_conflict(current_version)
+
+        if current is None and request.step is None:
+            raise HTTPException(
+                status_code=422,
+                detail="step is required when no progress has been saved yet"
+            )
+
+        step_data = (current or {}).get("step_data") or {}
+        try:
+            if request.merge_patch is not None:
+                step_data = apply_merge_patch(step_data, request.merge_patch)
+            elif request.json_patch is not None:
+                step_data = apply_json_patch(
+                    step_data,
+                    [operation.model_dump(by_alias=True, exclude_unset=True) for operation in request.json_patch]
+                )
+        except PatchError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid patch: {e}")
+        if not isinstance(step_data, dict):
+            raise HTTPException(status_code=422, detail="Invalid patch: step_data must remain an object")
+
+        progress_data = {
+            "profile_id": user_id,
+            "role_type": role_type,
+            "current_step": request.step if request.step is not None else current["current_step"],
+            "step_data": step_data,
+            "is_complete": request.is_complete if request.is_complete is not None else (current or {}).get("is_complete", False),
+            "updated_at": datetime.utcnow().isoformat(),
+            "version": _new_version(request.version)
+        }
+
+        saved_progress = await _write_patched_progress(supabase, progress_data, request.version, current is not None)
+        await onboarding_progress_cache.put(cache_key, saved_progress)
+
+        return OnboardingProgressResponse(
+            success=True,
+            message="Onboarding progress saved successfully",
+            progress_id=saved_progress.get("id"),
+            updated_at=saved_progress.get("updated_at"),
+            current_step=saved_progress.get("current_step"),
+            step_data=saved_progress.get("step_data"),
+            version=saved_progress.get("version")
+        )
+
+    except (HTTPException, CircuitOpenError):
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to save progress: {str(e)}"
+        )
+
+
 @router.delete("/progress/{role_type}")
 async def delete_onboarding_progress(
     role_type: str,
     user_id: str = Depends(verify_token),
-    supabase: Client = Depends(get_supabase)
+    supabase: "AsyncClient" = Depends(get_supabase)
 ):
     """
     Delete user's onboarding progress for a specific role.
@@ -194,17 +456,24 @@ async def delete_onboarding_progress(
         )
 
     try:
-        response = (supabase.table("onboarding_progress")
+        # Drop buffered autosaves first so a pending flush cannot recreate the row
+        if write_behind_enabled():
+            await onboarding_write_buffer.discard(user_id, role_type)
+
+        response = await (supabase.table("onboarding_progress")
             .delete()
             .eq("profile_id", user_id)
             .eq("role_type", role_type)
             .execute())
+        await onboarding_progress_cache.delete(_progress_cache_key(user_id, role_type))
 
         return {
             "success": True,
             "message": f"Onboarding progress deleted for role: {role_type}"
         }
 
+    except CircuitOpenError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
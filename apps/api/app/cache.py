@@ -0,0 +1,334 @@
+"""
+Two-tier caching: a bounded in-process LRU in front of the shared Redis.
+
+Each worker keeps its own LRU for the hottest entries; Redis lets workers
+share entries and invalidations. Redis failures are logged and treated as
+cache misses so a cache outage never fails a request.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from app.circuit_breaker import dependency_call
+from app.db import get_redis_client
+from app.metrics import CACHE_HITS_TOTAL, CACHE_MISSES_TOTAL, CACHE_STALE_HITS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# Sentinel returned on a miss, so that None can itself be cached
+MISSING = object()
+
+# All named caches, for reporting this worker's hit/miss counters (the
+# same counts are exported to Prometheus across workers)
+cache_registry: dict[str, "TwoTierCache"] = {}
+
+
+class LRUCache:
+    """Bounded least-recently-used cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return MISSING
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TwoTierCache:
+    """
+    In-process LRU backed by a shared Redis tier.
+
+    Local entries live for at most local_ttl seconds, which bounds how long
+    another worker can keep serving an entry after it was invalidated here.
+    With local_none=False, cached None values (negative results) are kept
+    only in Redis, so deleting one takes effect on every worker at once.
+    Values must be JSON-serialisable.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 10000,
+        default_ttl: float = 300,
+        local_ttl: float = 60,
+        local_none: bool = True,
+    ):
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.local_ttl = local_ttl
+        self.local_none = local_none
+        self.local = LRUCache(max_entries)
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self._local_hit_metric = CACHE_HITS_TOTAL.labels(namespace, "local")
+        self._redis_hit_metric = CACHE_HITS_TOTAL.labels(namespace, "redis")
+        self._miss_metric = CACHE_MISSES_TOTAL.labels(namespace)
+        cache_registry[namespace] = self
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Any:
+        """Return the cached value, or MISSING"""
+        value = self.local.get(key)
+        if value is not MISSING:
+            self.local_hits += 1
+            self._local_hit_metric.inc()
+            return value
+
+        redis_client = get_redis_client()
+        if redis_client:
+            try:
+                # GET and TTL in one round trip so local copies never outlive Redis
+                with dependency_call("redis", "cache_get"):
+                    async with redis_client.pipeline(transaction=False) as pipe:
+                        pipe.get(self._redis_key(key))
+                        pipe.ttl(self._redis_key(key))
+                        raw, ttl = await pipe.execute()
+                if raw is not None:
+                    value = json.loads(raw)
+                    if ttl and ttl > 0 and self._keep_locally(value):
+                        self.local.set(key, value, min(ttl, self.local_ttl))
+                    self.redis_hits += 1
+                    self._redis_hit_metric.inc()
+                    return value
+            except Exception as e:
+                logger.warning(f"Redis cache read failed for {self.namespace}: {e}")
+
+        self.misses += 1
+        self._miss_metric.inc()
+        return MISSING
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value in both tiers; non-positive TTLs are not cached"""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        if self._keep_locally(value):
+            self.local.set(key, value, min(ttl, self.local_ttl))
+
+        redis_client = get_redis_client()
+        if redis_client:
+            try:
+                with dependency_call("redis", "cache_set"):
+                    await redis_client.set(self._redis_key(key), json.dumps(value), ex=max(1, int(ttl)))
+            except Exception as e:
+                logger.warning(f"Redis cache write failed for {self.namespace}: {e}")
+
+    def _keep_locally(self, value: Any) -> bool:
+        return value is not None or self.local_none
+
+    async def delete(self, key: str) -> None:
+        """Invalidate a key in both tiers"""
+        self.local.delete(key)
+
+        redis_client = get_redis_client()
+        if redis_client:
+            try:
+                with dependency_call("redis", "cache_delete"):
+                    await redis_client.delete(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"Redis cache delete failed for {self.namespace}: {e}")
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters for this cache on this worker"""
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "local_entries": len(self.local),
+        }
+
+
+class StaleWhileRevalidateCache(TwoTierCache):
+    """
+    Read-through cache that serves stale entries while refreshing them.
+
+    An entry is fresh for fresh_ttl seconds and may then be served for
+    another stale_ttl seconds; a stale hit returns immediately and reloads
+    the entry in the background (at most one reload per key per worker).
+    A reload does not store its result if the entry was written or deleted
+    while it ran, here or (as seen in Redis) on another worker, since it may
+    have read the row before that change.
+    """
+
+    def __init__(self, namespace: str, fresh_ttl: float, stale_ttl: float, **kwargs: Any):
+        super().__init__(namespace, default_ttl=fresh_ttl + stale_ttl, **kwargs)
+        self.fresh_ttl = fresh_ttl
+        self.stale_hits = 0
+        self._stale_hit_metric = CACHE_STALE_HITS_TOTAL.labels(namespace)
+        self._revalidating: dict[str, asyncio.Task] = {}
+        # Keys written or deleted on this worker while being revalidated
+        self._superseded: set[str] = set()
+
+    async def put(self, key: str, value: Any) -> None:
+        """Store a freshly loaded or written value"""
+        self._supersede(key)
+        await self._store(key, value)
+
+    async def delete(self, key: str) -> None:
+        self._supersede(key)
+        await super().delete(key)
+
+    def _supersede(self, key: str) -> None:
+        if key in self._revalidating:
+            self._superseded.add(key)
+
+    async def _store(self, key: str, value: Any) -> None:
+        await self.set(key, {"value": value, "fresh_until": time.time() + self.fresh_ttl})
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], flight: Any = None) -> Any:
+        """
+        Return the cached value, reloading it with loader() on a miss or in the background when stale.
+
+        With a SingleFlight, concurrent misses for a key share one load.
+        """
+        entry = await self.get(key)
+        if entry is MISSING:
+            if flight is None:
+                return await self._load(key, loader)
+            return await flight.do(key, lambda: self._load(key, loader), recheck=lambda: self.peek(key))
+
+        if entry["fresh_until"] <= time.time() and key not in self._revalidating:
+            self.stale_hits += 1
+            self._stale_hit_metric.inc()
+            task = asyncio.create_task(self._revalidate(key, loader, entry))
+            self._revalidating[key] = task
+            task.add_done_callback(lambda _: self._revalidating.pop(key, None))
+        return entry["value"]
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        await self.put(key, value)
+        return value
+
+    async def peek(self, key: str) -> Any:
+        """Return the cached value, fresh or stale, or MISSING"""
+        entry = await self.get(key)
+        return MISSING if entry is MISSING else entry["value"]
+
+    async def _revalidate(self, key: str, loader: Callable[[], Awaitable[Any]], entry: dict) -> None:
+        try:
+            value = await loader()
+            if key in self._superseded or await self._shared_entry(key) not in (entry, None):
+                logger.debug(f"Dropping background refresh of {self.namespace} superseded by a newer write")
+                return
+            await self._store(key, value)
+        except Exception as e:
+            # Keep serving the stale entry; the next stale hit retries
+            logger.warning(f"Background refresh failed for {self.namespace}: {e}")
+        finally:
+            self._superseded.discard(key)
+
+    async def _shared_entry(self, key: str) -> Any:
+        """The entry as stored in Redis, MISSING if it is gone, or None without Redis"""
+        redis_client = get_redis_client()
+        if not redis_client:
+            return None
+        try:
+            with dependency_call("redis", "cache_get"):
+                raw = await redis_client.get(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache read failed for {self.namespace}: {e}")
+            return None
+        return MISSING if raw is None else json.loads(raw)
+
+    def stats(self) -> dict[str, int]:
+        return {**super().stats(), "stale_hits": self.stale_hits}
+
+
+def get_cache_stats() -> dict[str, dict[str, int]]:
+    """Hit/miss counters for every registered cache"""
+    return {name: cache.stats() for name, cache in cache_registry.items()}
+
+
+def hash_token(token: str) -> str:
+    """Cache key for a bearer token; raw tokens are never stored"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def claims_ttl(claims: dict, max_ttl: float) -> float:
+    """TTL for cached token claims, capped at the token's own expiry"""
+    exp = claims.get("exp")
+    if exp is None:
+        return max_ttl
+    return min(max_ttl, float(exp) - time.time())
+
+
+_token_cache_settings = {
+    "max_entries": int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000")),
+    "default_ttl": float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300")),
+    "local_ttl": float(os.getenv("TOKEN_CACHE_LOCAL_TTL_SECONDS", "60")),
+}
+
+# Claims of verified Supabase access tokens (account and onboarding routes)
+supabase_token_cache = TwoTierCache("auth:supabase-token", **_token_cache_settings)
+
+# Claims of verified backend session tokens (/auth routes)
+session_token_cache = TwoTierCache("auth:session-token", **_token_cache_settings)
+
+# :User fields needed to log in and answer /auth/me, keyed by email. Entries
+# include password_hash, which only get_user_credentials returns. Unknown
+# emails are cached as None briefly, in Redis only, so that registering
+# clears them for every worker.
+user_cache = TwoTierCache(
+    "user:email",
+    max_entries=int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000")),
+    default_ttl=float(os.getenv("USER_CACHE_TTL_SECONDS", "300")),
+    local_ttl=float(os.getenv("USER_CACHE_LOCAL_TTL_SECONDS", "30")),
+    local_none=False,
+)
+USER_CACHE_NEGATIVE_TTL = float(os.getenv("USER_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+
+# ETag and updated_at of role_details rows keyed by "<profile_id>:<role_type>",
+# so If-None-Match revalidation of professional info only reads updated_at;
+# dropped when the template is updated through this API. (v2: entries used to
+# be bare ETags.)
+professional_info_etag_cache = TwoTierCache(
+    "etag:professional-info:v2",
+    max_entries=int(os.getenv("PROFESSIONAL_INFO_ETAG_CACHE_MAX_ENTRIES", "10000")),
+    default_ttl=float(os.getenv("PROFESSIONAL_INFO_ETAG_CACHE_TTL_SECONDS", "300")),
+    local_ttl=float(os.getenv("PROFESSIONAL_INFO_ETAG_CACHE_LOCAL_TTL_SECONDS", "30")),
+)
+
+# onboarding_progress rows (or None when there is none) keyed by
+# "<profile_id>:<role_type>"; written on save-progress, dropped on delete
+onboarding_progress_cache = StaleWhileRevalidateCache(
+    "onboarding:progress",
+    fresh_ttl=float(os.getenv("ONBOARDING_PROGRESS_CACHE_TTL_SECONDS", "60")),
+    stale_ttl=float(os.getenv("ONBOARDING_PROGRESS_CACHE_STALE_SECONDS", "86400")),
+    max_entries=int(os.getenv("ONBOARDING_PROGRESS_CACHE_MAX_ENTRIES", "10000")),
+    local_ttl=float(os.getenv("ONBOARDING_PROGRESS_CACHE_LOCAL_TTL_SECONDS", "30")),
+)
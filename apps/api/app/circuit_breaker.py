@@ -0,0 +1,223 @@
+"""
+Per-dependency circuit breakers for Redis, Neo4j and Supabase.
+
+Calls to a backing service go through dependency_call(), which records them
+in the dependency metrics and in that dependency's breaker:
+
+- closed: calls go through; FAILURE_THRESHOLD consecutive infrastructure
+  failures (connection errors, timeouts, 5xx) open the circuit
+- open: calls fail immediately with CircuitOpenError (a 503 with
+  Retry-After) instead of waiting out driver timeouts
+- half-open: after RESET_TIMEOUT seconds up to HALF_OPEN_MAX_CALLS trial
+  calls go through; a success closes the circuit, a failure reopens it
+
+Callers that degrade gracefully without a dependency (the Redis cache tier,
+the onboarding write buffer) catch CircuitOpenError like any other error.
+Breakers are per worker. Settings are CIRCUIT_<NAME> for every dependency
+and CIRCUIT_<DEPENDENCY>_<NAME> to override one, e.g.
+CIRCUIT_NEO4J_FAILURE_THRESHOLD.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Union
+
+import httpx
+
+from app.metrics import (
+    CIRCUIT_REJECTED_TOTAL,
+    CIRCUIT_STATE,
+    CIRCUIT_TRANSITIONS_TOTAL,
+    track_dependency,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+# Gauge values for tutorwise_circuit_state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+FailureTypes = tuple[type[BaseException], ...]
+
+
+class CircuitOpenError(Exception):
+    """A call was rejected because the dependency's circuit is open"""
+
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"{dependency} is unavailable (circuit open)")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open trial phase"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_types: Union[FailureTypes, Callable[[], FailureTypes]],
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        # A callable is resolved on first use, so the driver package whose
+        # exceptions it names is not imported before the driver itself
+        self._failure_types = failure_types
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+        self._trials = 0
+        CIRCUIT_STATE.labels(name).set(STATE_VALUES[CLOSED])
+
+    @property
+    def failure_types(self) -> FailureTypes:
+        if callable(self._failure_types):
+            self._failure_types = self._failure_types()
+        return self._failure_types
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning(f"Circuit for {self.name} {self.state} -> {state}")
+        self.state = state
+        self._trials = 0
+        self.opened_at = time.monotonic() if state == OPEN else None
+        CIRCUIT_STATE.labels(self.name).set(STATE_VALUES[state])
+        CIRCUIT_TRANSITIONS_TOTAL.labels(self.name, state).inc()
+
+    def reset(self) -> None:
+        """Close the circuit and forget past failures"""
+        self._transition(CLOSED)
+        self.consecutive_failures = 0
+        self.rejected = 0
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a trial call through"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self) -> None:
+        """
+        Admit a call or reject it.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with all trial slots taken
+        """
+        if self.state == OPEN and self.retry_after() == 0:
+            self._transition(HALF_OPEN)
+        if self.state == OPEN or (self.state == HALF_OPEN and self._trials >= self.half_open_max_calls):
+            self.rejected += 1
+            CIRCUIT_REJECTED_TOTAL.labels(self.name).inc()
+            raise CircuitOpenError(self.name, self.retry_after() or self.reset_timeout)
+        if self.state == HALF_OPEN:
+            self._trials += 1
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(OPEN)
+
+    def record_error(self, exc: BaseException) -> None:
+        """
+        Record a call that raised. Only errors that mean the dependency itself
+        is failing count; a bad query or a conflict shows it is reachable.
+        """
+        if isinstance(exc, self.failure_types):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def release_trial(self) -> None:
+        """Give back a half-open trial slot for a call that ended without a result (cancelled)"""
+        if self.state == HALF_OPEN:
+            self._trials = max(0, self._trials - 1)
+
+    def snapshot(self) -> dict[str, Any]:
+        """State for /health"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": round(self.retry_after(), 3),
+            "rejected": self.rejected,
+        }
+
+
+def _setting(dependency: str, name: str, default: str) -> str:
+    return os.getenv(f"CIRCUIT_{dependency.upper()}_{name}", os.getenv(f"CIRCUIT_{name}", default))
+
+
+def _breaker(dependency: str, failure_types: Callable[[], FailureTypes]) -> CircuitBreaker:
+    return CircuitBreaker(
+        dependency,
+        failure_types,
+        failure_threshold=int(_setting(dependency, "FAILURE_THRESHOLD", "5")),
+        reset_timeout=float(_setting(dependency, "RESET_TIMEOUT", "10")),
+        half_open_max_calls=int(_setting(dependency, "HALF_OPEN_MAX_CALLS", "1")),
+    )
+
+
+def _redis_failures() -> FailureTypes:
+    import redis.exceptions
+    return (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, OSError, asyncio.TimeoutError)
+
+
+def _neo4j_failures() -> FailureTypes:
+    from neo4j.exceptions import DriverError, ServiceUnavailable, SessionExpired
+    return (ServiceUnavailable, SessionExpired, DriverError, OSError, asyncio.TimeoutError)
+
+
+breakers = {
+    "redis": _breaker("redis", _redis_failures),
+    "neo4j": _breaker("neo4j", _neo4j_failures),
+    "supabase": _breaker("supabase", lambda: (httpx.TransportError, OSError, asyncio.TimeoutError)),
+}
+
+
+def get_breaker_states() -> dict[str, dict[str, Any]]:
+    """Breaker state for every dependency on this worker"""
+    return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+
+def retry_after_header(exc: CircuitOpenError) -> str:
+    return str(max(1, math.ceil(exc.retry_after)))
+
+
+@contextmanager
+def dependency_call(dependency: str, operation: str) -> Iterator[None]:
+    """
+    Guard and time a call to a backing service.
+
+        with dependency_call("redis", "cache_get"):
+            value = await redis_client.get(key)
+
+    Raises CircuitOpenError without running the block while the circuit is open.
+    """
+    breaker = breakers[dependency]
+    breaker.before_call()
+    try:
+        with track_dependency(dependency, operation):
+            yield
+    except Exception as e:
+        breaker.record_error(e)
+        raise
+    except BaseException:
+        breaker.release_trial()
+        raise
+    else:
+        breaker.record_success()
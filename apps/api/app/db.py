@@ -1,11 +1,23 @@
 # tutorwise-railway-backend/app/db.py
+from __future__ import annotations
+
 import asyncio
 import logging
 import os
+from typing import TYPE_CHECKING
+
+import httpx
+
+from app.circuit_breaker import breakers, dependency_call
+from app.metrics import DEPENDENCY_ERRORS_TOTAL, track_dependency
+from app.startup import startup_timer
 
-import redis
-from neo4j import GraphDatabase
-from supabase import create_client, Client
+# The client packages are imported by the connect_* functions, so importing
+# this module (and the app) does not pay for clients that are never used
+if TYPE_CHECKING:
+    import redis.asyncio as aioredis
+    from neo4j import AsyncDriver
+    from supabase import AsyncClient
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,30 +25,107 @@ logger = logging.getLogger(__name__)
 
 # Global database clients
 from typing import Optional
-redis_client: Optional[redis.Redis] = None
-neo4j_driver: Optional[GraphDatabase.driver] = None
+redis_client: Optional[aioredis.Redis] = None
+neo4j_driver: Optional[AsyncDriver] = None
+supabase_client: Optional[AsyncClient] = None
+supabase_http_client: Optional[httpx.AsyncClient] = None
 
 class DatabaseError(Exception):
     """Custom exception for database connection errors"""
     pass
 
-def get_supabase() -> Client:
+def supabase_operation(request: httpx.Request) -> str:
+    """Metric label for a Supabase request, e.g. GET rest:role_details or GET auth:user"""
+    parts = request.url.path.strip("/").split("/")
+    # /rest/v1/<table>, /auth/v1/<endpoint>
+    if len(parts) >= 3:
+        return f"{request.method} {parts[0]}:{parts[2]}"
+    return f"{request.method} {parts[0] or 'root'}"
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that records every Supabase request in the dependency
+    metrics and the supabase circuit breaker (transport errors and 5xx count
+    as failures)
     """
-    Get Supabase client for FastAPI dependency injection.
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        operation = supabase_operation(request)
+        breaker = breakers["supabase"]
+        breaker.before_call()
+        try:
+            with track_dependency("supabase", operation):
+                response = await self._transport.handle_async_request(request)
+        except Exception as e:
+            breaker.record_error(e)
+            raise
+        except BaseException:
+            breaker.release_trial()
+            raise
+        if response.status_code >= 500:
+            DEPENDENCY_ERRORS_TOTAL.labels("supabase", operation).inc()
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+def get_supabase() -> AsyncClient:
+    """
+    Get the shared Supabase client for FastAPI dependency injection.
+
+    The client is created once per worker by connect_supabase() during the
+    application lifespan and reuses a pooled keep-alive HTTP client.
 
     Returns:
-        Client: Configured Supabase client with service role key
+        AsyncClient: Shared Supabase client with service role key
 
     Raises:
-        DatabaseError: If Supabase configuration is missing
+        DatabaseError: If the Supabase client has not been initialized
     """
+    if not supabase_client:
+        raise DatabaseError("Supabase client not initialized")
+
+    return supabase_client
+
+def get_supabase_config():
+    """Get Supabase configuration from environment variables"""
     supabase_url = os.getenv("NEXT_PUBLIC_SUPABASE_URL") or os.getenv("SUPABASE_URL")
     supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
     if not supabase_url or not supabase_key:
         raise DatabaseError("Supabase configuration missing: SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
 
-    return create_client(supabase_url, supabase_key)
+    return supabase_url, supabase_key
+
+def get_supabase_http_client() -> Optional[httpx.AsyncClient]:
+    """Return the pooled HTTP client behind the shared Supabase client, if any"""
+    return supabase_http_client
+
+def get_supabase_http_limits() -> httpx.Limits:
+    """Get connection pool limits for the shared Supabase HTTP client"""
+    return httpx.Limits(
+        max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("SUPABASE_MAX_KEEPALIVE_CONNECTIONS", "10")),
+        keepalive_expiry=float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30")),
+    )
+
+def get_redis_client() -> Optional[aioredis.Redis]:
+    """Return the shared asyncio Redis client, or None if Redis is not connected"""
+    return redis_client
+
+def get_redis_pool_size() -> int:
+    """Get the maximum number of pooled Redis connections per worker"""
+    return int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+
+def get_redis_pool_timeout() -> float:
+    """Get the seconds a command waits for a free pooled Redis connection"""
+    return float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
 
 def get_redis_config():
     """Get Redis configuration from environment variables"""
@@ -77,31 +166,157 @@ def get_neo4j_config():
 
     return neo4j_uri, neo4j_user, neo4j_password
 
-async def connect_redis(max_retries: int = 3, base_delay: float = 1.0) -> Optional[redis.Redis]:
-    """Connect to Redis with retry logic"""
+def get_neo4j_driver() -> Optional[AsyncDriver]:
+    """Return the shared async Neo4j driver, or None if Neo4j is not connected"""
+    return neo4j_driver
+
+def get_neo4j_pool_config() -> dict:
+    """Get Neo4j driver pool settings from environment variables"""
+    return {
+        "max_connection_pool_size": int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", "50")),
+        "connection_acquisition_timeout": float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "10")),
+    }
+
+async def neo4j_execute_write(work, *args, **kwargs):
+    """
+    Run an async transaction function in a managed write transaction.
+
+    Raises:
+        DatabaseError: If the Neo4j driver is not initialized
+    """
+    driver = get_neo4j_driver()
+    if not driver:
+        raise DatabaseError("Neo4j driver not initialized")
+
+    with dependency_call("neo4j", getattr(work, "__name__", "write")):
+        async with driver.session() as session:
+            return await session.execute_write(work, *args, **kwargs)
+
+async def neo4j_execute_read(work, *args, **kwargs):
+    """
+    Run an async transaction function in a managed read transaction.
+
+    Raises:
+        DatabaseError: If the Neo4j driver is not initialized
+    """
+    driver = get_neo4j_driver()
+    if not driver:
+        raise DatabaseError("Neo4j driver not initialized")
+
+    with dependency_call("neo4j", getattr(work, "__name__", "read")):
+        async with driver.session() as session:
+            return await session.execute_read(work, *args, **kwargs)
+
+# Uniqueness constraints on :User; each also creates the backing range index
+# that turns email/username/id lookups into index seeks instead of label scans
+NEO4J_SCHEMA_CONSTRAINTS = {
+    "user_email_unique": "CREATE CONSTRAINT user_email_unique IF NOT EXISTS FOR (u:User) REQUIRE u.email IS UNIQUE",
+    "user_username_unique": "CREATE CONSTRAINT user_username_unique IF NOT EXISTS FOR (u:User) REQUIRE u.username IS UNIQUE",
+    "user_id_unique": "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+}
+
+async def ensure_neo4j_schema() -> list[str]:
+    """
+    Idempotently create the Neo4j constraints the application relies on.
+
+    Failures (e.g. existing duplicate data) are logged rather than raised so
+    startup can continue; /health reports any constraint that is missing.
+
+    Returns:
+        Names of the constraints that were applied successfully
+    """
+    driver = get_neo4j_driver()
+    if not driver:
+        logger.warning("Skipping Neo4j schema bootstrap: driver not initialized")
+        return []
+
+    applied = []
+    async with driver.session() as session:
+        for name, statement in NEO4J_SCHEMA_CONSTRAINTS.items():
+            try:
+                result = await session.run(statement)
+                await result.consume()
+                applied.append(name)
+            except Exception as e:
+                logger.error(f"Failed to apply Neo4j constraint {name}: {e}")
+
+    logger.info(f"Neo4j schema bootstrap applied {len(applied)}/{len(NEO4J_SCHEMA_CONSTRAINTS)} constraints")
+    return applied
+
+async def get_neo4j_schema_state() -> dict:
+    """Report the expected :User constraints and the state of their indexes"""
+    async def _read_schema(tx):
+        constraints = await tx.run("SHOW CONSTRAINTS YIELD name")
+        constraint_names = [record["name"] async for record in constraints]
+        indexes = await tx.run(
+            "SHOW INDEXES YIELD name, state, populationPercent, labelsOrTypes, properties "
+            "WHERE 'User' IN labelsOrTypes "
+            "RETURN name, state, populationPercent, properties"
+        )
+        index_rows = [record.data() async for record in indexes]
+        return constraint_names, index_rows
+
+    constraint_names, index_rows = await neo4j_execute_read(_read_schema)
+    missing = [name for name in NEO4J_SCHEMA_CONSTRAINTS if name not in constraint_names]
+    not_online = [row["name"] for row in index_rows if row["state"] != "ONLINE"]
+
+    return {
+        "status": "ok" if not missing and not not_online else "incomplete",
+        "missing_constraints": missing,
+        "indexes": index_rows,
+    }
+
+async def connect_redis(
+    max_retries: int = 3,
+    base_delay: float = 1.0,
+    max_connections: Optional[int] = None
+) -> Optional[aioredis.Redis]:
+    """
+    Connect to Redis with retry logic.
+
+    The returned client owns a connection pool bounded by max_connections
+    (REDIS_MAX_CONNECTIONS by default) that is shared by every request on
+    this worker. When every connection is in use, commands wait up to
+    REDIS_POOL_TIMEOUT seconds for one to be released before failing with
+    a ConnectionError, so bursts queue instead of erroring immediately.
+    All commands must be awaited.
+    """
     global redis_client
 
+    import redis.asyncio as aioredis
+
     try:
         redis_url = get_redis_config()
+        pool_size = max_connections or get_redis_pool_size()
 
         for attempt in range(max_retries):
+            client = None
             try:
-                client = redis.from_url(
+                pool = aioredis.BlockingConnectionPool.from_url(
                     redis_url,
+                    max_connections=pool_size,
+                    timeout=get_redis_pool_timeout(),
                     decode_responses=True,
                     socket_connect_timeout=10,
                     socket_timeout=10,
                     retry_on_timeout=True,
                     health_check_interval=30
                 )
+                # from_pool hands the pool to the client, so aclose() releases it too
+                client = aioredis.Redis.from_pool(pool)
 
                 # Test connection
-                client.ping()
+                await client.ping()
                 redis_client = client
-                logger.info("Successfully connected to Redis")
+                logger.info(f"Successfully connected to Redis (pool size {pool_size})")
                 return client
 
             except Exception as e:
+                if client is not None:
+                    try:
+                        await client.aclose()
+                    except Exception as close_error:
+                        logger.debug(f"Error closing Redis client after failed connection attempt: {close_error}")
                 if attempt == max_retries - 1:
                     logger.error(f"Failed to connect to Redis after {max_retries} attempts: {e}")
                     raise DatabaseError(f"Redis connection failed: {e}")
@@ -116,22 +331,40 @@ async def connect_redis(max_retries: int = 3, base_delay: float = 1.0) -> Option
         logger.error(f"Unexpected error connecting to Redis: {e}")
         raise DatabaseError(f"Unexpected Redis connection error: {e}")
 
-async def connect_neo4j(max_retries: int = 3, base_delay: float = 1.0) -> Optional[GraphDatabase.driver]:
-    """Connect to Neo4j with retry logic"""
+async def connect_neo4j(max_retries: int = 3, base_delay: float = 1.0) -> Optional[AsyncDriver]:
+    """
+    Connect to Neo4j with retry logic.
+
+    Creates an AsyncGraphDatabase driver whose pool is sized by
+    NEO4J_MAX_CONNECTION_POOL_SIZE and NEO4J_CONNECTION_ACQUISITION_TIMEOUT.
+    """
     global neo4j_driver
 
+    from neo4j import AsyncGraphDatabase
+
     try:
         neo4j_uri, neo4j_user, neo4j_password = get_neo4j_config()
+        pool_config = get_neo4j_pool_config()
 
         for attempt in range(max_retries):
+            driver = None
             try:
-                driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
-                driver.verify_connectivity()
+                driver = AsyncGraphDatabase.driver(
+                    neo4j_uri,
+                    auth=(neo4j_user, neo4j_password),
+                    **pool_config
+                )
+                await driver.verify_connectivity()
                 neo4j_driver = driver
                 logger.info("Successfully connected to Neo4j")
                 return driver
 
             except Exception as e:
+                if driver is not None:
+                    try:
+                        await driver.close()
+                    except Exception as close_error:
+                        logger.debug(f"Error closing Neo4j driver after failed connection attempt: {close_error}")
                 if attempt == max_retries - 1:
                     logger.error(f"Failed to connect to Neo4j after {max_retries} attempts: {e}")
                     raise DatabaseError(f"Neo4j connection failed: {e}")
@@ -146,27 +379,155 @@ async def connect_neo4j(max_retries: int = 3, base_delay: float = 1.0) -> Option
         logger.error(f"Unexpected error connecting to Neo4j: {e}")
         raise DatabaseError(f"Unexpected Neo4j connection error: {e}")
 
+async def connect_supabase() -> AsyncClient:
+    """
+    Create the shared Supabase client for this worker.
+
+    PostgREST and auth requests go through one httpx.AsyncClient with HTTP
+    keep-alive and a bounded connection pool, so requests reuse warm
+    connections instead of paying a TLS handshake each time.
+    """
+    global supabase_client, supabase_http_client
+
+    from supabase import AsyncClientOptions, acreate_client
+
+    supabase_url, supabase_key = get_supabase_config()
+
+    http_client = httpx.AsyncClient(
+        transport=InstrumentedTransport(httpx.AsyncHTTPTransport(limits=get_supabase_http_limits())),
+        timeout=float(os.getenv("SUPABASE_HTTP_TIMEOUT", "10")),
+    )
+    try:
+        options = AsyncClientOptions(
+            httpx_client=http_client,
+            auto_refresh_token=False,
+            persist_session=False,
+        )
+        client = await acreate_client(supabase_url, supabase_key, options=options)
+    except Exception as e:
+        await http_client.aclose()
+        logger.error(f"Failed to create Supabase client: {e}")
+        raise DatabaseError(f"Supabase client creation failed: {e}")
+
+    supabase_client = client
+    supabase_http_client = http_client
+    logger.info("Supabase client initialized")
+    return client
+
 async def startup_database_connections():
-    """Initialize database connections on startup"""
+    """
+    Initialize database connections on startup.
+
+    The dependencies are connected concurrently, so startup waits for the
+    slowest one (including its retries) rather than for all of them in turn.
+    Each connection is a phase of the startup timing report.
+    """
     logger.info("Initializing database connections...")
 
-    # Connect to Redis
-    try:
-        await connect_redis()
-    except DatabaseError as e:
-        logger.error(f"Redis startup failed: {e}")
-        # Continue without Redis - let health check handle the error
+    async def start_redis():
+        with startup_timer.phase("redis"):
+            try:
+                await connect_redis()
+            except DatabaseError as e:
+                logger.error(f"Redis startup failed: {e}")
+                # Continue without Redis - let health check handle the error
+
+    async def start_neo4j():
+        # Connect to Neo4j and make sure the :User constraints/indexes exist
+        with startup_timer.phase("neo4j"):
+            try:
+                await connect_neo4j()
+                await ensure_neo4j_schema()
+            except DatabaseError as e:
+                logger.error(f"Neo4j startup failed: {e}")
+                # Continue without Neo4j - let health check handle the error
+
+    async def start_supabase():
+        # Create the shared Supabase client
+        with startup_timer.phase("supabase"):
+            try:
+                await connect_supabase()
+            except DatabaseError as e:
+                logger.error(f"Supabase startup failed: {e}")
+
+    await asyncio.gather(start_redis(), start_neo4j(), start_supabase())
+
+def import_client_packages():
+    """
+    Import the client packages now instead of on first connection.
+
+    For a preloading gunicorn master, so that forked workers inherit them.
+    """
+    with startup_timer.phase("client_imports"):
+        import neo4j  # noqa: F401
+        import postgrest.exceptions  # noqa: F401
+        import redis.asyncio  # noqa: F401
+        import supabase  # noqa: F401
+        # httpx imports its transport and HTTP/2 stack when the first client is built
+        import h2.connection  # noqa: F401
+        import httpcore  # noqa: F401
+
+def get_pool_warmup_connections() -> int:
+    return int(os.getenv("POOL_WARMUP_CONNECTIONS", "2"))
+
+async def warm_up_connections(connections: Optional[int] = None):
+    """
+    Open pooled connections to every connected dependency before serving.
+
+    Runs `connections` Redis pings, Neo4j verify_connectivity() calls and
+    Supabase auth health requests concurrently (POOL_WARMUP_CONNECTIONS by
+    default), so that many connections are open, authenticated and idle in
+    each pool. A fresh or recycled worker then serves its first requests
+    without paying for TCP/TLS handshakes. Failures are logged and ignored;
+    the circuit breakers and health checks deal with unavailable services.
+    """
+    count = get_pool_warmup_connections() if connections is None else connections
+    if count <= 0:
+        return
+
+    calls = []
+    if redis_client:
+        calls += [redis_client.ping() for _ in range(count)]
+    if neo4j_driver:
+        calls += [neo4j_driver.verify_connectivity() for _ in range(count)]
+    if supabase_http_client:
+        supabase_url, supabase_key = get_supabase_config()
+        health_url = f"{supabase_url.rstrip('/')}/auth/v1/health"
+        calls += [supabase_http_client.get(health_url, headers={"apikey": supabase_key}) for _ in range(count)]
+    if not calls:
+        return
 
-    # Connect to Neo4j
     try:
-        await connect_neo4j()
-    except DatabaseError as e:
-        logger.error(f"Neo4j startup failed: {e}")
-        # Continue without Neo4j - let health check handle the error
+        results = await asyncio.wait_for(
+            asyncio.gather(*calls, return_exceptions=True),
+            timeout=float(os.getenv("POOL_WARMUP_TIMEOUT", "5")),
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Connection pool warm-up timed out")
+        return
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        logger.warning(f"{len(failures)} of {len(calls)} warm-up calls failed, first: {failures[0]}")
+    else:
+        logger.info(f"Warmed up {count} connection(s) per dependency")
+
+def reset_connections():
+    """
+    Forget clients inherited from a parent process, without closing them.
+
+    Called in a freshly forked gunicorn worker: its pools must be its own,
+    and closing the inherited ones would close sockets the parent still uses.
+    """
+    global redis_client, neo4j_driver, supabase_client, supabase_http_client
+
+    redis_client = None
+    neo4j_driver = None
+    supabase_client = None
+    supabase_http_client = None
 
 async def shutdown_database_connections():
     """Clean up database connections on shutdown"""
-    global redis_client, neo4j_driver
+    global redis_client, neo4j_driver, supabase_client, supabase_http_client
 
     logger.info("Shutting down database connections...")
 
@@ -179,10 +540,19 @@ async def shutdown_database_connections():
 
     if neo4j_driver:
         try:
-            neo4j_driver.close()
+            await neo4j_driver.close()
             logger.info("Neo4j connection closed")
         except Exception as e:
             logger.error(f"Error closing Neo4j connection: {e}")
 
+    if supabase_http_client:
+        try:
+            await supabase_http_client.aclose()
+            logger.info("Supabase HTTP client closed")
+        except Exception as e:
+            logger.error(f"Error closing Supabase HTTP client: {e}")
+
     redis_client = None
     neo4j_driver = None
+    supabase_client = None
+    supabase_http_client = None
@@ -0,0 +1,49 @@
+"""
+Strong ETags and If-None-Match handling for JSON documents.
+
+ETags are derived from a document's updated_at and a hash of its canonical
+JSON, so any change to the stored row yields a new validator. Responses
+carry Cache-Control: private, no-cache so browsers keep the body but
+revalidate it on every use, which turns repeat fetches into 304s.
+"""
+import hashlib
+import json
+from typing import Any, Mapping, Optional
+
+from fastapi import Response
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def compute_etag(document: Mapping[str, Any]) -> str:
+    """Strong ETag for a JSON document"""
+    canonical = json.dumps(document, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+    updated_at = str(document.get("updated_at") or "")
+    stamp = hashlib.sha256(updated_at.encode("utf-8")).hexdigest()[:8]
+    return f'"{stamp}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches the ETag.
+
+    If-None-Match uses weak comparison (RFC 9110 13.1.2), so W/ prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def set_validator(response: Response, etag: str) -> None:
+    """Attach the ETag to a 200 response"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    """304 response for a matching If-None-Match"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -0,0 +1,91 @@
+"""
+Bounded executor for bcrypt password hashing.
+
+bcrypt deliberately costs tens of milliseconds of CPU per call. Running it
+on the event loop stalls every other request on the worker, so hashes and
+verifications run on a small dedicated thread pool (bcrypt releases the GIL
+while hashing). Admission is capped at max_workers running plus max_queue
+waiting; beyond that requests are rejected immediately with 503 rather
+than queueing without bound.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, status
+
+from app.metrics import (
+    BCRYPT_DURATION_SECONDS,
+    BCRYPT_PENDING,
+    BCRYPT_QUEUE_WAIT_SECONDS,
+    BCRYPT_REJECTED_TOTAL,
+    track_dependency,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BcryptExecutor:
+    """Run bcrypt work off the event loop with a concurrency and queue-depth cap."""
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run func(*args) on the hashing pool.
+
+        Raises:
+            HTTPException: 503 with Retry-After when the queue is full
+        """
+        if self._pending >= self.max_pending:
+            BCRYPT_REJECTED_TOTAL.labels(operation).inc()
+            logger.warning(f"Rejecting bcrypt {operation}: {self._pending} operations pending")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        submitted_at = time.perf_counter()
+
+        def timed() -> Any:
+            started_at = time.perf_counter()
+            BCRYPT_QUEUE_WAIT_SECONDS.labels(operation).observe(started_at - submitted_at)
+            try:
+                return func(*args)
+            finally:
+                BCRYPT_DURATION_SECONDS.labels(operation).observe(time.perf_counter() - started_at)
+
+        self._pending += 1
+        BCRYPT_PENDING.set(self._pending)
+        try:
+            loop = asyncio.get_running_loop()
+            with track_dependency("bcrypt", operation):
+                return await loop.run_in_executor(self._get_executor(), timed)
+        finally:
+            self._pending -= 1
+            BCRYPT_PENDING.set(self._pending)
+
+    def shutdown(self) -> None:
+        """Stop the hashing threads once in-flight work completes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+bcrypt_executor = BcryptExecutor(
+    max_workers=int(os.getenv("BCRYPT_MAX_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.getenv("BCRYPT_MAX_QUEUE", "32")),
+)
@@ -0,0 +1,163 @@
+"""
+Event-loop lag monitoring.
+
+A heartbeat coroutine sleeps for LOOP_LAG_SAMPLE_INTERVAL and records how
+late it wakes up; that lateness is time the loop spent running something
+else without yielding, i.e. blocking calls. Lag is exported as a histogram
+and as rolling percentiles.
+
+A watchdog thread notices when the heartbeat has been silent for longer
+than LOOP_LAG_THRESHOLD, which means the loop is blocked right now. It then
+captures the loop thread's stack and the route of the request whose task
+is running, so the offending call can be found while it is still on the
+stack.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Optional
+
+from starlette.types import Scope
+
+from app.metrics import (
+    EVENT_LOOP_LAG_QUANTILE_SECONDS,
+    EVENT_LOOP_LAG_SECONDS,
+    EVENT_LOOP_STALLS_TOTAL,
+)
+
+logger = logging.getLogger(__name__)
+
+LAG_QUANTILES = (0.5, 0.9, 0.99)
+
+class LoopLagMonitor:
+    """Measures event-loop lag and attributes stalls to the executing route"""
+
+    def __init__(self, interval: float, threshold: float, window: int, max_stalls: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples: deque[float] = deque(maxlen=window)
+        self.stalls: deque[dict[str, Any]] = deque(maxlen=max_stalls)
+        # Task handling each in-flight request -> its ASGI scope (see MetricsMiddleware)
+        self.active_requests: dict[asyncio.Task, Scope] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def request_started(self, scope: Scope) -> None:
+        task = asyncio.current_task()
+        if task is not None:
+            self.active_requests[task] = scope
+
+    def request_finished(self) -> None:
+        task = asyncio.current_task()
+        if task is not None:
+            self.active_requests.pop(task, None)
+
+    def record_lag(self, lag: float) -> None:
+        """Record one heartbeat's lag and refresh the rolling percentiles"""
+        EVENT_LOOP_LAG_SECONDS.observe(lag)
+        self.samples.append(lag)
+        ordered = sorted(self.samples)
+        for quantile in LAG_QUANTILES:
+            index = min(len(ordered) - 1, int(quantile * len(ordered)))
+            EVENT_LOOP_LAG_QUANTILE_SECONDS.labels(str(quantile)).set(ordered[index])
+
+    def percentiles(self) -> dict[str, float]:
+        """Rolling lag percentiles in seconds over the sample window"""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        return {
+            f"p{int(q * 100)}": round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 6)
+            for q in LAG_QUANTILES
+        }
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._last_beat = time.monotonic()
+            self.record_lag(max(0.0, loop.time() - expected))
+
+    def _current_route(self) -> str:
+        """Route of the request whose task the loop is running (watchdog thread)"""
+        from app.middleware import route_template
+
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return "<loop>"
+        scope = self.active_requests.get(task)
+        if scope is None:
+            return "<background>"
+        return f"{scope['method']} {route_template(scope)}"
+
+    def capture_stall(self, blocked_for: float) -> dict[str, Any]:
+        """Record the loop thread's current stack and route (watchdog thread)"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+        route = self._current_route()
+
+        EVENT_LOOP_STALLS_TOTAL.labels(route).inc()
+        stall = {
+            "timestamp": time.time(),
+            "route": route,
+            "blocked_for_seconds": round(blocked_for, 3),
+            "stack": stack,
+        }
+        self.stalls.append(stall)
+        logger.warning(f"Event loop blocked for {blocked_for:.3f}s in {route}:\n{stack}")
+        return stall
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stopping.wait(self.threshold / 2):
+            last_beat = self._last_beat
+            blocked_for = time.monotonic() - last_beat - self.interval
+            # One report per stall: the next report needs a new heartbeat first
+            if blocked_for > self.threshold and reported_beat != last_beat:
+                reported_beat = last_beat
+                try:
+                    self.capture_stall(blocked_for)
+                except Exception as e:
+                    logger.error(f"Failed to capture event loop stall: {e}")
+
+    def start(self) -> None:
+        """Start the heartbeat on the running loop and the watchdog thread"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the heartbeat and the watchdog thread"""
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+loop_monitor = LoopLagMonitor(
+    interval=float(os.getenv("LOOP_LAG_SAMPLE_INTERVAL", "0.1")),
+    threshold=float(os.getenv("LOOP_LAG_THRESHOLD", "0.25")),
+    window=int(os.getenv("LOOP_LAG_WINDOW", "600")),
+)
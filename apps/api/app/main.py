@@ -1,16 +1,36 @@
 # tutorwise-railway-backend/app/main.py
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from app.startup import startup_timer
 
-# Import API routes
-from app.api import dev_routes, health, account, onboarding
+with startup_timer.phase("imports"):
+    from fastapi import FastAPI, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse
 
-# Import database management functions
-from app.db import shutdown_database_connections, startup_database_connections
+    # Import API routes
+    from app.api import dev_routes, health, account, onboarding, metrics, debug
+
+    # Email/password auth backed by Neo4j, mounted only with a signing key
+    from app.api import auth
+
+    # Import database management functions
+    from app.db import (
+        DatabaseError,
+        shutdown_database_connections,
+        startup_database_connections,
+        warm_up_connections,
+    )
+    from app.api.health import health_monitor
+    from app.circuit_breaker import CircuitOpenError, retry_after_header
+    from app.hashing import bcrypt_executor
+    from app.loop_monitor import loop_monitor
+    from app.onboarding_buffer import onboarding_write_buffer
+    from app.middleware import MetricsMiddleware, ProfilingMiddleware
+    from app.serialization import FastJSONRoute
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,14 +47,30 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up Tutorwise AI Backend...")
     try:
-        await startup_database_connections()
+        with startup_timer.phase("connections"):
+            await startup_database_connections()
         logger.info("Database connections initialized")
+        # Before the worker accepts connections, so first requests find warm pools
+        with startup_timer.phase("warm_up"):
+            await warm_up_connections()
     except Exception as e:
         logger.error(f"Failed to initialize database connections: {e}")
         # Continue startup - let health checks handle the errors
 
+    # Probe dependencies in the background; health endpoints serve the snapshot
+    with startup_timer.phase("background_tasks"):
+        health_monitor.start()
+        loop_monitor.start()
+        onboarding_write_buffer.start()
+    startup_timer.mark_ready()
+
     yield
 
+    # Write out buffered autosaves while the connections are still open
+    await onboarding_write_buffer.stop()
+    await loop_monitor.stop()
+    await health_monitor.stop()
+
     # Shutdown
     logger.info("Shutting down Tutorwise AI Backend...")
     try:
@@ -43,12 +79,33 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
 
+    bcrypt_executor.shutdown()
+
+setup_started = time.perf_counter()
 app = FastAPI(
     title="Tutorwise AI Backend",
     description="API for Tutorwise services and AI agents.",
     version="1.0.0",
     lifespan=lifespan
 )
+# orjson request parsing and responses for routes defined on the app itself
+app.router.route_class = FastJSONRoute
+
+@app.exception_handler(DatabaseError)
+async def database_error_handler(request: Request, exc: DatabaseError):
+    """Report unavailable backing services as 503 instead of a bare 500"""
+    logger.error(f"Database unavailable for {request.url.path}: {exc}")
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """Fail fast with 503 while a dependency's circuit is open"""
+    logger.warning(f"Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": retry_after_header(exc)},
+    )
 
 # Get CORS origins from environment
 allowed_origins = os.getenv("ALLOWED_ORIGINS")
@@ -67,11 +124,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ProfilingMiddleware)
+# Added last so it is outermost and times the whole middleware stack
+app.add_middleware(MetricsMiddleware)
+startup_timer.record("app", setup_started)
+
 # Include routers
-app.include_router(health.router)
-app.include_router(dev_routes.router)
-app.include_router(account.router)
-app.include_router(onboarding.router, prefix="/api/onboarding", tags=["onboarding"])
+with startup_timer.phase("routes"):
+    app.include_router(health.router)
+    app.include_router(metrics.router)
+    app.include_router(debug.router)
+    app.include_router(dev_routes.router)
+    app.include_router(account.router)
+    app.include_router(onboarding.router, prefix="/api/onboarding", tags=["onboarding"])
+
+    # /auth/register, /auth/login and /auth/me, signed with JWT_SECRET_KEY.
+    # Without a key only these routes are left out; the rest of the API does
+    # not use it
+    if auth.SECRET_KEY:
+        app.include_router(auth.router)
+    else:
+        logger.warning("JWT_SECRET_KEY not set - /auth routes are disabled")
 
 @app.get("/", tags=["Root"])
 def read_root():
@@ -0,0 +1,178 @@
+"""
+Prometheus metrics for the Tutorwise backend.
+
+Metric objects are defined here so that every module records into the same
+registry; they are exposed on GET /metrics.
+
+Under gunicorn every worker has its own copy of these objects. When
+PROMETHEUS_MULTIPROC_DIR is set (see the Dockerfile and gunicorn.conf.py)
+prometheus_client writes values to per-process files in that directory and
+GET /metrics aggregates them, so any worker can answer a scrape for all of
+them. Gauges therefore declare how they are combined across workers.
+"""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10)
+
+# HTTP requests, recorded by app.middleware.MetricsMiddleware. The route label
+# is the route template (e.g. /api/onboarding/progress/{role_type}), never the
+# raw path, so label cardinality is bounded by the number of routes.
+HTTP_REQUESTS_TOTAL = Counter(
+    "tutorwise_http_requests_total",
+    "HTTP requests by route and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION_SECONDS = Histogram(
+    "tutorwise_http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "tutorwise_http_requests_in_progress",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum",
+)
+
+# Calls to backing services, recorded through track_dependency()
+DEPENDENCY_DURATION_SECONDS = Histogram(
+    "tutorwise_dependency_duration_seconds",
+    "Time spent in a call to a backing service",
+    ["dependency", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+DEPENDENCY_ERRORS_TOTAL = Counter(
+    "tutorwise_dependency_errors_total",
+    "Calls to a backing service that raised or returned a server error",
+    ["dependency", "operation"],
+)
+
+# Event-loop lag, recorded by app.loop_monitor
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "tutorwise_event_loop_lag_seconds",
+    "How late the event loop ran a heartbeat scheduled with asyncio.sleep",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+EVENT_LOOP_LAG_QUANTILE_SECONDS = Gauge(
+    "tutorwise_event_loop_lag_quantile_seconds",
+    "Event-loop lag percentiles over the recent sample window (worst worker)",
+    ["quantile"],
+    multiprocess_mode="max",
+)
+EVENT_LOOP_STALLS_TOTAL = Counter(
+    "tutorwise_event_loop_stalls_total",
+    "Times the event loop was blocked longer than LOOP_LAG_THRESHOLD, by executing route",
+    ["route"],
+)
+
+# Onboarding autosave write-behind, see app.onboarding_buffer
+ONBOARDING_BUFFERED_SAVES_TOTAL = Counter(
+    "tutorwise_onboarding_buffered_saves_total",
+    "save-progress calls acknowledged from the Redis write-behind buffer",
+)
+ONBOARDING_FLUSHED_ROWS_TOTAL = Counter(
+    "tutorwise_onboarding_flushed_rows_total",
+    "Buffered onboarding progress rows written to Supabase (rows skipped as not newer are not counted)",
+)
+
+# Two-tier caches, see app.cache; the cache label is the cache's namespace
+CACHE_HITS_TOTAL = Counter(
+    "tutorwise_cache_hits_total",
+    "Cache reads answered from the in-process LRU (local) or from Redis",
+    ["cache", "tier"],
+)
+CACHE_MISSES_TOTAL = Counter(
+    "tutorwise_cache_misses_total",
+    "Cache reads found in neither tier",
+    ["cache"],
+)
+CACHE_STALE_HITS_TOTAL = Counter(
+    "tutorwise_cache_stale_hits_total",
+    "Stale entries served while they were refreshed in the background",
+    ["cache"],
+)
+
+# Request coalescing, see app.singleflight
+SINGLEFLIGHT_CALLS_TOTAL = Counter(
+    "tutorwise_singleflight_calls_total",
+    "Coalesced reads by outcome: executed (made the backend call), coalesced "
+    "(shared another caller's call on this worker) or waited_remote (waited for "
+    "another worker's call and reused its cached result)",
+    ["flight", "outcome"],
+)
+
+# Circuit breakers, see app.circuit_breaker
+CIRCUIT_STATE = Gauge(
+    "tutorwise_circuit_state",
+    "Circuit breaker state per dependency: 0 closed, 1 half-open, 2 open (worst worker)",
+    ["dependency"],
+    multiprocess_mode="max",
+)
+CIRCUIT_TRANSITIONS_TOTAL = Counter(
+    "tutorwise_circuit_transitions_total",
+    "Circuit breaker state changes, by the state entered",
+    ["dependency", "state"],
+)
+CIRCUIT_REJECTED_TOTAL = Counter(
+    "tutorwise_circuit_rejected_total",
+    "Calls failed fast because the dependency's circuit was open",
+    ["dependency"],
+)
+
+# Auth rate limiting, see app.rate_limit
+RATE_LIMITED_TOTAL = Counter(
+    "tutorwise_rate_limited_total",
+    "Requests refused by a rate limit, by limit and where the decision was made "
+    "(redis, fast_path for keys already known to be over the limit, local without Redis)",
+    ["limit", "source"],
+)
+
+# Password hashing (bcrypt) runs on a bounded executor, see app.hashing
+BCRYPT_QUEUE_WAIT_SECONDS = Histogram(
+    "tutorwise_bcrypt_queue_wait_seconds",
+    "Time a bcrypt operation waited for a free hashing thread",
+    ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+BCRYPT_DURATION_SECONDS = Histogram(
+    "tutorwise_bcrypt_duration_seconds",
+    "Time a hashing thread spent on a single bcrypt hash or verify, excluding queue wait",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2),
+)
+BCRYPT_PENDING = Gauge(
+    "tutorwise_bcrypt_pending",
+    "bcrypt operations running or queued",
+    multiprocess_mode="livesum",
+)
+BCRYPT_REJECTED_TOTAL = Counter(
+    "tutorwise_bcrypt_rejected_total",
+    "bcrypt operations rejected because the hashing queue was full",
+    ["operation"],
+)
+
+
+@contextmanager
+def track_dependency(dependency: str, operation: str) -> Iterator[None]:
+    """
+    Time the enclosed call to a backing service.
+
+    Usable around awaits:
+
+        with track_dependency("redis", "get"):
+            value = await redis_client.get(key)
+
+    Exceptions are counted in DEPENDENCY_ERRORS_TOTAL and re-raised.
+    """
+    started_at = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        DEPENDENCY_ERRORS_TOTAL.labels(dependency, operation).inc()
+        raise
+    finally:
+        DEPENDENCY_DURATION_SECONDS.labels(dependency, operation).observe(time.perf_counter() - started_at)
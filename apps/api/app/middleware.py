@@ -0,0 +1,118 @@
+"""
+ASGI middleware for the Tutorwise backend.
+
+Written as plain ASGI callables rather than BaseHTTPMiddleware so they add
+no extra task or response buffering per request.
+"""
+import asyncio
+import logging
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import (
+    HTTP_REQUEST_DURATION_SECONDS,
+    HTTP_REQUESTS_IN_PROGRESS,
+    HTTP_REQUESTS_TOTAL,
+)
+from app.loop_monitor import loop_monitor
+from app.profiling import PROFILE_HEADER, PROFILE_URL_HEADER, request_profiler
+
+logger = logging.getLogger(__name__)
+
+# Label used for requests that match no route (404s, scanners), so arbitrary
+# paths never become label values
+UNMATCHED_ROUTE = "<unmatched>"
+
+def route_template(scope: Scope) -> str:
+    """
+    Return the path template of the route that handled scope.
+
+    Only meaningful once the router has run. FastAPI resolves routes of
+    included routers lazily and records the full (prefixed) template in its
+    own scope entry; scope["route"] alone carries the router-relative path.
+    """
+    fastapi_scope = scope.get("fastapi")
+    route = fastapi_scope.get("effective_route_context") if isinstance(fastapi_scope, dict) else None
+    if route is None:
+        route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE
+
+class MetricsMiddleware:
+    """Record request count, in-flight requests and latency per route"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        # Lets the loop lag watchdog attribute a stall to this request's route
+        loop_monitor.request_started(scope)
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started_at
+            loop_monitor.request_finished()
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            method = scope["method"]
+            route = route_template(scope)
+            HTTP_REQUEST_DURATION_SECONDS.labels(method, route).observe(duration)
+            HTTP_REQUESTS_TOTAL.labels(method, route, str(status_code)).inc()
+
+class ProfilingMiddleware:
+    """
+    Run selected requests under the statistical profiler (see app.profiling).
+
+    The profiler stops when the response starts, so the X-Profile-Url header
+    can be set; the profile is rendered and written off the event loop after
+    the response has been sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith("/debug/"):
+            await self.app(scope, receive, send)
+            return
+
+        trigger = request_profiler.should_profile(Headers(scope=scope).get(PROFILE_HEADER))
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        name = request_profiler.new_profile_name(scope["method"])
+        profiler = request_profiler.start(trigger)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                if profiler.is_running:
+                    profiler.stop()
+                MutableHeaders(scope=message)[PROFILE_URL_HEADER] = f"/debug/profiles/{name}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler.is_running:
+                profiler.stop()
+            request_profiler.finish(trigger)
+            try:
+                await asyncio.to_thread(request_profiler.write, name, profiler.last_session)
+                logger.info(f"Wrote {trigger} profile for {scope['method']} {scope['path']} to {name}")
+            except Exception as e:
+                logger.warning(f"Failed to write request profile {name}: {e}")
@@ -0,0 +1,367 @@
+"""
+Write-behind buffering for onboarding autosave.
+
+With ONBOARDING_WRITE_BEHIND enabled, save-progress writes the progress row
+to a Redis hash and returns; each (profile_id, role_type) has one field, so
+repeated autosaves of the same wizard coalesce into the latest row. A
+background task on every worker upserts the buffered rows to Supabase in
+batches every ONBOARDING_FLUSH_INTERVAL seconds. A row is flushed
+immediately when its step changes or the wizard completes, and everything
+left is flushed on shutdown.
+
+Every flush, periodic or immediate, holds a Redis lock, so only one flush
+runs at a time across workers, and discard() waits for it so a flush in
+flight cannot recreate deleted progress. The lock is renewed before every
+batch, so it does not expire under a long flush. Rows are written through
+upsert_onboarding_progress_if_newer (migration 431), which skips rows whose
+version is not newer than the stored one. A row is only removed from the
+hash if it was not overwritten while it was being flushed, so a flush never
+drops a newer autosave. Until a row is flushed, reads of the same progress
+are served from the buffer.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from app.circuit_breaker import dependency_call
+from app.db import get_redis_client, get_supabase
+from app.metrics import ONBOARDING_BUFFERED_SAVES_TOTAL, ONBOARDING_FLUSHED_ROWS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "onboarding:pending"
+FLUSH_LOCK_KEY = "onboarding:flush-lock"
+STEP_KEY_PREFIX = "onboarding:step:"
+FLUSH_LOCK_POLL_SECONDS = 0.05
+# How long the last seen step of a wizard is remembered for step-change detection
+STEP_TTL_SECONDS = 24 * 3600
+
+class VersionConflict(Exception):
+    """The buffered row no longer has the version a patch was based on"""
+
+    def __init__(self, current_version: Optional[int]):
+        super().__init__(f"Onboarding progress is at version {current_version}")
+        self.current_version = current_version
+
+def write_behind_enabled() -> bool:
+    return os.getenv("ONBOARDING_WRITE_BEHIND", "false").lower() == "true"
+
+def _field(profile_id: str, role_type: str) -> str:
+    return f"{profile_id}:{role_type}"
+
+class OnboardingWriteBuffer:
+    """Buffers onboarding_progress upserts in Redis and flushes them in batches"""
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._immediate: set[asyncio.Task] = set()
+
+    async def save(
+        self,
+        progress_data: dict[str, Any],
+        expected_version: Optional[int] = None,
+        stored_version: Optional[Callable[[], Awaitable[int]]] = None
+    ) -> bool:
+        """
+        Buffer a progress row.
+
+        With expected_version, the row is only buffered if the currently
+        buffered row still has that version or, when nothing is buffered,
+        if stored_version() (the version of the row in Supabase, 0 if there
+        is none) returns it. Any cached copy of the stored row may predate a
+        flush by another worker, so stored_version must read Supabase.
+
+        Returns False when Redis is unavailable, in which case the caller
+        must write the row to Supabase itself.
+
+        Raises:
+            VersionConflict: If the buffered row has a different version
+        """
+        redis_client = get_redis_client()
+        if not redis_client:
+            return False
+
+        field = _field(progress_data["profile_id"], progress_data["role_type"])
+        try:
+            with dependency_call("redis", "onboarding_buffer"):
+                if expected_version is None:
+                    async with redis_client.pipeline(transaction=True) as pipe:
+                        self._queue_save(pipe, field, progress_data)
+                        _, previous_step = await pipe.execute()
+                else:
+                    previous_step = await self._save_if_version(
+                        redis_client, field, progress_data, expected_version, stored_version
+                    )
+        except VersionConflict:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to buffer onboarding progress, writing through: {e}")
+            return False
+
+        ONBOARDING_BUFFERED_SAVES_TOTAL.inc()
+        if progress_data["is_complete"] or previous_step is None or int(previous_step) != progress_data["current_step"]:
+            task = asyncio.create_task(self._flush_now(field))
+            self._immediate.add(task)
+            task.add_done_callback(self._immediate.discard)
+        return True
+
+    def _queue_save(self, pipe: Any, field: str, progress_data: dict[str, Any]) -> None:
+        pipe.hset(PENDING_KEY, field, json.dumps(progress_data))
+        pipe.set(STEP_KEY_PREFIX + field, progress_data["current_step"], ex=STEP_TTL_SECONDS, get=True)
+
+    async def _save_if_version(
+        self,
+        redis_client: Any,
+        field: str,
+        progress_data: dict[str, Any],
+        expected_version: int,
+        stored_version: Callable[[], Awaitable[int]]
+    ) -> Optional[str]:
+        """
+        Buffer a row under WATCH if the current row is still at expected_version.
+
+        The current row is the buffered one or, when nothing is buffered, the
+        stored one. The stored version is read under the WATCH, so a row
+        buffered and flushed by another worker meanwhile is noticed. A
+        WatchError means some save or flush touched the buffer meanwhile; the
+        check is simply repeated.
+        """
+        from redis.exceptions import WatchError
+
+        for _ in range(5):
+            async with redis_client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(PENDING_KEY)
+                    raw = await pipe.hget(PENDING_KEY, field)
+                    if raw is not None:
+                        current_version = json.loads(raw).get("version")
+                    else:
+                        current_version = await stored_version()
+                    if current_version != expected_version:
+                        raise VersionConflict(current_version)
+                    pipe.multi()
+                    self._queue_save(pipe, field, progress_data)
+                    _, previous_step = await pipe.execute()
+                    return previous_step
+                except WatchError:
+                    continue
+        raise VersionConflict(None)
+
+    async def get(self, profile_id: str, role_type: str) -> Optional[dict[str, Any]]:
+        """Return the buffered (not yet flushed) row for a wizard, if any"""
+        redis_client = get_redis_client()
+        if not redis_client:
+            return None
+        try:
+            with dependency_call("redis", "onboarding_buffer"):
+                raw = await redis_client.hget(PENDING_KEY, _field(profile_id, role_type))
+        except Exception as e:
+            logger.warning(f"Failed to read buffered onboarding progress: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    async def discard(self, profile_id: str, role_type: str) -> None:
+        """
+        Drop a buffered row so a later flush cannot resurrect deleted progress.
+
+        Waits for a flush in progress to finish first, since it may already
+        have read the row.
+
+        Raises:
+            TimeoutError: If the flush lock could not be taken
+        """
+        redis_client = get_redis_client()
+        if not redis_client:
+            return
+        field = _field(profile_id, role_type)
+        async with self._flush_lock(redis_client, wait=self.interval) as token:
+            if token is None:
+                raise TimeoutError("Onboarding progress is being flushed; try again")
+            with dependency_call("redis", "onboarding_buffer"):
+                async with redis_client.pipeline(transaction=True) as pipe:
+                    pipe.hdel(PENDING_KEY, field)
+                    pipe.delete(STEP_KEY_PREFIX + field)
+                    await pipe.execute()
+
+    def _lock_ttl(self) -> int:
+        return max(1, int(self.interval * 6))
+
+    @asynccontextmanager
+    async def _flush_lock(self, redis_client: Any, wait: float = 0) -> AsyncIterator[Optional[str]]:
+        """
+        Hold the buffer's flush lock, waiting up to `wait` seconds for it.
+
+        Yields the lock's token, or None if the lock was not taken. The lock
+        expires after _lock_ttl() seconds unless renewed with the token.
+        """
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+        while True:
+            with dependency_call("redis", "onboarding_flush_lock"):
+                locked = await redis_client.set(FLUSH_LOCK_KEY, token, nx=True, ex=self._lock_ttl())
+            if locked or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(FLUSH_LOCK_POLL_SECONDS)
+
+        try:
+            yield token if locked else None
+        finally:
+            if locked:
+                try:
+                    with dependency_call("redis", "onboarding_flush_lock"):
+                        if await redis_client.get(FLUSH_LOCK_KEY) == token:
+                            await redis_client.delete(FLUSH_LOCK_KEY)
+                except Exception as e:
+                    logger.warning(f"Failed to release onboarding flush lock: {e}")
+
+    async def _renew_flush_lock(self, redis_client: Any, token: str) -> bool:
+        """Extend the flush lock by _lock_ttl() seconds; False if it is no longer held with token"""
+        from redis.exceptions import WatchError
+
+        with dependency_call("redis", "onboarding_flush_lock"):
+            async with redis_client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(FLUSH_LOCK_KEY)
+                    if await pipe.get(FLUSH_LOCK_KEY) != token:
+                        return False
+                    pipe.multi()
+                    pipe.expire(FLUSH_LOCK_KEY, self._lock_ttl())
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    # Expired and taken by another flush or discard meanwhile
+                    return False
+
+    async def flush(self, fields: Optional[list[str]] = None, wait: float = 0) -> int:
+        """
+        Upsert buffered rows to Supabase and remove the ones that did not change meanwhile.
+
+        Flushes the given fields, or the whole buffer, under the flush lock,
+        waiting up to `wait` seconds for another flush to finish. Returns the
+        number of rows written to Supabase (rows that were not newer than the
+        stored ones are not counted), 0 if the lock stayed taken.
+        """
+        redis_client = get_redis_client()
+        if not redis_client:
+            return 0
+
+        async with self._flush_lock(redis_client, wait) as token:
+            if token is None:
+                return 0
+            return await self._flush_locked(redis_client, fields, token)
+
+    async def _flush_locked(self, redis_client: Any, fields: Optional[list[str]], token: str) -> int:
+        with dependency_call("redis", "onboarding_buffer"):
+            if fields is None:
+                pending = await redis_client.hgetall(PENDING_KEY)
+            else:
+                values = await redis_client.hmget(PENDING_KEY, fields)
+                pending = {field: value for field, value in zip(fields, values, strict=True) if value is not None}
+        if not pending:
+            return 0
+
+        supabase = get_supabase()
+        items = list(pending.items())
+        written = 0
+        for start in range(0, len(items), self.batch_size):
+            # Each batch gets a full lock TTL, however long the flush runs, so
+            # discard() cannot take the lock while rows it may delete are in flight
+            if not await self._renew_flush_lock(redis_client, token):
+                logger.warning("Lost the onboarding flush lock; leaving the remaining rows for the next flush")
+                break
+            batch = dict(items[start:start + self.batch_size])
+            # Rows not newer than the stored version are skipped by the
+            # function, which returns how many it wrote
+            response = await supabase.rpc(
+                "upsert_onboarding_progress_if_newer",
+                {"rows": [json.loads(value) for value in batch.values()]}
+            ).execute()
+            batch_written = int(response.data or 0)
+            written += batch_written
+            ONBOARDING_FLUSHED_ROWS_TOTAL.inc(batch_written)
+            await self._remove_flushed(batch)
+        return written
+
+    async def _flush_now(self, field: str) -> None:
+        try:
+            if not await self.flush([field], wait=self.interval):
+                logger.debug("Onboarding flush lock busy; leaving the row for the periodic flush")
+        except Exception as e:
+            # Still buffered; the periodic flush retries it
+            logger.warning(f"Immediate onboarding progress flush failed: {e}")
+
+    async def _remove_flushed(self, flushed: dict[str, str]) -> None:
+        from redis.exceptions import WatchError
+
+        redis_client = get_redis_client()
+        fields = list(flushed)
+        for _ in range(3):
+            async with redis_client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(PENDING_KEY)
+                    current = await pipe.hmget(PENDING_KEY, fields)
+                    unchanged = [field for field, value in zip(fields, current, strict=True) if value == flushed[field]]
+                    if not unchanged:
+                        return
+                    pipe.multi()
+                    pipe.hdel(PENDING_KEY, *unchanged)
+                    await pipe.execute()
+                    return
+                except WatchError:
+                    # A save landed between the check and the delete; look again
+                    continue
+        # Rows that could not be removed stay buffered and are rewritten by the
+        # next flush, which is harmless for an upsert
+        logger.debug("Onboarding buffer kept changing during flush; keeping rows for the next flush")
+
+    async def flush_all(self) -> int:
+        """Flush the whole buffer if no other worker is flushing it"""
+        return await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                flushed = await self.flush_all()
+                if flushed:
+                    logger.info(f"Flushed {flushed} buffered onboarding progress rows")
+            except Exception as e:
+                logger.error(f"Onboarding progress flush failed: {e}")
+
+    def start(self) -> None:
+        """Start the periodic flush on the running event loop"""
+        if not write_behind_enabled():
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="onboarding-flush")
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write out everything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._immediate:
+            await asyncio.gather(*self._immediate, return_exceptions=True)
+        if not write_behind_enabled():
+            return
+        try:
+            flushed = await self.flush(wait=self.interval)
+            logger.info(f"Flushed {flushed} buffered onboarding progress rows on shutdown")
+        except Exception as e:
+            logger.error(f"Failed to flush onboarding progress on shutdown: {e}")
+
+onboarding_write_buffer = OnboardingWriteBuffer(
+    interval=float(os.getenv("ONBOARDING_FLUSH_INTERVAL", "5")),
+    batch_size=int(os.getenv("ONBOARDING_FLUSH_BATCH_SIZE", "500")),
+)
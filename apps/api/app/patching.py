@@ -0,0 +1,149 @@
+"""
+JSON Merge Patch (RFC 7396) and JSON Patch (RFC 6902) for JSON documents.
+
+Used to apply onboarding step_data deltas. Neither function mutates its
+input; both return a new document.
+"""
+import copy
+from typing import Any
+
+
+class PatchError(ValueError):
+    """Raised when a patch cannot be applied to the document"""
+    pass
+
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """Apply an RFC 7396 merge patch: objects merge recursively, null deletes a member"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+def _parse_pointer(pointer: str) -> list[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [part.replace("~1", "/").replace("~0", "~") for part in pointer[1:].split("/")]
+
+
+def _resolve_parent(document: Any, tokens: list[str], pointer: str) -> tuple[Any, str]:
+    """Return the container holding the last token of a pointer, and that token"""
+    node = document
+    for token in tokens[:-1]:
+        node = _child(node, token, pointer)
+    return node, tokens[-1]
+
+
+def _list_index(node: list, token: str, pointer: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(node)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise PatchError(f"Invalid array index in {pointer!r}")
+    index = int(token)
+    if index > len(node) or (index == len(node) and not allow_end):
+        raise PatchError(f"Array index out of range in {pointer!r}")
+    return index
+
+
+def _child(node: Any, token: str, pointer: str) -> Any:
+    if isinstance(node, dict):
+        if token not in node:
+            raise PatchError(f"Path not found: {pointer!r}")
+        return node[token]
+    if isinstance(node, list):
+        return node[_list_index(node, token, pointer)]
+    raise PatchError(f"Path not found: {pointer!r}")
+
+
+def _get(document: Any, pointer: str) -> Any:
+    node = document
+    for token in _parse_pointer(pointer):
+        node = _child(node, token, pointer)
+    return node
+
+
+def _add(document: Any, pointer: str, value: Any) -> Any:
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        return value
+    parent, token = _resolve_parent(document, tokens, pointer)
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, token, pointer, allow_end=True), value)
+    else:
+        raise PatchError(f"Path not found: {pointer!r}")
+    return document
+
+
+def _remove(document: Any, pointer: str) -> tuple[Any, Any]:
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        raise PatchError("Cannot remove the whole document")
+    parent, token = _resolve_parent(document, tokens, pointer)
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise PatchError(f"Path not found: {pointer!r}")
+        return document, parent.pop(token)
+    if isinstance(parent, list):
+        return document, parent.pop(_list_index(parent, token, pointer))
+    raise PatchError(f"Path not found: {pointer!r}")
+
+
+def _value(operation: dict[str, Any]) -> Any:
+    if "value" not in operation:
+        raise PatchError(f"Operation {operation.get('op')!r} is missing a value")
+    return copy.deepcopy(operation["value"])
+
+
+def apply_json_patch(document: Any, operations: list[dict[str, Any]]) -> Any:
+    """
+    Apply an RFC 6902 JSON Patch.
+
+    The operations are applied to a copy in order; if any fails, PatchError
+    is raised and the input is left untouched.
+    """
+    result = copy.deepcopy(document)
+    for operation in operations:
+        op = operation.get("op")
+        path = operation.get("path")
+        if not isinstance(path, str):
+            raise PatchError(f"Operation {op!r} is missing a path")
+
+        if op == "add":
+            result = _add(result, path, _value(operation))
+        elif op == "remove":
+            result, _ = _remove(result, path)
+        elif op == "replace":
+            value = _value(operation)
+            _get(result, path)
+            result, _ = _remove(result, path) if path else (result, None)
+            result = _add(result, path, value)
+        elif op == "move":
+            from_path = operation.get("from")
+            if not isinstance(from_path, str):
+                raise PatchError("move is missing 'from'")
+            if path.startswith(from_path + "/"):
+                raise PatchError("Cannot move a value into one of its children")
+            result, value = _remove(result, from_path)
+            result = _add(result, path, value)
+        elif op == "copy":
+            from_path = operation.get("from")
+            if not isinstance(from_path, str):
+                raise PatchError("copy is missing 'from'")
+            result = _add(result, path, copy.deepcopy(_get(result, from_path)))
+        elif op == "test":
+            if _get(result, path) != operation.get("value"):
+                raise PatchError(f"Test failed at {path!r}")
+        else:
+            raise PatchError(f"Unsupported operation: {op!r}")
+    return result
@@ -0,0 +1,111 @@
+"""
+On-demand request profiling.
+
+A request is run under pyinstrument's statistical profiler when it carries
+the X-Profile header with the configured DEBUG_TOKEN, or when it falls in
+the PROFILING_SAMPLE_RATE fraction of traffic. The profile is written in
+speedscope format to PROFILING_DIR and linked in the X-Profile-Url response
+header; it can be downloaded from /debug/profiles/<name> with the same token
+and opened at https://www.speedscope.app.
+
+pyinstrument's async mode only samples the coroutine that started the
+profiler, so concurrent requests on the same worker do not leak into a
+profile.
+"""
+import hmac
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_URL_HEADER = "x-profile-url"
+PROFILE_SUFFIX = ".speedscope.json"
+PROFILE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+\.speedscope\.json$")
+
+def is_debug_token(value: Optional[str]) -> bool:
+    """True when value matches DEBUG_TOKEN; always False when it is unset"""
+    token = os.getenv("DEBUG_TOKEN")
+    if not token or not value:
+        return False
+    return hmac.compare_digest(value.encode(), token.encode())
+
+class RequestProfiler:
+    """Decides which requests to profile and stores the resulting profiles"""
+
+    def __init__(self, directory: str, sample_rate: float, interval: float, max_files: int):
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_files = max_files
+        self._sampled_active = 0
+
+    def should_profile(self, header_value: Optional[str]) -> Optional[str]:
+        """Return the trigger ("header" or "sample") for a request, or None"""
+        if header_value is not None and is_debug_token(header_value):
+            return "header"
+        # Sampled traffic is profiled one request at a time per worker
+        if self.sample_rate > 0 and self._sampled_active == 0 and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def start(self, trigger: str) -> Any:
+        """Start a profiler bound to the calling coroutine"""
+        from pyinstrument import Profiler
+
+        if trigger == "sample":
+            self._sampled_active += 1
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        profiler.start()
+        return profiler
+
+    def finish(self, trigger: str) -> None:
+        if trigger == "sample":
+            self._sampled_active -= 1
+
+    def new_profile_name(self, method: str) -> str:
+        return f"{int(time.time() * 1000)}-{method.lower()}-{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}"
+
+    def profile_path(self, name: str) -> Optional[Path]:
+        """Resolve a profile name to its file, rejecting anything but plain profile names"""
+        if not PROFILE_NAME_PATTERN.match(name):
+            return None
+        return self.directory / name
+
+    def write(self, name: str, session: Any) -> None:
+        """
+        Render a finished pyinstrument session to PROFILING_DIR.
+
+        Blocking; call it off the event loop.
+        """
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / name).write_text(SpeedscopeRenderer().render(session))
+        self._prune()
+
+    def list_profiles(self) -> list[str]:
+        """Stored profile names, newest first"""
+        if not self.directory.is_dir():
+            return []
+        return sorted((p.name for p in self.directory.glob(f"*{PROFILE_SUFFIX}")), reverse=True)
+
+    def _prune(self) -> None:
+        for name in self.list_profiles()[self.max_files:]:
+            try:
+                (self.directory / name).unlink()
+            except OSError as e:
+                logger.warning(f"Failed to remove old profile {name}: {e}")
+
+request_profiler = RequestProfiler(
+    directory=os.getenv("PROFILING_DIR", "/tmp/tutorwise-profiles"),
+    sample_rate=float(os.getenv("PROFILING_SAMPLE_RATE", "0")),
+    interval=float(os.getenv("PROFILING_INTERVAL", "0.001")),
+    max_files=int(os.getenv("PROFILING_MAX_FILES", "200")),
+)
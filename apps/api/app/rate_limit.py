@@ -0,0 +1,232 @@
+"""
+Token-bucket rate limiting for the bcrypt-heavy auth routes.
+
+/auth/login and /auth/register each check two buckets before any hashing
+happens: one for the client IP and one for the email in the request body.
+A bucket holds up to `limit` tokens and refills at limit/window per second;
+a request takes one token from every bucket, or from none if any is empty.
+
+- Redis: all buckets of a request are checked and taken in one atomic Lua
+  call, so every worker shares the same budget
+- fast path: a key that was refused is remembered in-process until its
+  bucket can have refilled, so a burst from one IP or against one email is
+  refused without touching Redis
+- without Redis (not configured, erroring or circuit open) the same buckets
+  are kept per worker, so the limit still applies, per worker
+
+Refused requests get a 429 with Retry-After.
+"""
+import hashlib
+import logging
+import math
+import os
+import time
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, Request, status
+
+from app.cache import MISSING, LRUCache
+from app.circuit_breaker import dependency_call
+from app.db import get_redis_client
+from app.metrics import RATE_LIMITED_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# KEYS: one bucket per limit. ARGV: capacity and refill rate (tokens per ms)
+# for each key, in order. Returns {0, 0} when a token was taken from every
+# bucket, else {index of the bucket that refused (1-based), ms until it has
+# a token}. Buckets are hashes {tokens, ts} expiring once full again.
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local tokens = {}
+local refused, wait = 0, 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(bucket[1]) or capacity
+    local elapsed = math.max(0, now - (tonumber(bucket[2]) or now))
+    available = math.min(capacity, available + elapsed * rate)
+    tokens[i] = available
+    if available < 1 then
+        local needed = math.ceil((1 - available) / rate)
+        if needed > wait then
+            refused, wait = i, needed
+        end
+    end
+end
+if refused > 0 then
+    return {refused, wait}
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - 1), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate))
+end
+return {0, 0}
+"""
+
+
+class RateLimit:
+    """`limit` requests per `window` seconds, with bursts of up to `limit`"""
+
+    def __init__(self, name: str, limit: int, window: float):
+        self.name = name
+        self.capacity = limit
+        self.rate = limit / window  # tokens per second
+
+
+class RateLimitExceeded(Exception):
+    """A request was refused by one of its buckets"""
+
+    def __init__(self, limit: str, retry_after: float):
+        super().__init__(f"Rate limit {limit} exceeded")
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Checks and takes tokens from a set of buckets for each request"""
+
+    def __init__(self, max_local_keys: int = 10000):
+        # key -> (limit name, monotonic time its bucket has a token again)
+        self.blocked = LRUCache(max_local_keys)
+        # key -> (tokens, monotonic time of the last update); used without Redis
+        self.local_buckets = LRUCache(max_local_keys)
+        self._script: Any = None
+        self._script_client: Any = None
+
+    def _redis_script(self, redis_client: Any) -> Any:
+        # Scripts are bound to a client; clients are recreated per worker
+        if self._script_client is not redis_client:
+            self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+            self._script_client = redis_client
+        return self._script
+
+    async def check(self, buckets: list[tuple[RateLimit, str]]) -> None:
+        """
+        Take one token from every (limit, key) bucket.
+
+        Raises:
+            RateLimitExceeded: If any bucket is empty; no token is taken then
+        """
+        now = time.monotonic()
+        for limit, key in buckets:
+            blocked = self.blocked.get(key)
+            if blocked is not MISSING:
+                RATE_LIMITED_TOTAL.labels(limit.name, "fast_path").inc()
+                raise RateLimitExceeded(limit.name, blocked[1] - now)
+
+        redis_client = get_redis_client()
+        if redis_client:
+            try:
+                with dependency_call("redis", "rate_limit"):
+                    refused, wait_ms = await self._redis_script(redis_client)(
+                        keys=[key for _, key in buckets],
+                        args=[value for limit, _ in buckets for value in (limit.capacity, limit.rate / 1000)],
+                    )
+            except Exception as e:
+                logger.warning(f"Redis rate limit check failed, limiting per worker: {e}")
+            else:
+                if refused:
+                    self._refuse(*buckets[int(refused) - 1], int(wait_ms) / 1000, "redis")
+                return
+
+        self._check_local(buckets, now)
+
+    def _check_local(self, buckets: list[tuple[RateLimit, str]], now: float) -> None:
+        available = []
+        for limit, key in buckets:
+            state = self.local_buckets.get(key)
+            tokens, updated_at = (limit.capacity, now) if state is MISSING else state
+            tokens = min(limit.capacity, tokens + (now - updated_at) * limit.rate)
+            if tokens < 1:
+                self._refuse(limit, key, (1 - tokens) / limit.rate, "local")
+            available.append(tokens)
+        for (limit, key), tokens in zip(buckets, available, strict=True):
+            self.local_buckets.set(key, (tokens - 1, now), limit.capacity / limit.rate)
+
+    def _refuse(self, limit: RateLimit, key: str, retry_after: float, source: str) -> None:
+        self.blocked.set(key, (limit.name, time.monotonic() + retry_after), retry_after)
+        RATE_LIMITED_TOTAL.labels(limit.name, source).inc()
+        raise RateLimitExceeded(limit.name, retry_after)
+
+    def reset(self) -> None:
+        """Forget all in-process state"""
+        self.blocked.clear()
+        self.local_buckets.clear()
+
+
+def rate_limit_enabled() -> bool:
+    return os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+
+
+def client_ip(request: Request) -> str:
+    """
+    Client address, taking RATE_LIMIT_TRUSTED_PROXIES hops of X-Forwarded-For into account.
+
+    Each trusted proxy appends the address it received the request from, so
+    the entry that many places from the right is the last one not supplied
+    by the client itself.
+    """
+    trusted = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+    if trusted > 0:
+        hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if hops:
+            return hops[-min(trusted, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+
+rate_limiter = RateLimiter(max_local_keys=int(os.getenv("RATE_LIMIT_MAX_LOCAL_KEYS", "10000")))
+
+_window = float(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60"))
+AUTH_RATE_LIMITS = {
+    "login": (
+        RateLimit("login_ip", int(os.getenv("RATE_LIMIT_LOGIN_PER_IP", "20")), _window),
+        RateLimit("login_email", int(os.getenv("RATE_LIMIT_LOGIN_PER_EMAIL", "5")), _window),
+    ),
+    "register": (
+        RateLimit("register_ip", int(os.getenv("RATE_LIMIT_REGISTER_PER_IP", "10")), _window),
+        RateLimit("register_email", int(os.getenv("RATE_LIMIT_REGISTER_PER_EMAIL", "3")), _window),
+    ),
+}
+
+
+def auth_rate_limit(route: str) -> Callable:
+    """
+    FastAPI dependency limiting a route per client IP and per request email.
+
+        @router.post("/login", dependencies=[Depends(auth_rate_limit("login"))])
+    """
+    ip_limit, email_limit = AUTH_RATE_LIMITS[route]
+
+    async def dependency(request: Request) -> None:
+        if not rate_limit_enabled():
+            return
+
+        buckets = [(ip_limit, f"ratelimit:{ip_limit.name}:{client_ip(request)}")]
+        try:
+            body = await request.json()
+        except Exception:
+            body = None
+        email: Optional[str] = body.get("email") if isinstance(body, dict) else None
+        if isinstance(email, str) and email.strip():
+            buckets.append((email_limit, f"ratelimit:{email_limit.name}:{_digest(email.strip().lower())}"))
+
+        try:
+            await rate_limiter.check(buckets)
+        except RateLimitExceeded as e:
+            logger.warning(f"Rate limited {request.url.path}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, please try again later",
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+            )
+
+    return dependency
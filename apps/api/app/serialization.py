@@ -0,0 +1,54 @@
+"""
+orjson-backed JSON for requests and responses.
+
+Every router uses FastJSONRoute as its route_class (and so does the app's
+own router). Request bodies are parsed with orjson. Routes that return plain
+dicts or lists are rendered with OrjsonResponse; routes with a response_model
+keep FastAPI's own fast path, where Pydantic serialises straight to JSON
+bytes, which only applies while their response_class is left as a Default()
+placeholder.
+"""
+from typing import Any, Callable, Coroutine
+
+import orjson
+from fastapi import Request, Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, request_response
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so malformed bodies
+# still become FastAPI's 422 json_invalid error
+
+
+class OrjsonResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONRequest(Request):
+    """Request whose JSON body is parsed with orjson"""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+
+class FastJSONRoute(APIRoute):
+    """APIRoute that parses bodies with orjson and renders model-less responses with it"""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, endpoint, **kwargs)
+        if self.response_field is None and isinstance(self.response_class, DefaultPlaceholder):
+            self.response_class = OrjsonResponse
+            self.app = request_response(self.get_route_handler())
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            return await handler(FastJSONRequest(request.scope, request.receive))
+
+        return route_handler
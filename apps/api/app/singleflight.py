@@ -0,0 +1,154 @@
+"""
+Request coalescing (single-flight) for identical concurrent reads.
+
+Concurrent calls with the same key on one worker share a single in-flight
+call: the first caller runs it, the rest await its result (or exception).
+The call runs as its own task, so a caller that disconnects does not cancel
+it for the others.
+
+With SINGLEFLIGHT_DISTRIBUTED enabled, calls that pass a recheck also
+coalesce across workers: the worker that wins a short Redis lock makes the
+backend call and caches the result; the others wait for the lock to go away
+and then read that result with recheck() instead of repeating the call.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from app.cache import MISSING
+from app.circuit_breaker import dependency_call
+from app.db import get_redis_client
+from app.metrics import SINGLEFLIGHT_CALLS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# All named flights, for reporting counters
+flight_registry: dict[str, "SingleFlight"] = {}
+
+
+def distributed_enabled() -> bool:
+    return os.getenv("SINGLEFLIGHT_DISTRIBUTED", "false").lower() == "true"
+
+
+class SingleFlight:
+    """Shares one in-flight call among concurrent callers with the same key"""
+
+    def __init__(self, name: str, lock_ttl: float = 2.0, poll_interval: float = 0.01):
+        self.name = name
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.executed = 0
+        self.coalesced = 0
+        self.waited_remote = 0
+        self._calls: dict[str, asyncio.Task] = {}
+        flight_registry[name] = self
+
+    def _count(self, outcome: str) -> None:
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        SINGLEFLIGHT_CALLS_TOTAL.labels(self.name, outcome).inc()
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        recheck: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Any:
+        """
+        Return fn()'s result, sharing the call with concurrent callers of the same key.
+
+        recheck returns the result fn would have cached, or MISSING; passing it
+        enables cross-worker coalescing for this call.
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self._count("coalesced")
+        else:
+            task = asyncio.ensure_future(self._run(key, fn, recheck))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        self._calls.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception retrieved in case every caller went away
+            task.exception()
+
+    async def _run(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        recheck: Optional[Callable[[], Awaitable[Any]]],
+    ) -> Any:
+        redis_client = get_redis_client()
+        if recheck is None or not redis_client or not distributed_enabled():
+            self._count("executed")
+            return await fn()
+
+        lock_key = f"singleflight:{self.name}:{key}"
+        token = uuid.uuid4().hex
+        try:
+            with dependency_call("redis", "singleflight_lock"):
+                acquired = await redis_client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Single-flight lock failed for {self.name}, calling directly: {e}")
+            self._count("executed")
+            return await fn()
+
+        if not acquired:
+            if await self._wait_for_remote(redis_client, lock_key):
+                value = await recheck()
+                if value is not MISSING:
+                    self._count("waited_remote")
+                    return value
+            self._count("executed")
+            return await fn()
+
+        try:
+            self._count("executed")
+            return await fn()
+        finally:
+            try:
+                if await redis_client.get(lock_key) == token:
+                    await redis_client.delete(lock_key)
+            except Exception as e:
+                logger.warning(f"Failed to release single-flight lock for {self.name}: {e}")
+
+    async def _wait_for_remote(self, redis_client: Any, lock_key: str) -> bool:
+        """Wait until another worker's call releases its lock; False on timeout or error"""
+        deadline = time.monotonic() + self.lock_ttl
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                if not await redis_client.exists(lock_key):
+                    return True
+        except Exception as e:
+            logger.warning(f"Single-flight wait failed for {self.name}: {e}")
+        return False
+
+    def stats(self) -> dict[str, int]:
+        """Call counters for this flight on this worker"""
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "waited_remote": self.waited_remote,
+            "in_flight": len(self._calls),
+        }
+
+
+def get_flight_stats() -> dict[str, dict[str, int]]:
+    """Counters for every registered flight"""
+    return {name: flight.stats() for name, flight in flight_registry.items()}
+
+
+_lock_ttl = float(os.getenv("SINGLEFLIGHT_LOCK_TTL_SECONDS", "2"))
+
+# role_details reads for GET /api/account/professional-info, keyed by "<profile_id>:<role_type>"
+professional_info_flight = SingleFlight("professional_info", lock_ttl=_lock_ttl)
+# onboarding_progress reads, keyed like onboarding_progress_cache
+onboarding_progress_flight = SingleFlight("onboarding_progress", lock_ttl=_lock_ttl)
+# Neo4j :User lookups by email, behind user_cache
+user_lookup_flight = SingleFlight("user_by_email", lock_ttl=_lock_ttl)
@@ -0,0 +1,78 @@
+"""
+Per-phase timing of worker startup.
+
+app.main times its module-level work (imports, app setup, route
+registration) and the lifespan times each dependency connection and the
+background tasks. Connections run concurrently, so their phases overlap;
+each phase records when it started relative to the first one.
+
+The report is logged once the worker is ready and served at
+GET /debug/startup. Under gunicorn with preload the import phases ran once
+in the master and are inherited by every worker; mark_forked() records when
+the worker was forked, so the report also shows how long a (recycled)
+worker took from fork to ready.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Records named startup phases of this process"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        # (name, start, end) as perf_counter() values
+        self.phases: list[tuple[str, float, float]] = []
+        self.ready_at: Optional[float] = None
+        self.forked_at: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as phase `name`; usable in sync and async code"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started)
+
+    def record(self, name: str, started: float) -> None:
+        """Record phase `name` as running from perf_counter() value `started` until now"""
+        self.phases.append((name, started, time.perf_counter()))
+
+    def mark_forked(self) -> None:
+        """Record that this process was just forked from a preloading master"""
+        self.forked_at = time.perf_counter()
+
+    def mark_ready(self) -> None:
+        """Record that startup finished and log the report"""
+        self.ready_at = time.perf_counter()
+        report = self.report()
+        summary = ", ".join(f"{phase['name']} {phase['duration_ms']}ms" for phase in report["phases"])
+        after_fork = "" if report["forked_ms"] is None else f" ({report['ready_after_fork_ms']}ms after fork)"
+        logger.info(f"Startup timing (pid {report['pid']}): {summary}; ready after {report['ready_ms']}ms{after_fork}")
+
+    def _ms(self, since: float, until: float) -> float:
+        return round((until - since) * 1000, 1)
+
+    def report(self) -> dict[str, Any]:
+        # By start, enclosing phases before the ones they contain
+        phases = sorted(self.phases, key=lambda phase: (phase[1], -phase[2]))
+        forked, ready = self.forked_at is not None, self.ready_at is not None
+        return {
+            "pid": os.getpid(),
+            "ready_ms": self._ms(self.started_at, self.ready_at) if ready else None,
+            "forked_ms": self._ms(self.started_at, self.forked_at) if forked else None,
+            "ready_after_fork_ms": self._ms(self.forked_at, self.ready_at) if forked and ready else None,
+            "phases": [
+                {"name": name, "start_ms": self._ms(self.started_at, start), "duration_ms": self._ms(start, end)}
+                for name, start, end in phases
+            ],
+        }
+
+
+startup_timer = StartupTimer()
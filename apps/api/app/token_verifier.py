@@ -0,0 +1,165 @@
+"""
+Local verification of Supabase-issued JWTs.
+
+Access tokens are checked in-process instead of calling the Supabase auth
+server on every request. HS256 tokens are verified with the project JWT
+secret; asymmetric tokens (RS256/ES256) are verified against the project's
+JWKS, which is fetched once and refreshed periodically.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+import httpx
+import jwt
+
+from app.db import get_supabase_http_client
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+class TokenVerificationError(Exception):
+    """Raised when a bearer token is invalid, expired or malformed"""
+    pass
+
+
+class SigningKeyUnavailable(TokenVerificationError):
+    """Raised when no local key can verify the token, so the remote check may be used"""
+    pass
+
+
+class SupabaseJWTVerifier:
+    """Verify Supabase access tokens locally with a cached secret or JWKS."""
+
+    def __init__(
+        self,
+        supabase_url: Optional[str] = None,
+        jwt_secret: Optional[str] = None,
+        audience: str = "authenticated",
+        issuer: Optional[str] = None,
+        api_key: Optional[str] = None,
+        jwks_refresh_interval: float = 600.0,
+        jwks_min_refetch_interval: float = 30.0,
+    ):
+        base_url = supabase_url.rstrip("/") if supabase_url else None
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.issuer = issuer or (f"{base_url}/auth/v1" if base_url else None)
+        self.jwks_url = f"{base_url}/auth/v1/.well-known/jwks.json" if base_url else None
+        self.api_key = api_key
+        self.jwks_refresh_interval = jwks_refresh_interval
+        self.jwks_min_refetch_interval = jwks_min_refetch_interval
+
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._fetched_at: float = 0.0
+        self._lock = asyncio.Lock()
+
+    async def verify(self, token: str) -> dict:
+        """
+        Verify a token's signature, expiry and audience and return its claims.
+
+        Raises:
+            SigningKeyUnavailable: If no local key is available for the token
+            TokenVerificationError: If the token is invalid or expired
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(f"Malformed token: {e}")
+
+        algorithm = header.get("alg")
+        if algorithm == "HS256":
+            if not self.jwt_secret:
+                raise SigningKeyUnavailable("SUPABASE_JWT_SECRET is not configured")
+            key = self.jwt_secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            key = await self._get_signing_key(header.get("kid"))
+        else:
+            raise TokenVerificationError(f"Unsupported token algorithm: {algorithm}")
+
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                options={"require": ["exp", "sub"]},
+            )
+        except jwt.ExpiredSignatureError:
+            raise TokenVerificationError("Token has expired")
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(f"Invalid token: {e}")
+
+    async def refresh_jwks(self) -> None:
+        """Fetch the project's JWKS and replace the cached signing keys"""
+        if not self.jwks_url:
+            raise SigningKeyUnavailable("Supabase URL is not configured for JWKS lookup")
+
+        headers = {"apikey": self.api_key} if self.api_key else {}
+        client = get_supabase_http_client()
+        if client:
+            response = await client.get(self.jwks_url, headers=headers)
+        else:
+            async with httpx.AsyncClient(timeout=5) as temporary_client:
+                response = await temporary_client.get(self.jwks_url, headers=headers)
+        response.raise_for_status()
+
+        keys = {}
+        for jwk in jwt.PyJWKSet.from_dict(response.json()).keys:
+            keys[jwk.key_id] = jwk
+
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        logger.info(f"Loaded {len(keys)} Supabase JWT signing keys")
+
+    async def _get_signing_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        """Return the cached key for kid, refreshing the JWKS when stale or unknown"""
+        age = time.monotonic() - self._fetched_at
+        if kid in self._keys and age < self.jwks_refresh_interval:
+            return self._keys[kid]
+
+        async with self._lock:
+            age = time.monotonic() - self._fetched_at
+            stale = age >= self.jwks_refresh_interval
+            unknown_kid = kid not in self._keys and age >= self.jwks_min_refetch_interval
+            if stale or unknown_kid:
+                try:
+                    await self.refresh_jwks()
+                except SigningKeyUnavailable:
+                    raise
+                except Exception as e:
+                    # Keep serving the previously cached keys if the refresh fails
+                    logger.warning(f"Failed to refresh Supabase JWKS: {e}")
+
+        if kid not in self._keys:
+            raise SigningKeyUnavailable(f"No Supabase signing key found for kid {kid!r}")
+        return self._keys[kid]
+
+
+_verifier: Optional[SupabaseJWTVerifier] = None
+
+
+def get_token_verifier() -> SupabaseJWTVerifier:
+    """Get the process-wide Supabase JWT verifier, configured from the environment"""
+    global _verifier
+
+    if _verifier is None:
+        _verifier = SupabaseJWTVerifier(
+            supabase_url=os.getenv("NEXT_PUBLIC_SUPABASE_URL") or os.getenv("SUPABASE_URL"),
+            jwt_secret=os.getenv("SUPABASE_JWT_SECRET"),
+            audience=os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated"),
+            issuer=os.getenv("SUPABASE_JWT_ISSUER"),
+            api_key=os.getenv("SUPABASE_ANON_KEY") or os.getenv("SUPABASE_SERVICE_ROLE_KEY"),
+            jwks_refresh_interval=float(os.getenv("SUPABASE_JWKS_REFRESH_SECONDS", "600")),
+        )
+    return _verifier
+
+
+def remote_fallback_enabled() -> bool:
+    """Whether tokens without a local signing key may be checked with supabase.auth.get_user"""
+    return os.getenv("SUPABASE_AUTH_REMOTE_FALLBACK", "false").lower() in ("1", "true", "yes")
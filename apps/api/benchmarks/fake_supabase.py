@@ -0,0 +1,516 @@
+"""
+In-process fake Supabase: enough PostgREST and GoTrue to run offline.
+
+FakeSupabase keeps tables in memory and answers the requests supabase-py
+sends for them:
+
+- PostgREST on /rest/v1/<table>: select (columns, eq/neq/gt/gte/lt/lte/in/is/
+  like/ilike filters, order, limit, offset, count), single/maybe_single,
+  insert and upsert (on_conflict, merge or ignore duplicates), update and
+  delete, with PostgREST's error bodies (23505 on duplicates, PGRST116 for
+  single(), PGRST205 for unknown tables)
+- GoTrue GET /auth/v1/user, which resolves an HS256 access token signed with
+  jwt_secret (issue_token() makes one)
+
+Latency and failures can be injected: a fixed delay plus jitter per request
+(or per table), a random error rate, and fail_next() for deterministic
+failures. Requests are served over a local threaded HTTP server, so sync and
+async clients both work, or in-process through transport():
+
+    with FakeSupabase(latency=0.005) as fake:
+        fake.seed("role_details", [{"profile_id": "u1", "role_type": "tutor"}])
+        client = await acreate_client(fake.url, fake.service_key)
+
+Also runnable on its own, e.g. for the cas/optimization data loaders
+(SUPABASE_URL and SUPABASE_SERVICE_KEY are printed on startup):
+
+    python -m benchmarks.fake_supabase --port 54321 --seed seed.json
+"""
+import argparse
+import fnmatch
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import jwt
+
+# Table name -> columns that must be unique together (besides id)
+DEFAULT_TABLES: dict[str, tuple[str, ...]] = {
+    "role_details": ("profile_id", "role_type"),
+    "onboarding_progress": ("profile_id", "role_type"),
+    "ai_feedback": (),
+    "sage_sessions": (),
+    "sage_messages": (),
+    "lexi_sessions": (),
+    "lexi_messages": (),
+}
+
+DEFAULT_JWT_SECRET = "fake-supabase-jwt-secret-at-least-32-bytes"
+OBJECT_MEDIA_TYPE = "application/vnd.pgrst.object+json"
+
+
+class FakeResponse:
+    """Status, headers and JSON payload of a fake Supabase response"""
+
+    def __init__(self, status: int, payload: Any = None, headers: Optional[dict[str, str]] = None):
+        self.status = status
+        self.payload = payload
+        self.headers = headers or {}
+
+    @property
+    def body(self) -> bytes:
+        return b"" if self.payload is None else json.dumps(self.payload).encode()
+
+
+def _error(status: int, code: str, message: str, details: Optional[str] = None) -> FakeResponse:
+    return FakeResponse(status, {"code": code, "message": message, "details": details, "hint": None})
+
+
+def _split_list(value: str) -> list[str]:
+    """Split a PostgREST in.(...) list, honouring double-quoted items"""
+    items, current, quoted = [], "", False
+    for char in value:
+        if char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            items.append(current)
+            current = ""
+        else:
+            current += char
+    items.append(current)
+    return items
+
+
+def _coerce(raw: str, sample: Any) -> Any:
+    """Convert a query-string value to the type of the stored value it is compared with"""
+    if raw == "null":
+        return None
+    if isinstance(sample, bool):
+        return raw == "true"
+    if isinstance(sample, (int, float)):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    if isinstance(sample, (dict, list)):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def _matches(row: dict, column: str, expression: str) -> bool:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    operator, _, raw = expression.partition(".")
+    value = row.get(column)
+
+    if operator == "is":
+        result = {"null": value is None, "true": value is True, "false": value is False}.get(raw, False)
+    elif operator == "in":
+        result = value in [_coerce(item, value) for item in _split_list(raw.strip("()"))]
+    elif operator in ("like", "ilike"):
+        pattern = raw.replace("*", "%").replace("%", "*")
+        text = "" if value is None else str(value)
+        result = fnmatch.fnmatchcase(text.lower(), pattern.lower()) if operator == "ilike" \
+            else fnmatch.fnmatchcase(text, pattern)
+    else:
+        target = _coerce(raw, value)
+        if operator == "eq":
+            result = value == target
+        elif operator == "neq":
+            result = value != target
+        elif value is None or target is None:
+            result = False
+        else:
+            try:
+                result = {
+                    "gt": value > target,
+                    "gte": value >= target,
+                    "lt": value < target,
+                    "lte": value <= target,
+                }[operator]
+            except (KeyError, TypeError):
+                result = False
+    return result != negate
+
+
+def _order(rows: list[dict], spec: str) -> list[dict]:
+    # Apply the keys last to first; each sort is stable
+    for term in reversed(spec.split(",")):
+        column, *modifiers = term.split(".")
+        descending = "desc" in modifiers
+        nulls_first = "nullsfirst" in modifiers or (descending and "nullslast" not in modifiers)
+        present = [row for row in rows if row.get(column) is not None]
+        missing = [row for row in rows if row.get(column) is None]
+        present.sort(key=lambda row: row[column], reverse=descending)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def _prefer(headers: dict[str, str]) -> dict[str, str]:
+    preferences = {}
+    for item in headers.get("prefer", "").split(","):
+        key, _, value = item.strip().partition("=")
+        if key:
+            preferences[key] = value
+    return preferences
+
+
+class FakeSupabase:
+    """In-memory PostgREST/GoTrue stand-in with latency and error injection"""
+
+    def __init__(
+        self,
+        tables: Optional[dict[str, tuple[str, ...]]] = None,
+        jwt_secret: str = DEFAULT_JWT_SECRET,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        table_latency: Optional[dict[str, float]] = None,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: Optional[int] = None,
+    ):
+        self.unique_keys = dict(DEFAULT_TABLES if tables is None else tables)
+        self.tables: dict[str, list[dict]] = {name: [] for name in self.unique_keys}
+        self.users: dict[str, dict] = {}
+        self.jwt_secret = jwt_secret
+        self.latency = latency
+        self.jitter = jitter
+        self.table_latency = table_latency or {}
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._failures: list[tuple[Optional[str], int]] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # Data
+
+    def seed(self, table: str, rows: list[dict]) -> list[dict]:
+        """Insert rows directly, filling in ids; returns the stored rows"""
+        with self._lock:
+            stored = [{"id": str(uuid.uuid4()), **row} for row in rows]
+            self._table(table).extend(stored)
+            return stored
+
+    def rows(self, table: str) -> list[dict]:
+        with self._lock:
+            return [dict(row) for row in self._table(table)]
+
+    def _table(self, table: str) -> list[dict]:
+        if table not in self.tables:
+            self.unique_keys.setdefault(table, ())
+            self.tables[table] = []
+        return self.tables[table]
+
+    # Auth
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            return "http://fake-supabase"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def service_key(self) -> str:
+        """A service-role key signed with jwt_secret (the fake does not check API keys)"""
+        return jwt.encode({"role": "service_role", "iss": "supabase"}, self.jwt_secret, algorithm="HS256")
+
+    def add_user(self, user_id: str, email: Optional[str] = None, **fields: Any) -> dict:
+        self.users[user_id] = {
+            "id": user_id,
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": email,
+            "app_metadata": {"provider": "email"},
+            "user_metadata": {},
+            "created_at": "2025-01-01T00:00:00Z",
+            **fields,
+        }
+        return self.users[user_id]
+
+    def issue_token(self, user_id: str, expires_in: int = 3600, email: Optional[str] = None) -> str:
+        """An access token for user_id as Supabase would issue it, registering the user if needed"""
+        if user_id not in self.users:
+            self.add_user(user_id, email)
+        claims = {
+            "sub": user_id,
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": self.users[user_id]["email"],
+            "iss": f"{self.url}/auth/v1",
+            "exp": int(time.time()) + expires_in,
+        }
+        return jwt.encode(claims, self.jwt_secret, algorithm="HS256")
+
+    # Fault injection
+
+    def fail_next(self, count: int = 1, status: int = 503, path: Optional[str] = None) -> None:
+        """Fail the next `count` requests (whose path contains `path`, if given) with `status`"""
+        with self._lock:
+            self._failures.extend([(path, status)] * count)
+
+    def _injected_failure(self, path: str) -> Optional[int]:
+        with self._lock:
+            for index, (fragment, status) in enumerate(self._failures):
+                if fragment is None or fragment in path:
+                    del self._failures[index]
+                    return status
+        if self.error_rate and self._random.random() < self.error_rate:
+            return self.error_status
+        return None
+
+    def delay_for(self, path: str) -> float:
+        table = path.rsplit("/", 1)[-1] if path.startswith("/rest/v1/") else None
+        base = self.table_latency.get(table, self.latency)
+        return base + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    # Requests
+
+    def handle(self, method: str, url: str, headers: dict[str, str], body: bytes) -> FakeResponse:
+        """Answer one request; headers must have lower-case names"""
+        self.requests += 1
+        parts = urlsplit(url)
+        path = parts.path
+        query = parse_qsl(parts.query, keep_blank_values=True)
+
+        status = self._injected_failure(path)
+        if status is not None:
+            return _error(status, str(status), "Injected failure")
+
+        if path.startswith("/rest/v1/"):
+            table = path[len("/rest/v1/"):]
+            if table not in self.tables:
+                return _error(404, "PGRST205", f"Could not find the table 'public.{table}' in the schema cache")
+            try:
+                payload = json.loads(body) if body else None
+            except ValueError as e:
+                return _error(400, "PGRST102", f"Invalid body: {e}")
+            with self._lock:
+                return self._rest(method, table, query, headers, payload)
+        if path == "/auth/v1/user" and method == "GET":
+            return self._get_user(headers)
+        if path == "/auth/v1/.well-known/jwks.json":
+            return FakeResponse(200, {"keys": []})
+        return FakeResponse(404, {"message": f"No route for {method} {path}"})
+
+    def _rest(self, method: str, table: str, query: list[tuple[str, str]], headers: dict[str, str], payload: Any) -> FakeResponse:
+        options = {key: value for key, value in query if key in ("select", "order", "limit", "offset", "on_conflict", "columns")}
+        filters = [(key, value) for key, value in query if key not in options]
+        prefer = _prefer(headers)
+        rows = self.tables[table]
+
+        def selected(candidates: list[dict]) -> list[dict]:
+            return [row for row in candidates if all(_matches(row, column, expr) for column, expr in filters)]
+
+        if method in ("GET", "HEAD"):
+            result = selected(rows)
+            total = len(result)
+            if "order" in options:
+                result = _order(result, options["order"])
+            offset = int(options.get("offset", 0))
+            result = result[offset:offset + int(options["limit"])] if "limit" in options else result[offset:]
+            response = self._represent(result, options, headers, total if "count" in prefer else None)
+            if method == "HEAD":
+                response.payload = None
+            return response
+
+        if method == "POST":
+            incoming = payload if isinstance(payload, list) else [payload]
+            resolution = prefer.get("resolution")
+            conflict = tuple(options["on_conflict"].split(",")) if options.get("on_conflict") else ("id",)
+            written = []
+            if resolution is None:
+                for row in incoming:
+                    duplicate = self._duplicate_of(table, row, written)
+                    if duplicate:
+                        return _error(
+                            409, "23505", f'duplicate key value violates unique constraint "{table}_{duplicate}_key"'
+                        )
+                    written.append({"id": str(uuid.uuid4()), **row})
+                rows.extend(written)
+            else:
+                for row in incoming:
+                    existing = next(
+                        (stored for stored in rows if all(stored.get(c) == row.get(c) for c in conflict)), None
+                    )
+                    if existing is None:
+                        stored = {"id": str(uuid.uuid4()), **row}
+                        rows.append(stored)
+                        written.append(stored)
+                    elif resolution == "merge-duplicates":
+                        existing.update(row)
+                        written.append(existing)
+            return self._written(201, written, options, headers, prefer)
+
+        if method == "PATCH":
+            result = selected(rows)
+            for row in result:
+                row.update(payload or {})
+            return self._written(200, result, options, headers, prefer)
+
+        if method == "DELETE":
+            result = selected(rows)
+            self.tables[table] = [row for row in rows if row not in result]
+            return self._written(200, result, options, headers, prefer)
+
+        return _error(405, "PGRST117", f"Unsupported HTTP method: {method}")
+
+    def _duplicate_of(self, table: str, row: dict, pending: list[dict]) -> Optional[str]:
+        """Name of the unique key a new row would violate, if any"""
+        existing = self.tables[table] + pending
+        if "id" in row and any(stored.get("id") == row["id"] for stored in existing):
+            return "pkey"
+        unique = self.unique_keys.get(table, ())
+        if unique and any(all(stored.get(c) == row.get(c) for c in unique) for stored in existing):
+            return "_".join(unique)
+        return None
+
+    def _written(self, status: int, rows: list[dict], options: dict, headers: dict, prefer: dict) -> FakeResponse:
+        if prefer.get("return") != "representation":
+            return FakeResponse(201 if status == 201 else 204)
+        return self._represent(rows, options, headers, len(rows) if "count" in prefer else None, status)
+
+    def _represent(
+        self, rows: list[dict], options: dict, headers: dict, total: Optional[int], status: int = 200
+    ) -> FakeResponse:
+        columns = options.get("select", "*")
+        if "*" not in columns.split(","):
+            names = [name.strip() for name in columns.split(",") if name.strip() and "(" not in name]
+            rows = [{name: row.get(name) for name in names} for row in rows]
+        else:
+            rows = [dict(row) for row in rows]
+
+        response_headers = {}
+        if total is not None:
+            response_headers["Content-Range"] = f"0-{len(rows) - 1}/{total}" if rows else f"*/{total}"
+
+        if OBJECT_MEDIA_TYPE in headers.get("accept", ""):
+            if len(rows) != 1:
+                return _error(
+                    406, "PGRST116", "JSON object requested, multiple (or no) rows returned",
+                    f"The result contains {len(rows)} rows",
+                )
+            return FakeResponse(status, rows[0], response_headers)
+        return FakeResponse(status, rows, response_headers)
+
+    def _get_user(self, headers: dict[str, str]) -> FakeResponse:
+        token = headers.get("authorization", "").removeprefix("Bearer ").strip()
+        try:
+            claims = jwt.decode(token, self.jwt_secret, algorithms=["HS256"], audience="authenticated")
+        except jwt.PyJWTError as e:
+            return FakeResponse(403, {"code": 403, "error_code": "bad_jwt", "msg": f"invalid JWT: {e}"})
+        user = self.users.get(claims["sub"]) or self.add_user(claims["sub"], claims.get("email"))
+        return FakeResponse(200, user)
+
+    # Serving
+
+    def transport(self) -> httpx.MockTransport:
+        """httpx transport answering from this fake in-process (injected latency blocks the caller)"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            time.sleep(self.delay_for(request.url.path))
+            response = self.handle(
+                request.method,
+                str(request.url.raw_path, "ascii"),
+                {key.lower(): value for key, value in request.headers.items()},
+                request.content,
+            )
+            return httpx.Response(
+                response.status, headers={"Content-Type": "application/json", **response.headers}, content=response.body
+            )
+        return httpx.MockTransport(handler)
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "FakeSupabase":
+        """Serve over HTTP on a background thread; url then points at it"""
+        handler = type("Handler", (_FakeSupabaseHandler,), {"fake": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-supabase", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeSupabase":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class _FakeSupabaseHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer headers and body into one write to avoid Nagle/delayed-ACK stalls
+    wbufsize = 64 * 1024
+    fake: FakeSupabase
+
+    def _dispatch(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        delay = self.fake.delay_for(urlsplit(self.path).path)
+        if delay:
+            time.sleep(delay)
+        response = self.fake.handle(
+            self.command, self.path, {key.lower(): value for key, value in self.headers.items()}, body
+        )
+        content = response.body
+        self.send_response(response.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for key, value in response.headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(content)
+
+    do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake Supabase (PostgREST + auth) locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--seed", help="JSON file of {table: [rows]} to load")
+    parser.add_argument("--jwt-secret", default=DEFAULT_JWT_SECRET)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency, up to this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    fake = FakeSupabase(
+        jwt_secret=args.jwt_secret,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+    if args.seed:
+        with open(args.seed) as f:
+            for table, rows in json.load(f).items():
+                fake.seed(table, rows)
+    fake.start(args.host, args.port)
+    print(f"SUPABASE_URL={fake.url}")
+    print(f"SUPABASE_SERVICE_KEY={fake.service_key}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
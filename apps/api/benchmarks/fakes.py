@@ -0,0 +1,253 @@
+"""
+In-memory stand-ins for the services behind the API, shared by the
+benchmarks and the test suite.
+
+- Redis: FakeAsyncRedis, a redis.asyncio look-alike for the commands the
+  app uses (strings with expiry, hashes, pipelines with WATCH/MULTI)
+- Neo4j: FakeNeo4jDriver, which answers the Cypher the app sends (user
+  lookup, registration, schema bootstrap and checks) from a dict
+- Supabase: benchmarks.fake_supabase.FakeSupabase, a local PostgREST/auth server
+
+The Neo4j stand-in can add a fixed latency per call to mimic a network
+round trip.
+"""
+import asyncio
+import time
+from typing import Any, Optional
+
+
+class FakeAsyncRedis:
+    """Minimal in-memory stand-in for the redis.asyncio client used by the app"""
+
+    def __init__(self):
+        self.store: dict[str, Any] = {}
+        self.expiry: dict[str, float] = {}
+
+    def _purge(self, key: str) -> None:
+        if key in self.expiry and self.expiry[key] <= time.monotonic():
+            self.store.pop(key, None)
+            self.expiry.pop(key, None)
+
+    async def ping(self) -> bool:
+        return True
+
+    async def get(self, key: str) -> Optional[str]:
+        self._purge(key)
+        return self.store.get(key)
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+        get: bool = False,
+    ) -> Optional[Any]:
+        self._purge(key)
+        previous = self.store.get(key)
+        if nx and key in self.store:
+            return None
+        self.store[key] = str(value)
+        if ex or px:
+            self.expiry[key] = time.monotonic() + (ex if ex else px / 1000)
+        else:
+            self.expiry.pop(key, None)
+        return previous if get else True
+
+    async def setex(self, key: str, seconds: int, value: Any) -> bool:
+        return await self.set(key, value, ex=seconds)
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        self._purge(key)
+        if key not in self.store:
+            return False
+        self.expiry[key] = time.monotonic() + seconds
+        return True
+
+    async def ttl(self, key: str) -> int:
+        self._purge(key)
+        if key not in self.store:
+            return -2
+        if key not in self.expiry:
+            return -1
+        return max(1, int(self.expiry[key] - time.monotonic()))
+
+    async def exists(self, *keys: str) -> int:
+        for key in keys:
+            self._purge(key)
+        return sum(1 for key in keys if key in self.store)
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self.store.pop(key, None) is not None:
+                removed += 1
+            self.expiry.pop(key, None)
+        return removed
+
+    async def hset(self, key: str, field: str, value: Any) -> int:
+        hash_value = self.store.setdefault(key, {})
+        added = 0 if field in hash_value else 1
+        hash_value[field] = str(value)
+        return added
+
+    async def hget(self, key: str, field: str) -> Optional[str]:
+        return self.store.get(key, {}).get(field)
+
+    async def hmget(self, key: str, fields: list[str]) -> list[Optional[str]]:
+        hash_value = self.store.get(key, {})
+        return [hash_value.get(field) for field in fields]
+
+    async def hgetall(self, key: str) -> dict[str, str]:
+        return dict(self.store.get(key, {}))
+
+    async def hdel(self, key: str, *fields: str) -> int:
+        hash_value = self.store.get(key, {})
+        removed = sum(1 for field in fields if hash_value.pop(field, None) is not None)
+        if key in self.store and not hash_value:
+            del self.store[key]
+        return removed
+
+    async def aclose(self) -> None:
+        pass
+
+    def pipeline(self, transaction: bool = True) -> "FakeAsyncRedisPipeline":
+        return FakeAsyncRedisPipeline(self)
+
+
+class FakeAsyncRedisPipeline:
+    """Queues commands and runs them against FakeAsyncRedis on execute()"""
+
+    def __init__(self, redis: FakeAsyncRedis):
+        self.redis = redis
+        self.commands: list[Any] = []
+        # Between watch() and multi() commands run immediately, as in redis-py
+        self.immediate = False
+
+    async def __aenter__(self) -> "FakeAsyncRedisPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.commands.clear()
+
+    async def watch(self, *keys: str) -> None:
+        self.immediate = True
+
+    def multi(self) -> None:
+        self.immediate = False
+
+    def __getattr__(self, name: str):
+        command = getattr(self.redis, name)
+        if self.immediate:
+            return command
+
+        def queue(*args, **kwargs):
+            self.commands.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> list[Any]:
+        results = [await command(*args, **kwargs) for command, args, kwargs in self.commands]
+        self.commands.clear()
+        return results
+
+
+class _Record(dict):
+    """neo4j.Record look-alike: subscriptable, with data()"""
+
+    def data(self) -> dict:
+        return dict(self)
+
+
+class _Result:
+    def __init__(self, records: list[_Record]):
+        self._records = records
+
+    async def single(self) -> Optional[_Record]:
+        return self._records[0] if self._records else None
+
+    async def consume(self) -> None:
+        return None
+
+    async def __aiter__(self):
+        for record in self._records:
+            yield record
+
+
+class _Transaction:
+    def __init__(self, driver: "FakeNeo4jDriver"):
+        self._driver = driver
+
+    async def run(self, query: str, **params: Any) -> _Result:
+        return _Result(self._driver.execute(query, params))
+
+
+class _Session:
+    def __init__(self, driver: "FakeNeo4jDriver"):
+        self._driver = driver
+
+    async def __aenter__(self) -> "_Session":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    async def run(self, query: str, **params: Any) -> _Result:
+        await asyncio.sleep(self._driver.latency)
+        return _Result(self._driver.execute(query, params))
+
+    async def execute_read(self, work, *args, **kwargs):
+        await asyncio.sleep(self._driver.latency)
+        return await work(_Transaction(self._driver), *args, **kwargs)
+
+    async def execute_write(self, work, *args, **kwargs):
+        await asyncio.sleep(self._driver.latency)
+        return await work(_Transaction(self._driver), *args, **kwargs)
+
+
+class FakeNeo4jDriver:
+    """In-memory neo4j.AsyncDriver look-alike holding :User nodes by email"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.users: dict[str, dict] = {}
+        self.constraints: set[str] = set()
+
+    def session(self, **kwargs: Any) -> _Session:
+        return _Session(self)
+
+    async def verify_connectivity(self) -> None:
+        await asyncio.sleep(self.latency)
+
+    async def close(self) -> None:
+        pass
+
+    def execute(self, query: str, params: dict) -> list[_Record]:
+        statement = " ".join(query.split())
+        if statement.startswith("CREATE CONSTRAINT"):
+            self.constraints.add(statement.split()[2])
+            return []
+        if statement.startswith("SHOW CONSTRAINTS"):
+            return [_Record(name=name) for name in sorted(self.constraints)]
+        if statement.startswith("SHOW INDEXES"):
+            return [
+                _Record(name=name, state="ONLINE", populationPercent=100.0, properties=[name.split("_")[1]])
+                for name in sorted(self.constraints)
+            ]
+        if statement.startswith("MATCH (u:User {email: $email}) RETURN u"):
+            user = self.users.get(params["email"])
+            return [_Record(u=dict(user))] if user else []
+        if "RETURN email_taken, username_taken" in statement:
+            email_taken = params["email"] in self.users
+            username_taken = any(user["username"] == params["username"] for user in self.users.values())
+            if "CREATE (:User" in statement and not email_taken and not username_taken:
+                self.users[params["email"]] = {
+                    key: params[key] for key in (
+                        "id", "email", "username", "full_name", "password_hash",
+                        "role", "status", "created_at", "updated_at",
+                    )
+                }
+            return [_Record(email_taken=email_taken, username_taken=username_taken)]
+        raise NotImplementedError(f"FakeNeo4jDriver does not understand: {statement[:80]}")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+JSON serialization benchmark.
+
+Compares per-route request parsing and response serialization cost before
+and after the switch to app.serialization.FastJSONRoute:
+
+- before: FastAPI's stock APIRoute, i.e. stdlib json for request bodies, and
+  jsonable_encoder + json.dumps for PATCH /professional-info, which had no
+  response_model
+- after: FastJSONRoute (orjson request parsing) with PATCH /professional-info
+  on UpdateProfessionalInfoResponse, so every route below is serialised by
+  Pydantic straight to bytes
+
+Each route is mounted with the real request/response models on two
+otherwise identical apps and driven in-process through ASGI, so no network
+or Supabase is involved. The handlers return fixed payloads; the difference
+between the two apps is the JSON cost.
+
+Usage (from apps/api):
+    python -m benchmarks.json_serialization --iterations 2000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+
+from app.api.account import (
+    ProfessionalInfoResponse,
+    UpdateProfessionalInfoRequest,
+    UpdateProfessionalInfoResponse,
+)
+from app.api.onboarding import OnboardingProgressRequest, OnboardingProgressResponse
+from app.serialization import FastJSONRoute
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def _professional_info() -> dict:
+    return {
+        "id": "bench",
+        "profile_id": "user-1",
+        "role_type": "provider",
+        "subjects": ["Mathematics", "Physics", "Chemistry", "Further Mathematics"],
+        "teaching_experience": "5-10 years",
+        "hourly_rate": 45.0,
+        "qualifications": ["BSc Physics", "PGCE", "QTS"],
+        "teaching_methods": ["Socratic", "Worked examples", "Past papers"],
+        "availability": {
+            day: [{"start": f"{hour:02d}:00", "end": f"{hour + 1:02d}:00", "online": hour % 2 == 0} for hour in range(8, 20)]
+            for day in DAYS
+        },
+        "specializations": ["GCSE", "A-Level", "IB", "Oxbridge admissions"],
+        "created_at": "2025-10-05T00:00:00Z",
+        "updated_at": "2025-10-05T00:00:00Z",
+    }
+
+
+def _step_data(fields: int) -> dict:
+    return {
+        f"step_{step}": {
+            f"field_{i}": {"value": f"answer {i}" * 4, "touched": True, "tags": ["a", "b", "c"]}
+            for i in range(fields)
+        }
+        for step in range(1, 6)
+    }
+
+
+def build_app(fast: bool, step_fields: int) -> FastAPI:
+    professional_info = _professional_info()
+    step_data = _step_data(step_fields)
+    route_class = FastJSONRoute if fast else APIRoute
+    update_response_model = UpdateProfessionalInfoResponse if fast else None
+
+    app = FastAPI()
+    app.router.route_class = route_class
+    router = APIRouter(route_class=route_class)
+
+    @router.get("/api/account/professional-info", response_model=ProfessionalInfoResponse)
+    async def get_professional_info():
+        return professional_info
+
+    @router.patch("/api/account/professional-info", response_model=update_response_model)
+    async def update_professional_info(data: UpdateProfessionalInfoRequest):
+        return {"success": True, "message": "Template saved", "data": {**professional_info, **data.model_dump(exclude_none=True)}}
+
+    @router.get("/api/onboarding/progress/{role_type}", response_model=OnboardingProgressResponse)
+    async def get_onboarding_progress(role_type: str):
+        return OnboardingProgressResponse(success=True, message="ok", current_step=3, step_data=step_data, version=1)
+
+    @router.post("/api/onboarding/save-progress", response_model=OnboardingProgressResponse)
+    async def save_onboarding_progress(request: OnboardingProgressRequest):
+        return OnboardingProgressResponse(success=True, message="ok", current_step=request.step, step_data=request.data, version=1)
+
+    app.include_router(router)
+    return app
+
+
+def routes(step_fields: int) -> dict[str, tuple[str, str, bytes]]:
+    professional_info = _professional_info()
+    update = {key: professional_info[key] for key in ("subjects", "qualifications", "availability")}
+    save = {"step": 3, "role_type": "tutor", "data": _step_data(step_fields)}
+    return {
+        "GET /api/account/professional-info": ("GET", "/api/account/professional-info", b""),
+        "PATCH /api/account/professional-info": (
+            "PATCH", "/api/account/professional-info", json.dumps({"role_type": "provider", **update}).encode()
+        ),
+        "GET /api/onboarding/progress/{role_type}": ("GET", "/api/onboarding/progress/tutor", b""),
+        "POST /api/onboarding/save-progress": ("POST", "/api/onboarding/save-progress", json.dumps(save).encode()),
+    }
+
+
+async def call(app: FastAPI, method: str, path: str, body: bytes) -> bytes:
+    """Run one request through the ASGI app and return the response body"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    chunks = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{method} {path} returned {message['status']}")
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(chunks)
+
+
+async def bench(app: FastAPI, request: tuple[str, str, bytes], iterations: int) -> list[float]:
+    for _ in range(min(100, iterations)):
+        await call(app, *request)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call(app, *request)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _summarise(timings: list[float]) -> dict:
+    ordered = sorted(timings)
+    return {
+        "mean_us": round(statistics.mean(ordered) * 1e6, 1),
+        "p50_us": round(ordered[len(ordered) // 2] * 1e6, 1),
+        "p95_us": round(ordered[int(len(ordered) * 0.95) - 1] * 1e6, 1),
+    }
+
+
+async def main(iterations: int, step_fields: int) -> dict:
+    stock = build_app(False, step_fields)
+    fast = build_app(True, step_fields)
+
+    results = {}
+    for name, request in routes(step_fields).items():
+        # Both configurations must produce the same JSON
+        assert json.loads(await call(stock, *request)) == json.loads(await call(fast, *request))
+        before = _summarise(await bench(stock, request, iterations))
+        after = _summarise(await bench(fast, request, iterations))
+        results[name] = {
+            "request_bytes": len(request[2]),
+            "response_bytes": len(await call(fast, *request)),
+            "before": before,
+            "after": after,
+            "saved_us": round(before["mean_us"] - after["mean_us"], 1),
+        }
+    return {"iterations": iterations, "step_fields": step_fields, "routes": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--step-fields", type=int, default=20, help="Fields per onboarding step in step_data")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.iterations, args.step_fields)), indent=2))
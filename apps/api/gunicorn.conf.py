@@ -0,0 +1,69 @@
+# gunicorn.conf.py
+"""
+Gunicorn hooks for the Tutorwise backend.
+
+The application is preloaded: the master imports app.main once and every
+worker, including those recycled by --max-requests, is forked with the code
+already imported instead of importing it again (the Redis, Neo4j and
+Supabase client packages, which the app imports lazily, are imported in
+when_ready for the same reason). Connections are never
+shared with the master: post_fork drops anything a worker inherited, and the
+app's lifespan then opens the worker's own Redis, Neo4j and Supabase pools on
+the worker's event loop (async clients cannot be created before it exists)
+and warms them (Redis pings, Neo4j verify_connectivity, Supabase requests)
+before the worker accepts connections.
+
+Prometheus multiprocess mode keeps one metrics file per worker in
+PROMETHEUS_MULTIPROC_DIR. The directory is emptied when the master starts so
+values from a previous run are not reported, and a worker's live gauges are
+dropped when it exits (e.g. when recycled by --max-requests).
+"""
+import gc
+import os
+import shutil
+
+preload_app = True
+
+
+def _reset_multiproc_dir():
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+# Preloading runs before on_starting and already writes metrics, so the
+# directory is reset when gunicorn reads this file. A HUP re-reads it while
+# workers are running, hence the marker.
+if not os.getenv("TUTORWISE_GUNICORN_MASTER"):
+    os.environ["TUTORWISE_GUNICORN_MASTER"] = str(os.getpid())
+    _reset_multiproc_dir()
+
+
+def when_ready(server):
+    # app.main imports the client packages lazily; import them once here so
+    # workers do not each import them after the fork
+    from app.db import import_client_packages
+
+    import_client_packages()
+
+
+def pre_fork(server, worker):
+    # Keep the preloaded objects out of the collector's generations so that
+    # collections in the worker do not touch (and copy) the pages shared
+    # with the master
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app.db import reset_connections
+    from app.startup import startup_timer
+
+    reset_connections()
+    startup_timer.mark_forked()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
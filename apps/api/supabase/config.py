@@ -12,18 +12,24 @@ class SupabaseConfig:
         self.url: str = os.getenv("SUPABASE_URL", "")
         self.key: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
         self.anon_key: str = os.getenv("SUPABASE_ANON_KEY", "")
+        self._client: Optional[Client] = None
+        self._public_client: Optional[Client] = None
 
     def get_client(self) -> Client:
-        """Get Supabase client with service role key"""
+        """Get the process-wide Supabase client with service role key"""
         if not self.url or not self.key:
             raise ValueError("Supabase URL and service role key must be set")
-        return create_client(self.url, self.key)
+        if self._client is None:
+            self._client = create_client(self.url, self.key)
+        return self._client
 
     def get_public_client(self) -> Client:
-        """Get Supabase client with anonymous key for public operations"""
+        """Get the process-wide Supabase client with anonymous key for public operations"""
         if not self.url or not self.anon_key:
             raise ValueError("Supabase URL and anonymous key must be set")
-        return create_client(self.url, self.anon_key)
+        if self._public_client is None:
+            self._public_client = create_client(self.url, self.anon_key)
+        return self._public_client
 
 # Global instance
 supabase_config = SupabaseConfig()
\ No newline at end of file
@@ -2,18 +2,19 @@
 Test configuration and fixtures for the Tutorwise backend.
 """
 import pytest
+import pytest_asyncio
 import asyncio
 from typing import AsyncGenerator, Generator
 from unittest.mock import AsyncMock, MagicMock
 import os
-from httpx import AsyncClient
+from httpx import ASGITransport, AsyncClient
 from fastapi.testclient import TestClient
 
 # Set test environment
 os.environ["ENV"] = "test"
+os.environ.setdefault("JWT_SECRET_KEY", "test-jwt-secret-key-with-enough-bytes-for-hs256")
 
 from app.main import app
-from app.db import redis_client, neo4j_driver
 
 
 @pytest.fixture(scope="session")
@@ -30,44 +31,46 @@ def test_client() -> TestClient:
     return TestClient(app)
 
 
-@pytest.fixture
+@pytest_asyncio.fixture
 async def async_test_client() -> AsyncGenerator[AsyncClient, None]:
     """Create an async test client for the FastAPI app."""
-    async with AsyncClient(app=app, base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         yield client
 
 
 @pytest.fixture
 def mock_redis():
-    """Mock Redis client for testing."""
+    """Mock asyncio Redis client for testing."""
     mock = MagicMock()
-    mock.ping.return_value = True
-    mock.get.return_value = None
-    mock.set.return_value = True
-    mock.delete.return_value = 1
-    mock.exists.return_value = False
+    mock.ping = AsyncMock(return_value=True)
+    mock.get = AsyncMock(return_value=None)
+    mock.set = AsyncMock(return_value=True)
+    mock.setex = AsyncMock(return_value=True)
+    mock.delete = AsyncMock(return_value=1)
+    mock.exists = AsyncMock(return_value=False)
+    mock.aclose = AsyncMock()
     return mock
 
 
 @pytest.fixture
 def mock_neo4j_driver():
-    """Mock Neo4j driver for testing."""
+    """Mock async Neo4j driver for testing."""
     mock_driver = MagicMock()
     mock_session = MagicMock()
-    mock_driver.session.return_value.__enter__.return_value = mock_session
-    mock_driver.session.return_value.__exit__.return_value = None
-    mock_driver.verify_connectivity.return_value = None
+    mock_driver.session.return_value.__aenter__.return_value = mock_session
+    mock_driver.verify_connectivity = AsyncMock(return_value=None)
+    mock_driver.close = AsyncMock()
     return mock_driver
 
 
 @pytest.fixture
 def mock_neo4j_session():
-    """Mock Neo4j session for testing."""
+    """Mock async Neo4j session for testing."""
     mock_session = MagicMock()
     mock_result = MagicMock()
-    mock_session.run.return_value = mock_result
-    mock_session.write_transaction.return_value = None
-    mock_session.read_transaction.return_value = None
+    mock_session.run = AsyncMock(return_value=mock_result)
+    mock_session.execute_write = AsyncMock(return_value=None)
+    mock_session.execute_read = AsyncMock(return_value=None)
     return mock_session
 
 
@@ -82,6 +85,41 @@ def setup_test_environment(monkeypatch):
     monkeypatch.setenv("ALLOWED_ORIGINS", "http://localhost:3000")
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty in-process caches."""
+    from app.cache import cache_registry
+    for cache in cache_registry.values():
+        cache.local.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    """Start every test with closed circuits, whatever earlier tests failed."""
+    from app.circuit_breaker import breakers
+    for breaker in breakers.values():
+        breaker.reset()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limiter():
+    """Start every test with fresh rate limit buckets."""
+    from app.rate_limit import rate_limiter
+    rate_limiter.reset()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_health_snapshot():
+    """Make every test probe dependencies afresh instead of reusing a snapshot."""
+    from app.api.health import health_monitor
+    health_monitor.reset()
+    yield
+    health_monitor.reset()
+
+
 @pytest.fixture
 def sample_user_data():
     """Sample user data for testing."""
@@ -1,24 +1,32 @@
 """
 Integration tests for the health check endpoint.
 """
+import asyncio
+
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi.testclient import TestClient
 
 
 class TestHealthEndpoint:
     """Test health check endpoint functionality."""
 
+    @pytest.fixture(autouse=True)
+    def supabase_client(self):
+        """Health reports Supabase as ok only when the shared client exists."""
+        with patch('app.db.supabase_client', MagicMock()):
+            yield
+
     def test_health_endpoint_all_services_healthy(self, test_client):
         """Test health endpoint when all services are healthy."""
         mock_redis = MagicMock()
-        mock_redis.ping.return_value = True
+        mock_redis.ping = AsyncMock(return_value=True)
 
         mock_neo4j = MagicMock()
-        mock_neo4j.verify_connectivity.return_value = None
+        mock_neo4j.verify_connectivity = AsyncMock(return_value=None)
 
-        with patch('app.api.health.redis_client', mock_redis):
-            with patch('app.api.health.neo4j_driver', mock_neo4j):
+        with patch('app.db.redis_client', mock_redis):
+            with patch('app.db.neo4j_driver', mock_neo4j):
                 response = test_client.get("/health")
 
                 assert response.status_code == 200
@@ -33,10 +41,10 @@ class TestHealthEndpoint:
     def test_health_endpoint_redis_not_configured(self, test_client):
         """Test health endpoint when Redis is not configured."""
         mock_neo4j = MagicMock()
-        mock_neo4j.verify_connectivity.return_value = None
+        mock_neo4j.verify_connectivity = AsyncMock(return_value=None)
 
-        with patch('app.api.health.redis_client', None):
-            with patch('app.api.health.neo4j_driver', mock_neo4j):
+        with patch('app.db.redis_client', None):
+            with patch('app.db.neo4j_driver', mock_neo4j):
                 response = test_client.get("/health")
 
                 assert response.status_code == 200
@@ -50,10 +58,10 @@ class TestHealthEndpoint:
     def test_health_endpoint_neo4j_not_configured(self, test_client):
         """Test health endpoint when Neo4j is not configured."""
         mock_redis = MagicMock()
-        mock_redis.ping.return_value = True
+        mock_redis.ping = AsyncMock(return_value=True)
 
-        with patch('app.api.health.redis_client', mock_redis):
-            with patch('app.api.health.neo4j_driver', None):
+        with patch('app.db.redis_client', mock_redis):
+            with patch('app.db.neo4j_driver', None):
                 response = test_client.get("/health")
 
                 assert response.status_code == 200
@@ -67,13 +75,13 @@ class TestHealthEndpoint:
     def test_health_endpoint_redis_connection_error(self, test_client):
         """Test health endpoint when Redis connection fails."""
         mock_redis = MagicMock()
-        mock_redis.ping.side_effect = Exception("Connection refused")
+        mock_redis.ping = AsyncMock(side_effect=Exception("Connection refused"))
 
         mock_neo4j = MagicMock()
-        mock_neo4j.verify_connectivity.return_value = None
+        mock_neo4j.verify_connectivity = AsyncMock(return_value=None)
 
-        with patch('app.api.health.redis_client', mock_redis):
-            with patch('app.api.health.neo4j_driver', mock_neo4j):
+        with patch('app.db.redis_client', mock_redis):
+            with patch('app.db.neo4j_driver', mock_neo4j):
                 response = test_client.get("/health")
 
                 assert response.status_code == 200
@@ -88,13 +96,13 @@ class TestHealthEndpoint:
     def test_health_endpoint_neo4j_connection_error(self, test_client):
         """Test health endpoint when Neo4j connection fails."""
         mock_redis = MagicMock()
-        mock_redis.ping.return_value = True
+        mock_redis.ping = AsyncMock(return_value=True)
 
         mock_neo4j = MagicMock()
-        mock_neo4j.verify_connectivity.side_effect = Exception("Database unavailable")
+        mock_neo4j.verify_connectivity = AsyncMock(side_effect=Exception("Database unavailable"))
 
-        with patch('app.api.health.redis_client', mock_redis):
-            with patch('app.api.health.neo4j_driver', mock_neo4j):
+        with patch('app.db.redis_client', mock_redis):
+            with patch('app.db.neo4j_driver', mock_neo4j):
                 response = test_client.get("/health")
 
                 assert response.status_code == 200
@@ -109,13 +117,13 @@ class TestHealthEndpoint:
     def test_health_endpoint_all_services_down(self, test_client):
         """Test health endpoint when all services are down."""
         mock_redis = MagicMock()
-        mock_redis.ping.side_effect = Exception("Redis down")
+        mock_redis.ping = AsyncMock(side_effect=Exception("Redis down"))
 
         mock_neo4j = MagicMock()
-        mock_neo4j.verify_connectivity.side_effect = Exception("Neo4j down")
+        mock_neo4j.verify_connectivity = AsyncMock(side_effect=Exception("Neo4j down"))
 
-        with patch('app.api.health.redis_client', mock_redis):
-            with patch('app.api.health.neo4j_driver', mock_neo4j):
+        with patch('app.db.redis_client', mock_redis):
+            with patch('app.db.neo4j_driver', mock_neo4j):
                 response = test_client.get("/health")
 
                 assert response.status_code == 200
@@ -129,54 +137,78 @@ class TestHealthEndpoint:
     async def test_health_endpoint_async_client(self, async_test_client):
         """Test health endpoint with async client."""
         mock_redis = MagicMock()
-        mock_redis.ping.return_value = True
+        mock_redis.ping = AsyncMock(return_value=True)
 
         mock_neo4j = MagicMock()
-        mock_neo4j.verify_connectivity.return_value = None
+        mock_neo4j.verify_connectivity = AsyncMock(return_value=None)
 
-        with patch('app.api.health.redis_client', mock_redis):
-            with patch('app.api.health.neo4j_driver', mock_neo4j):
+        with patch('app.db.redis_client', mock_redis):
+            with patch('app.db.neo4j_driver', mock_neo4j):
                 response = await async_test_client.get("/health")
 
                 assert response.status_code == 200
                 data = response.json()
                 assert data["status"] == "ok"
 
-    def test_health_endpoint_redis_retry_logic(self, test_client):
-        """Test health endpoint Redis retry logic."""
+    def test_health_endpoint_redis_not_retried(self, test_client):
+        """Test a failing Redis probe reports an error without retry sleeps."""
         mock_redis = MagicMock()
-        # Fail twice, then succeed
-        mock_redis.ping.side_effect = [
-            Exception("Temp failure 1"),
-            Exception("Temp failure 2"),
-            True
-        ]
+        mock_redis.ping = AsyncMock(side_effect=Exception("Temp failure"))
 
         mock_neo4j = MagicMock()
-        mock_neo4j.verify_connectivity.return_value = None
+        mock_neo4j.verify_connectivity = AsyncMock(return_value=None)
 
-        with patch('app.api.health.redis_client', mock_redis):
-            with patch('app.api.health.neo4j_driver', mock_neo4j):
-                with patch('asyncio.sleep'):  # Mock sleep to speed up test
+        with patch('app.db.redis_client', mock_redis):
+            with patch('app.db.neo4j_driver', mock_neo4j):
+                with patch('asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
                     response = test_client.get("/health")
 
                     assert response.status_code == 200
                     data = response.json()
 
-                    assert data["status"] == "ok"
-                    assert data["services"]["redis"]["status"] == "ok"
-                    assert mock_redis.ping.call_count == 3
+                    assert data["services"]["redis"]["status"] == "error"
+                    assert mock_redis.ping.call_count == 1
+                    mock_sleep.assert_not_called()
+
+    def test_health_endpoint_serves_cached_snapshot(self, test_client):
+        """Test repeated requests reuse the snapshot instead of re-probing."""
+        mock_redis = MagicMock()
+        mock_redis.ping = AsyncMock(return_value=True)
+
+        mock_neo4j = MagicMock()
+        mock_neo4j.verify_connectivity = AsyncMock(return_value=None)
+
+        with patch('app.db.redis_client', mock_redis):
+            with patch('app.db.neo4j_driver', mock_neo4j):
+                first = test_client.get("/health").json()
+                second = test_client.get("/health").json()
+
+                assert first["timestamp"] == second["timestamp"]
+                assert mock_redis.ping.call_count == 1
+                assert mock_neo4j.verify_connectivity.call_count == 1
+
+    def test_health_endpoint_never_creates_clients(self, test_client):
+        """Test probes do not build temporary clients when none are connected."""
+        with patch('app.db.redis_client', None):
+            with patch('app.db.neo4j_driver', None):
+                with patch('redis.asyncio.Redis.from_pool') as redis_from_url:
+                    with patch('neo4j.AsyncGraphDatabase.driver') as neo4j_driver:
+                        response = test_client.get("/health")
+
+                        assert response.status_code == 200
+                        redis_from_url.assert_not_called()
+                        neo4j_driver.assert_not_called()
 
     def test_health_endpoint_response_format(self, test_client):
         """Test health endpoint response format."""
         mock_redis = MagicMock()
-        mock_redis.ping.return_value = True
+        mock_redis.ping = AsyncMock(return_value=True)
 
         mock_neo4j = MagicMock()
-        mock_neo4j.verify_connectivity.return_value = None
+        mock_neo4j.verify_connectivity = AsyncMock(return_value=None)
 
-        with patch('app.api.health.redis_client', mock_redis):
-            with patch('app.api.health.neo4j_driver', mock_neo4j):
+        with patch('app.db.redis_client', mock_redis):
+            with patch('app.db.neo4j_driver', mock_neo4j):
                 response = test_client.get("/health")
 
                 assert response.status_code == 200
@@ -200,14 +232,78 @@ class TestHealthEndpoint:
 
     def test_health_endpoint_content_type(self, test_client):
         """Test health endpoint returns correct content type."""
-        with patch('app.api.health.redis_client', MagicMock()):
-            with patch('app.api.health.neo4j_driver', MagicMock()):
+        mock_redis = MagicMock()
+        mock_redis.ping = AsyncMock(return_value=True)
+        mock_neo4j = MagicMock()
+        mock_neo4j.verify_connectivity = AsyncMock(return_value=None)
+
+        with patch('app.db.redis_client', mock_redis):
+            with patch('app.db.neo4j_driver', mock_neo4j):
                 response = test_client.get("/health")
 
                 assert response.status_code == 200
                 assert response.headers["content-type"] == "application/json"
 
 
+class TestProbes:
+    """Test liveness and readiness probes."""
+
+    def test_livez_does_not_touch_dependencies(self, test_client):
+        """Test liveness succeeds even with every dependency down."""
+        mock_redis = MagicMock()
+        mock_redis.ping = AsyncMock(side_effect=Exception("Redis down"))
+
+        with patch('app.db.redis_client', mock_redis):
+            response = test_client.get("/livez")
+
+            assert response.status_code == 200
+            assert response.json() == {"status": "ok"}
+            mock_redis.ping.assert_not_called()
+
+    def test_readyz_before_first_snapshot(self, test_client):
+        """Test readiness fails until the monitor has probed once."""
+        response = test_client.get("/readyz")
+
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+
+    @pytest.mark.asyncio
+    async def test_readyz_reflects_snapshot(self, test_client):
+        """Test readiness follows the cached snapshot."""
+        from app.api.health import health_monitor
+
+        mock_redis = MagicMock()
+        mock_redis.ping = AsyncMock(return_value=True)
+        mock_neo4j = MagicMock()
+        mock_neo4j.verify_connectivity = AsyncMock(side_effect=Exception("Neo4j down"))
+
+        with patch('app.db.redis_client', mock_redis):
+            with patch('app.db.neo4j_driver', mock_neo4j):
+                await health_monitor.refresh()
+                assert test_client.get("/readyz").status_code == 503
+
+                mock_neo4j.verify_connectivity = AsyncMock(return_value=None)
+                await health_monitor.refresh()
+                response = test_client.get("/readyz")
+
+                assert response.status_code == 200
+                assert response.json()["ready"] is True
+
+    @pytest.mark.asyncio
+    async def test_background_monitor_refreshes_snapshot(self):
+        """Test the monitor task probes on its own and stops cleanly."""
+        from app.api.health import HealthMonitor
+
+        monitor = HealthMonitor(interval=0.01)
+        with patch('app.db.redis_client', None), patch('app.db.neo4j_driver', None):
+            monitor.start()
+            await asyncio.sleep(0.05)
+            await monitor.stop()
+
+        assert monitor.snapshot is not None
+        assert monitor.snapshot["services"]["redis"]["status"] == "not_configured"
+
+
 class TestDevRoutes:
     """Test development routes."""
 
@@ -215,21 +311,21 @@ class TestDevRoutes:
         """Test successful Neo4j write operation."""
         mock_driver = MagicMock()
         mock_session = MagicMock()
-        mock_driver.session.return_value.__enter__.return_value = mock_session
-        mock_driver.session.return_value.__exit__.return_value = None
+        mock_session.execute_write = AsyncMock(return_value=None)
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
 
-        with patch('app.api.dev_routes.neo4j_driver', mock_driver):
+        with patch('app.db.neo4j_driver', mock_driver):
             response = test_client.post("/test-neo4j-write")
 
             assert response.status_code == 200
             data = response.json()
             assert data["status"] == "ok"
             assert "Successfully wrote test node" in data["message"]
-            mock_session.write_transaction.assert_called_once()
+            mock_session.execute_write.assert_awaited_once()
 
     def test_test_neo4j_write_driver_not_available(self, test_client):
         """Test Neo4j write when driver is not available."""
-        with patch('app.api.dev_routes.neo4j_driver', None):
+        with patch('app.db.neo4j_driver', None):
             response = test_client.post("/test-neo4j-write")
 
             assert response.status_code == 503
@@ -240,11 +336,10 @@ class TestDevRoutes:
         """Test Neo4j write with database error."""
         mock_driver = MagicMock()
         mock_session = MagicMock()
-        mock_session.write_transaction.side_effect = Exception("Database error")
-        mock_driver.session.return_value.__enter__.return_value = mock_session
-        mock_driver.session.return_value.__exit__.return_value = None
+        mock_session.execute_write = AsyncMock(side_effect=Exception("Database error"))
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
 
-        with patch('app.api.dev_routes.neo4j_driver', mock_driver):
+        with patch('app.db.neo4j_driver', mock_driver):
             response = test_client.post("/test-neo4j-write")
 
             assert response.status_code == 500
@@ -2,15 +2,20 @@
 Unit tests for account API endpoints
 Tests professional info template management
 """
+import time
+
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-from fastapi import HTTPException
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
+from fastapi import Depends, FastAPI, HTTPException, Response
+from fastapi.testclient import TestClient
 from app.api.account import (
     get_professional_info,
     update_professional_info,
     UpdateProfessionalInfoRequest,
     verify_token
 )
+from app.db import get_supabase
+from app.token_verifier import SigningKeyUnavailable
 
 
 class TestVerifyToken:
@@ -31,6 +36,69 @@ class TestVerifyToken:
             await verify_token("InvalidFormat")
         assert exc_info.value.status_code == 401
 
+    @pytest.mark.asyncio
+    async def test_valid_token_verified_locally(self):
+        """Should return the user ID without calling the Supabase auth server"""
+        mock_supabase = MagicMock()
+        mock_verifier = MagicMock()
+        mock_verifier.verify = AsyncMock(return_value={"sub": "user-123", "exp": time.time() + 3600})
+
+        with patch('app.api.account.get_token_verifier', return_value=mock_verifier):
+            with patch('app.api.account.get_supabase', return_value=mock_supabase):
+                user_id = await verify_token("Bearer token")
+
+        assert user_id == "user-123"
+        mock_supabase.auth.get_user.assert_not_called()
+
+    def test_local_verification_without_supabase_client(self):
+        """Should accept locally verifiable tokens when the Supabase client is not initialised"""
+        app = FastAPI()
+
+        @app.get("/me")
+        async def me(user_id: str = Depends(verify_token)):
+            return {"user_id": user_id}
+
+        mock_verifier = MagicMock()
+        mock_verifier.verify = AsyncMock(return_value={"sub": "user-123", "exp": time.time() + 3600})
+
+        with patch('app.api.account.get_token_verifier', return_value=mock_verifier):
+            with patch('app.db.supabase_client', None):
+                response = TestClient(app).get("/me", headers={"Authorization": "Bearer token"})
+
+        assert response.json() == {"user_id": "user-123"}
+
+    @pytest.mark.asyncio
+    async def test_remote_fallback_when_enabled(self, monkeypatch):
+        """Should call supabase.auth.get_user only when no local key is available"""
+        monkeypatch.setenv("SUPABASE_AUTH_REMOTE_FALLBACK", "true")
+        mock_supabase = MagicMock()
+        mock_supabase.auth.get_user = AsyncMock(return_value=Mock(user=Mock(id="user-456")))
+        mock_verifier = MagicMock()
+        mock_verifier.verify = AsyncMock(side_effect=SigningKeyUnavailable("no key"))
+
+        with patch('app.api.account.get_token_verifier', return_value=mock_verifier):
+            with patch('app.api.account.get_supabase', return_value=mock_supabase):
+                user_id = await verify_token("Bearer token")
+
+        assert user_id == "user-456"
+        mock_supabase.auth.get_user.assert_awaited_once_with("token")
+
+    @pytest.mark.asyncio
+    async def test_no_remote_fallback_by_default(self, monkeypatch):
+        """Should reject tokens without a local key when fallback is disabled"""
+        monkeypatch.delenv("SUPABASE_AUTH_REMOTE_FALLBACK", raising=False)
+        mock_supabase = MagicMock()
+        mock_verifier = MagicMock()
+        mock_verifier.verify = AsyncMock(side_effect=SigningKeyUnavailable("no key"))
+
+        with patch('app.api.account.get_token_verifier', return_value=mock_verifier):
+            with patch('app.api.account.get_supabase', return_value=mock_supabase):
+                with pytest.raises(HTTPException) as exc_info:
+                    await verify_token("Bearer token")
+
+        assert exc_info.value.status_code == 401
+        mock_supabase.auth.get_user.assert_not_called()
+
 
 class TestGetProfessionalInfo:
     """Test GET /api/account/professional-info endpoint"""
@@ -52,13 +120,14 @@ class TestGetProfessionalInfo:
             'updated_at': '2025-10-05T00:00:00Z'
         }]
 
-        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = mock_response
+        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute = AsyncMock(return_value=mock_response)
 
         # Call function
         result = await get_professional_info(
             role_type='provider',
             user_id='user-123',
-            supabase=mock_supabase
+            supabase=mock_supabase,
+            response=Response()
         )
 
         assert result['role_type'] == 'provider'
@@ -73,14 +142,15 @@ class TestGetProfessionalInfo:
         mock_response = MagicMock()
         mock_response.data = []
 
-        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value = mock_response
+        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute = AsyncMock(return_value=mock_response)
 
         # Should raise 404
         with pytest.raises(HTTPException) as exc_info:
             await get_professional_info(
                 role_type='provider',
                 user_id='user-123',
-                supabase=mock_supabase
+                supabase=mock_supabase,
+                response=Response()
             )
 
         assert exc_info.value.status_code == 404
@@ -119,7 +189,7 @@ class TestUpdateProfessionalInfo:
             'updated_at': '2025-10-05T00:00:00Z'
         }]
 
-        mock_supabase.table.return_value.upsert.return_value.execute.return_value = mock_response
+        mock_supabase.table.return_value.upsert.return_value.execute = AsyncMock(return_value=mock_response)
 
         # Call function
         result = await update_professional_info(
@@ -153,7 +223,7 @@ class TestUpdateProfessionalInfo:
             'updated_at': '2025-10-05T00:00:00Z'
         }]
 
-        mock_supabase.table.return_value.upsert.return_value.execute.return_value = mock_response
+        mock_supabase.table.return_value.upsert.return_value.execute = AsyncMock(return_value=mock_response)
 
         # Call function
         result = await update_professional_info(
@@ -179,7 +249,7 @@ class TestUpdateProfessionalInfo:
         mock_response = MagicMock()
         mock_response.data = None
 
-        mock_supabase.table.return_value.upsert.return_value.execute.return_value = mock_response
+        mock_supabase.table.return_value.upsert.return_value.execute = AsyncMock(return_value=mock_response)
 
         # Should raise 500
         with pytest.raises(HTTPException) as exc_info:
@@ -191,3 +261,96 @@ class TestUpdateProfessionalInfo:
 
         assert exc_info.value.status_code == 500
         assert "Failed to update" in exc_info.value.detail
+
+
+class TestProfessionalInfoETag:
+    """Test conditional GET on /api/account/professional-info"""
+
+    @pytest.fixture
+    def client(self, test_client):
+        from app.main import app
+        from app.db import get_supabase
+        from benchmarks.fakes import FakeAsyncRedis
+
+        supabase = MagicMock()
+        row = {
+            'id': 'test-id',
+            'profile_id': 'user-123',
+            'role_type': 'provider',
+            'subjects': ['Mathematics'],
+            'created_at': '2025-10-05T00:00:00Z',
+            'updated_at': '2025-10-05T00:00:00Z'
+        }
+        select = supabase.table.return_value.select.return_value.eq.return_value.eq.return_value
+        select.execute = AsyncMock(return_value=MagicMock(data=[row]))
+        supabase.table.return_value.upsert.return_value.execute = AsyncMock(
+            return_value=MagicMock(data=[{**row, 'subjects': ['Physics']}])
+        )
+        app.dependency_overrides[verify_token] = lambda: 'user-123'
+        app.dependency_overrides[get_supabase] = lambda: supabase
+        with patch('app.db.redis_client', FakeAsyncRedis()):
+            yield test_client, select.execute
+        app.dependency_overrides.clear()
+
+    def test_matching_etag_returns_304_after_checking_updated_at(self, client):
+        """Should answer revalidation from the cached validator once updated_at confirms it"""
+        test_client, execute = client
+
+        first = test_client.get("/api/account/professional-info", params={"role_type": "provider"})
+        etag = first.headers["etag"]
+        second = test_client.get(
+            "/api/account/professional-info", params={"role_type": "provider"},
+            headers={"If-None-Match": etag}
+        )
+
+        assert first.status_code == 200
+        assert etag.startswith('"') and not etag.startswith('W/')
+        assert first.headers["cache-control"] == "private, no-cache"
+        assert second.status_code == 304
+        assert second.headers["etag"] == etag
+        assert second.content == b""
+        assert execute.await_count == 2
+        supabase = test_client.app.dependency_overrides[get_supabase]()
+        assert supabase.table.return_value.select.call_args.args == ("updated_at",)
+
+    def test_direct_supabase_write_is_not_answered_with_304(self, client):
+        """Should return the new row when it changed without going through this API"""
+        test_client, execute = client
+        first = test_client.get("/api/account/professional-info", params={"role_type": "provider"})
+        row = {**first.json(), 'subjects': ['Chemistry'], 'updated_at': '2025-10-06T00:00:00Z'}
+        execute.return_value = MagicMock(data=[row])
+
+        second = test_client.get(
+            "/api/account/professional-info", params={"role_type": "provider"},
+            headers={"If-None-Match": first.headers["etag"]}
+        )
+
+        assert second.status_code == 200
+        assert second.json()["subjects"] == ["Chemistry"]
+        assert second.headers["etag"] != first.headers["etag"]
+
+    def test_stale_etag_returns_full_body(self, client):
+        """Should return 200 with the current ETag when the client's copy is outdated"""
+        test_client, _ = client
+
+        response = test_client.get(
+            "/api/account/professional-info", params={"role_type": "provider"},
+            headers={"If-None-Match": '"outdated"'}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["subjects"] == ["Mathematics"]
+        assert response.headers["etag"] != '"outdated"'
+
+    def test_update_invalidates_validator(self, client):
+        """Should revalidate against Supabase after the template is updated"""
+        test_client, execute = client
+        etag = test_client.get("/api/account/professional-info", params={"role_type": "provider"}).headers["etag"]
+
+        test_client.patch("/api/account/professional-info", json={"role_type": "provider", "subjects": ["Physics"]})
+        test_client.get(
+            "/api/account/professional-info", params={"role_type": "provider"},
+            headers={"If-None-Match": etag}
+        )
+
+        assert execute.await_count == 2
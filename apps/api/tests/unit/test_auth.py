@@ -0,0 +1,244 @@
+"""
+Unit tests for user registration and lookup in the auth service.
+"""
+import os
+import subprocess
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+from neo4j.exceptions import ConstraintError
+
+from app.api.auth import (
+    CREATE_USER_QUERY,
+    DEVELOPMENT_SECRET_KEY,
+    AuthService,
+    create_user_in_db,
+    get_user_by_email,
+    get_user_credentials,
+    load_secret_key,
+)
+from app.cache import MISSING, user_cache
+from app.models import UserCreateRequest
+from benchmarks.fakes import FakeAsyncRedis
+
+
+def make_user_request(**overrides):
+    data = {
+        "email": "new@example.com",
+        "password": "password123",
+        "username": "newuser",
+        "full_name": "New User",
+    }
+    data.update(overrides)
+    return UserCreateRequest(**data)
+
+
+def make_tx(email_taken=False, username_taken=False):
+    """Mock async transaction returning the conflict flags of CREATE_USER_QUERY."""
+    result = MagicMock()
+    result.single = AsyncMock(return_value={"email_taken": email_taken, "username_taken": username_taken})
+    tx = MagicMock()
+    tx.run = AsyncMock(return_value=result)
+    return tx
+
+
+def execute_write_with(tx):
+    """Simulate neo4j_execute_write by invoking the work function with tx."""
+    async def execute_write(work):
+        return await work(tx)
+    return execute_write
+
+
+class TestCreateUserInDb:
+    """Test the registration pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_hashes_before_transaction_and_creates_in_one_statement(self):
+        """Should hash outside the transaction and issue a single statement"""
+        tx = make_tx()
+        calls = []
+
+        async def fake_hash(password):
+            calls.append("hash")
+            return "hashed"
+
+        async def fake_execute_write(work):
+            calls.append("transaction")
+            return await work(tx)
+
+        with patch('app.api.auth.get_neo4j_driver', return_value=MagicMock()):
+            with patch.object(AuthService, 'hash_password_async', side_effect=fake_hash):
+                with patch('app.api.auth.neo4j_execute_write', side_effect=fake_execute_write):
+                    user_id = await create_user_in_db(make_user_request())
+
+        assert user_id.startswith("user_")
+        assert calls == ["hash", "transaction"]
+        tx.run.assert_awaited_once()
+        assert tx.run.call_args.args[0] == CREATE_USER_QUERY
+        assert tx.run.call_args.kwargs["password_hash"] == "hashed"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("email_taken,username_taken,message", [
+        (True, False, "User with this email already exists"),
+        (False, True, "Username is already taken"),
+    ])
+    async def test_conflicts_detected_in_same_round_trip(self, email_taken, username_taken, message):
+        """Should map the statement's conflict flags to 400 responses"""
+        tx = make_tx(email_taken=email_taken, username_taken=username_taken)
+
+        with patch('app.api.auth.get_neo4j_driver', return_value=MagicMock()):
+            with patch.object(AuthService, 'hash_password_async', AsyncMock(return_value="hashed")):
+                with patch('app.api.auth.neo4j_execute_write', side_effect=execute_write_with(tx)):
+                    with pytest.raises(HTTPException) as exc_info:
+                        await create_user_in_db(make_user_request())
+
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.detail == message
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("conflicts,status_code,message", [
+        ((True, False), 400, "User with this email already exists"),
+        ((False, True), 400, "Username is already taken"),
+        ((False, False), 500, "Failed to create user"),
+    ])
+    async def test_constraint_violation_from_concurrent_registration(self, conflicts, status_code, message):
+        """Should look up which value a concurrent registration took, and fail on any other violation"""
+        # The message wording is irrelevant; only the existing users decide the response
+        error = ConstraintError("Node(7) already exists")
+
+        with patch('app.api.auth.get_neo4j_driver', return_value=MagicMock()):
+            with patch.object(AuthService, 'hash_password_async', AsyncMock(return_value="hashed")):
+                with patch('app.api.auth.neo4j_execute_write', AsyncMock(side_effect=error)):
+                    with patch('app.api.auth.neo4j_execute_read', AsyncMock(return_value=conflicts)):
+                        with pytest.raises(HTTPException) as exc_info:
+                            await create_user_in_db(make_user_request())
+
+        assert exc_info.value.status_code == status_code
+        assert exc_info.value.detail == message
+
+    @pytest.mark.asyncio
+    async def test_user_ids_are_unique(self):
+        """Should not derive ids from the clock, which collides under concurrent registrations"""
+        tx = make_tx()
+
+        with patch('app.api.auth.get_neo4j_driver', return_value=MagicMock()):
+            with patch.object(AuthService, 'hash_password_async', AsyncMock(return_value="hashed")):
+                with patch('app.api.auth.neo4j_execute_write', side_effect=execute_write_with(tx)):
+                    with patch('app.api.auth.datetime') as frozen:
+                        frozen.utcnow.return_value.timestamp.return_value = 1.0
+                        ids = {await create_user_in_db(make_user_request()) for _ in range(3)}
+
+        assert len(ids) == 3
+
+    @pytest.mark.asyncio
+    async def test_database_unavailable(self):
+        """Should return 503 without hashing when Neo4j is not connected"""
+        with patch('app.api.auth.get_neo4j_driver', return_value=None):
+            with patch.object(AuthService, 'hash_password_async', AsyncMock()) as hash_password:
+                with pytest.raises(HTTPException) as exc_info:
+                    await create_user_in_db(make_user_request())
+
+        assert exc_info.value.status_code == 503
+        hash_password.assert_not_called()
+
+
+class TestUserCache:
+    """Test the read-through user cache used by login and /auth/me."""
+
+    @pytest.mark.asyncio
+    async def test_second_lookup_served_from_cache(self):
+        """Should hit Neo4j once for repeated lookups of the same email"""
+        user = {"id": "user_1", "email": "cached@example.com", "password_hash": "hashed"}
+
+        with patch('app.cache.get_redis_client', return_value=None):
+            with patch('app.api.auth.get_neo4j_driver', return_value=MagicMock()):
+                with patch('app.api.auth.neo4j_execute_read', AsyncMock(return_value=user)) as read:
+                    assert await get_user_credentials("cached@example.com") == user
+                    assert await get_user_credentials("cached@example.com") == user
+
+        read.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_password_hash_only_for_credential_checks(self):
+        """Should leave password_hash out of lookups that are not checking a login"""
+        user = {"id": "user_1", "email": "me@example.com", "password_hash": "hashed"}
+
+        with patch('app.cache.get_redis_client', return_value=None):
+            with patch('app.api.auth.get_neo4j_driver', return_value=MagicMock()):
+                with patch('app.api.auth.neo4j_execute_read', AsyncMock(return_value=user)):
+                    assert await get_user_by_email("me@example.com") == {"id": "user_1", "email": "me@example.com"}
+                    assert (await get_user_credentials("me@example.com"))["password_hash"] == "hashed"
+
+    @pytest.mark.asyncio
+    async def test_unknown_email_cached_negatively(self):
+        """Should remember unknown emails in Redis only, without repeating the query"""
+        with patch('app.cache.get_redis_client', return_value=FakeAsyncRedis()):
+            with patch('app.api.auth.get_neo4j_driver', return_value=MagicMock()):
+                with patch('app.api.auth.neo4j_execute_read', AsyncMock(return_value=None)) as read:
+                    assert await get_user_by_email("ghost@example.com") is None
+                    assert await get_user_by_email("ghost@example.com") is None
+
+        read.assert_awaited_once()
+        assert user_cache.local.get("ghost@example.com") is MISSING
+
+    @pytest.mark.asyncio
+    async def test_lookup_errors_not_cached(self):
+        """Should retry Neo4j after a failed lookup"""
+        with patch('app.cache.get_redis_client', return_value=None):
+            with patch('app.api.auth.get_neo4j_driver', return_value=MagicMock()):
+                with patch('app.api.auth.neo4j_execute_read', AsyncMock(side_effect=Exception("down"))) as read:
+                    assert await get_user_by_email("flaky@example.com") is None
+                    assert await get_user_by_email("flaky@example.com") is None
+
+        assert read.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_registration_invalidates_negative_entry(self):
+        """Should forget a cached unknown email once that user registers"""
+        redis = FakeAsyncRedis()
+
+        with patch('app.cache.get_redis_client', return_value=redis):
+            await user_cache.set("new@example.com", None, ttl=30)
+            with patch('app.api.auth.get_neo4j_driver', return_value=MagicMock()):
+                with patch.object(AuthService, 'hash_password_async', AsyncMock(return_value="hashed")):
+                    with patch('app.api.auth.neo4j_execute_write', side_effect=execute_write_with(make_tx())):
+                        await create_user_in_db(make_user_request())
+
+            assert await user_cache.get("new@example.com") is MISSING
+
+
+class TestSecretKey:
+    """Test loading the /auth signing key."""
+
+    def test_no_key_without_configuration(self, monkeypatch):
+        """Should not sign with the public placeholder outside development"""
+        monkeypatch.delenv("JWT_SECRET_KEY", raising=False)
+        monkeypatch.setenv("ENV", "production")
+
+        assert load_secret_key() is None
+
+    def test_app_starts_without_key(self):
+        """Should leave only the /auth routes out when no key is configured"""
+        env = {name: value for name, value in os.environ.items() if name not in ("JWT_SECRET_KEY", "ENV")}
+        code = (
+            "import app.main; from fastapi.testclient import TestClient; "
+            "client = TestClient(app.main.app); "
+            "print(client.post('/auth/login', json={}).status_code, client.get('/livez').status_code)"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+
+        assert result.stdout.strip().splitlines()[-1] == "404 200"
+
+    def test_placeholder_only_in_development(self, monkeypatch):
+        """Should fall back to the placeholder key in development"""
+        monkeypatch.delenv("JWT_SECRET_KEY", raising=False)
+        monkeypatch.setenv("ENV", "development")
+
+        assert load_secret_key() == DEVELOPMENT_SECRET_KEY
+
+    def test_uses_configured_key(self, monkeypatch):
+        monkeypatch.setenv("JWT_SECRET_KEY", "configured")
+
+        assert load_secret_key() == "configured"
@@ -0,0 +1,233 @@
+"""
+Unit tests for the two-tier cache and the token-claims caches.
+"""
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from prometheus_client import REGISTRY
+
+from app.api.auth import AuthService, get_current_user, logout
+from app.cache import (
+    MISSING,
+    LRUCache,
+    StaleWhileRevalidateCache,
+    TwoTierCache,
+    claims_ttl,
+    hash_token,
+    session_token_cache,
+)
+from benchmarks.fakes import FakeAsyncRedis
+
+
+class TestLRUCache:
+    """Test the bounded in-process tier."""
+
+    def test_evicts_least_recently_used(self):
+        """Should drop the oldest untouched entry once full"""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is MISSING
+        assert cache.get("c") == 3
+
+    def test_expired_entries_are_misses(self):
+        """Should not return entries past their TTL"""
+        cache = LRUCache(max_entries=10)
+        cache.set("a", 1, ttl=-1)
+        assert cache.get("a") is MISSING
+
+
+class TestTwoTierCache:
+    """Test the LRU + Redis cache."""
+
+    @pytest.mark.asyncio
+    async def test_redis_tier_shared_between_workers(self):
+        """Should serve another worker's write from Redis and count hits/misses"""
+        redis = FakeAsyncRedis()
+        worker_a = TwoTierCache("test:shared-a")
+        worker_b = TwoTierCache("test:shared-a")
+
+        with patch('app.cache.get_redis_client', return_value=redis):
+            assert await worker_b.get("k") is MISSING
+            await worker_a.set("k", {"sub": "user-1"})
+            assert await worker_b.get("k") == {"sub": "user-1"}
+            assert await worker_b.get("k") == {"sub": "user-1"}
+
+        assert worker_b.stats()["misses"] == 1
+        assert worker_b.stats()["redis_hits"] == 1
+        assert worker_b.stats()["local_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_exports_hits_and_misses(self):
+        """Should count hits by tier and misses in Prometheus, labelled by cache"""
+        cache = TwoTierCache("test:metrics")
+
+        with patch('app.cache.get_redis_client', return_value=FakeAsyncRedis()):
+            await cache.get("k")
+            await cache.set("k", 1)
+            await cache.get("k")
+
+        assert REGISTRY.get_sample_value("tutorwise_cache_misses_total", {"cache": "test:metrics"}) == 1
+        assert REGISTRY.get_sample_value("tutorwise_cache_hits_total", {"cache": "test:metrics", "tier": "local"}) == 1
+        assert REGISTRY.get_sample_value("tutorwise_cache_hits_total", {"cache": "test:metrics", "tier": "redis"}) == 0
+
+    @pytest.mark.asyncio
+    async def test_delete_invalidates_both_tiers(self):
+        """Should remove the entry locally and in Redis"""
+        redis = FakeAsyncRedis()
+        cache = TwoTierCache("test:delete")
+
+        with patch('app.cache.get_redis_client', return_value=redis):
+            await cache.set("k", 1)
+            await cache.delete("k")
+            assert await cache.get("k") is MISSING
+        assert redis.store == {}
+
+    @pytest.mark.asyncio
+    async def test_works_without_redis(self):
+        """Should fall back to the local tier when Redis is unavailable"""
+        cache = TwoTierCache("test:no-redis")
+
+        with patch('app.cache.get_redis_client', return_value=None):
+            await cache.set("k", 1)
+            assert await cache.get("k") == 1
+
+    def test_claims_ttl_capped_at_expiry(self):
+        """Should never cache claims beyond the token's exp"""
+        assert claims_ttl({"exp": time.time() + 30}, max_ttl=300) <= 30
+        assert claims_ttl({"exp": time.time() + 3600}, max_ttl=300) == 300
+        assert claims_ttl({"exp": time.time() - 1}, max_ttl=300) < 0
+
+
+
+class TestStaleWhileRevalidateCache:
+    """Test read-through loading and background revalidation."""
+
+    @pytest.mark.asyncio
+    async def test_loads_on_miss_then_serves_cached(self):
+        """Should call the loader once and serve later reads from the cache"""
+        cache = StaleWhileRevalidateCache("test:swr-miss", fresh_ttl=60, stale_ttl=600)
+        loader = AsyncMock(return_value={"step": 1})
+
+        with patch('app.cache.get_redis_client', return_value=None):
+            assert await cache.get_or_load("k", loader) == {"step": 1}
+            assert await cache.get_or_load("k", loader) == {"step": 1}
+
+        loader.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_serves_stale_and_revalidates_once(self):
+        """Should return a stale entry immediately and refresh it in the background"""
+        cache = StaleWhileRevalidateCache("test:swr-stale", fresh_ttl=0, stale_ttl=600)
+        loader = AsyncMock(return_value={"step": 2})
+
+        with patch('app.cache.get_redis_client', return_value=None):
+            await cache.put("k", {"step": 1})
+            first = await cache.get_or_load("k", loader)
+            second = await cache.get_or_load("k", loader)
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+
+            assert first == second == {"step": 1}
+            loader.assert_awaited_once()
+            assert (await cache.get("k"))["value"] == {"step": 2}
+
+        assert cache.stats()["stale_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_revalidation_keeps_stale_entry(self):
+        """Should keep serving the stale entry when the background refresh fails"""
+        cache = StaleWhileRevalidateCache("test:swr-error", fresh_ttl=0, stale_ttl=600)
+        loader = AsyncMock(side_effect=Exception("PostgREST down"))
+
+        with patch('app.cache.get_redis_client', return_value=None):
+            await cache.put("k", {"step": 1})
+            assert await cache.get_or_load("k", loader) == {"step": 1}
+            await asyncio.sleep(0)
+            assert await cache.get_or_load("k", loader) == {"step": 1}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("write", ["put", "delete"])
+    async def test_refresh_does_not_overwrite_newer_write(self, write):
+        """Should drop a refresh that read the row before a put or delete on this worker"""
+        cache = StaleWhileRevalidateCache(f"test:swr-race-{write}", fresh_ttl=0, stale_ttl=600)
+        release = asyncio.Event()
+
+        async def slow_loader():
+            await release.wait()
+            return {"step": 1}
+
+        with patch('app.cache.get_redis_client', return_value=None):
+            await cache.put("k", {"step": 1})
+            await cache.get_or_load("k", slow_loader)
+            if write == "put":
+                await cache.put("k", {"step": 2})
+            else:
+                await cache.delete("k")
+            release.set()
+            await asyncio.gather(*cache._revalidating.values())
+
+            expected = MISSING if write == "delete" else {"step": 2}
+            assert await cache.peek("k") == expected
+
+    @pytest.mark.asyncio
+    async def test_refresh_does_not_overwrite_other_workers_write(self):
+        """Should drop a refresh when Redis holds a newer entry than the one being refreshed"""
+        redis = FakeAsyncRedis()
+        worker_a = StaleWhileRevalidateCache("test:swr-race-shared", fresh_ttl=0, stale_ttl=600)
+        worker_b = StaleWhileRevalidateCache("test:swr-race-shared", fresh_ttl=0, stale_ttl=600)
+        release = asyncio.Event()
+
+        async def slow_loader():
+            await release.wait()
+            return {"step": 1}
+
+        with patch('app.cache.get_redis_client', return_value=redis):
+            await worker_a.put("k", {"step": 1})
+            await worker_a.get_or_load("k", slow_loader)
+            await worker_b.put("k", {"step": 2})
+            release.set()
+            await asyncio.gather(*worker_a._revalidating.values())
+            worker_a.local.clear()
+
+            assert await worker_a.peek("k") == {"step": 2}
+
+class TestSessionTokenCache:
+    """Test token-claims caching in the /auth dependencies."""
+
+    @pytest.mark.asyncio
+    async def test_token_verified_once(self):
+        """Should verify a token once and serve later calls from cache"""
+        token = AuthService.create_access_token({"sub": "user_1", "email": "a@b.com", "role": "student"})
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        session_token_cache.local.clear()
+
+        with patch('app.cache.get_redis_client', return_value=None):
+            with patch.object(AuthService, 'verify_token', wraps=AuthService.verify_token) as verify:
+                first = await get_current_user(credentials)
+                second = await get_current_user(credentials)
+
+        assert first["sub"] == second["sub"] == "user_1"
+        verify.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_logout_invalidates_cached_claims(self):
+        """Should drop cached claims on logout"""
+        token = AuthService.create_access_token({"sub": "user_2", "email": "a@b.com", "role": "student"})
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        with patch('app.cache.get_redis_client', return_value=None):
+            with patch('app.api.auth.get_redis_client', return_value=None):
+                current_user = await get_current_user(credentials)
+                assert session_token_cache.local.get(hash_token(token)) is not MISSING
+
+                await logout(current_user=current_user, credentials=credentials)
+
+        assert session_token_cache.local.get(hash_token(token)) is MISSING
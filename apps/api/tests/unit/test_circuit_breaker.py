@@ -0,0 +1,181 @@
+"""
+Unit tests for per-dependency circuit breakers.
+"""
+import httpx
+import pytest
+import redis.exceptions
+from unittest.mock import AsyncMock, MagicMock, patch
+from neo4j.exceptions import ConstraintError, ServiceUnavailable
+
+from app.cache import MISSING, TwoTierCache
+from app.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    breakers,
+    dependency_call,
+)
+from app.db import InstrumentedTransport
+from benchmarks.fakes import FakeAsyncRedis
+
+
+def breaker(**kwargs) -> CircuitBreaker:
+    settings = {"failure_threshold": 3, "reset_timeout": 10, "half_open_max_calls": 1, **kwargs}
+    return CircuitBreaker("test", (ConnectionError,), **settings)
+
+
+def elapse(circuit: CircuitBreaker) -> None:
+    """Pretend the reset timeout has passed"""
+    circuit.opened_at -= circuit.reset_timeout
+
+
+class TestCircuitBreaker:
+    """Test state transitions."""
+
+    def test_opens_after_consecutive_failures(self):
+        """Should open after failure_threshold failures in a row, counting from the last success"""
+        circuit = breaker()
+        circuit.record_failure()
+        circuit.record_failure()
+        circuit.record_success()
+        circuit.record_failure()
+        circuit.record_failure()
+        assert circuit.state == CLOSED
+
+        circuit.record_failure()
+
+        assert circuit.state == OPEN
+        with pytest.raises(CircuitOpenError) as exc_info:
+            circuit.before_call()
+        assert 0 < exc_info.value.retry_after <= 10
+        assert circuit.snapshot()["rejected"] == 1
+
+    def test_half_open_admits_limited_trials(self):
+        """Should let half_open_max_calls trial calls through once the reset timeout has passed"""
+        circuit = breaker(half_open_max_calls=2)
+        for _ in range(3):
+            circuit.record_failure()
+        elapse(circuit)
+
+        circuit.before_call()
+        circuit.before_call()
+
+        assert circuit.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            circuit.before_call()
+
+    def test_trial_success_closes_and_failure_reopens(self):
+        """Should close on a successful trial call and reopen on a failed one"""
+        circuit = breaker()
+        for _ in range(3):
+            circuit.record_failure()
+        elapse(circuit)
+        circuit.before_call()
+        circuit.record_failure()
+        assert circuit.state == OPEN
+
+        elapse(circuit)
+        circuit.before_call()
+        circuit.record_success()
+
+        assert circuit.state == CLOSED
+        circuit.before_call()
+
+    def test_only_infrastructure_errors_count(self):
+        """Should treat errors that show the dependency answered as successes"""
+        circuit = breaker(failure_threshold=1)
+
+        circuit.record_error(ValueError("bad input"))
+        assert circuit.state == CLOSED
+
+        circuit.record_error(ConnectionError("refused"))
+        assert circuit.state == OPEN
+
+
+class TestDependencyCall:
+    """Test the guarded call context manager and its call sites."""
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_skips_the_call(self):
+        """Should fail fast without running the block while the circuit is open"""
+        for _ in range(breakers["neo4j"].failure_threshold):
+            with pytest.raises(ServiceUnavailable):
+                with dependency_call("neo4j", "test"):
+                    raise ServiceUnavailable("down")
+        work = AsyncMock()
+
+        with pytest.raises(CircuitOpenError):
+            with dependency_call("neo4j", "test"):
+                await work()
+
+        work.assert_not_called()
+
+    def test_query_errors_do_not_open_the_circuit(self):
+        """Should not count constraint violations against Neo4j"""
+        for _ in range(breakers["neo4j"].failure_threshold):
+            with pytest.raises(ConstraintError):
+                with dependency_call("neo4j", "test"):
+                    raise ConstraintError("duplicate")
+
+        assert breakers["neo4j"].state == CLOSED
+
+    @pytest.mark.asyncio
+    async def test_cache_degrades_to_miss_while_redis_circuit_is_open(self):
+        """Should serve a cache miss without calling Redis while its circuit is open"""
+        client = MagicMock()
+        client.pipeline.side_effect = redis.exceptions.ConnectionError("refused")
+        cache = TwoTierCache("test-circuit", local_ttl=0)
+
+        with patch('app.cache.get_redis_client', return_value=client):
+            for _ in range(breakers["redis"].failure_threshold):
+                assert await cache.get("k") is MISSING
+            assert breakers["redis"].state == OPEN
+            client.pipeline.reset_mock()
+
+            assert await cache.get("k") is MISSING
+
+        client.pipeline.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_supabase_server_errors_open_the_circuit(self):
+        """Should count 5xx responses from Supabase as failures"""
+        transport = InstrumentedTransport(httpx.MockTransport(lambda request: httpx.Response(503)))
+        async with httpx.AsyncClient(transport=transport, base_url="https://supabase.test") as client:
+            for _ in range(breakers["supabase"].failure_threshold):
+                assert (await client.get("/rest/v1/role_details")).status_code == 503
+
+            with pytest.raises(CircuitOpenError):
+                await client.get("/rest/v1/role_details")
+
+
+class TestCircuitOpenResponses:
+    """Test how an open circuit surfaces through the API."""
+
+    @pytest.mark.asyncio
+    async def test_login_fails_fast_with_503(self, async_test_client, mock_neo4j_driver):
+        """Should answer 503 with Retry-After instead of 401 while Neo4j's circuit is open"""
+        for _ in range(breakers["neo4j"].failure_threshold):
+            breakers["neo4j"].record_failure()
+
+        with patch('app.db.neo4j_driver', mock_neo4j_driver), patch('app.db.redis_client', None):
+            response = await async_test_client.post(
+                "/auth/login", json={"email": "ada@example.com", "password": "password123"}
+            )
+
+        assert response.status_code == 503
+        assert 1 <= int(response.headers["retry-after"]) <= breakers["neo4j"].reset_timeout
+        mock_neo4j_driver.session.assert_not_called()
+
+    def test_health_reports_circuit_state(self, test_client):
+        """Should show every dependency's breaker in /health"""
+        for _ in range(breakers["redis"].failure_threshold):
+            breakers["redis"].record_failure()
+
+        with patch('app.db.redis_client', FakeAsyncRedis()), patch('app.db.supabase_client', MagicMock()):
+            circuits = test_client.get("/health").json()["circuits"]
+
+        assert set(circuits) == {"redis", "neo4j", "supabase"}
+        assert circuits["redis"]["state"] == "open"
+        assert circuits["neo4j"]["state"] == "closed"
@@ -4,16 +4,25 @@ Unit tests for database connection and configuration functions.
 import pytest
 import asyncio
 from unittest.mock import patch, MagicMock, AsyncMock
-import redis
-from neo4j import GraphDatabase
 
+from redis.asyncio import BlockingConnectionPool
+
+import app.db
 from app.db import (
     get_redis_config,
     get_neo4j_config,
+    get_supabase,
     connect_redis,
     connect_neo4j,
+    connect_supabase,
+    ensure_neo4j_schema,
+    NEO4J_SCHEMA_CONSTRAINTS,
+    neo4j_execute_read,
+    neo4j_execute_write,
     startup_database_connections,
     shutdown_database_connections,
+    warm_up_connections,
+    reset_connections,
     DatabaseError
 )
 
@@ -84,14 +93,32 @@ class TestRedisConnection:
         monkeypatch.setenv("REDIS_URL", "redis://localhost:6379")
 
         mock_redis = MagicMock()
-        mock_redis.ping.return_value = True
+        mock_redis.ping = AsyncMock(return_value=True)
 
-        with patch('redis.from_url', return_value=mock_redis) as mock_from_url:
+        with patch('redis.asyncio.Redis.from_pool', return_value=mock_redis) as mock_from_url:
             result = await connect_redis()
 
             assert result is mock_redis
             mock_from_url.assert_called_once()
-            mock_redis.ping.assert_called_once()
+            mock_redis.ping.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_connect_redis_uses_configured_pool_size(self, monkeypatch):
+        """Test Redis pool size and wait come from REDIS_MAX_CONNECTIONS and REDIS_POOL_TIMEOUT."""
+        monkeypatch.setenv("REDIS_URL", "redis://localhost:6379")
+        monkeypatch.setenv("REDIS_MAX_CONNECTIONS", "7")
+        monkeypatch.setenv("REDIS_POOL_TIMEOUT", "0.5")
+
+        mock_redis = MagicMock()
+        mock_redis.ping = AsyncMock(return_value=True)
+
+        with patch('redis.asyncio.Redis.from_pool', return_value=mock_redis) as mock_from_url:
+            await connect_redis()
+
+            pool = mock_from_url.call_args.args[0]
+            assert isinstance(pool, BlockingConnectionPool)
+            assert pool.max_connections == 7
+            assert pool.timeout == 0.5
 
     @pytest.mark.asyncio
     async def test_connect_redis_retry_success(self, monkeypatch):
@@ -99,10 +126,11 @@ class TestRedisConnection:
         monkeypatch.setenv("REDIS_URL", "redis://localhost:6379")
 
         mock_redis = MagicMock()
+        mock_redis.aclose = AsyncMock()
         # Fail first attempt, succeed second
-        mock_redis.ping.side_effect = [Exception("Connection failed"), True]
+        mock_redis.ping = AsyncMock(side_effect=[Exception("Connection failed"), True])
 
-        with patch('redis.from_url', return_value=mock_redis):
+        with patch('redis.asyncio.Redis.from_pool', return_value=mock_redis):
             with patch('asyncio.sleep', new_callable=AsyncMock):
                 result = await connect_redis()
 
@@ -115,9 +143,10 @@ class TestRedisConnection:
         monkeypatch.setenv("REDIS_URL", "redis://localhost:6379")
 
         mock_redis = MagicMock()
-        mock_redis.ping.side_effect = Exception("Connection failed")
+        mock_redis.aclose = AsyncMock()
+        mock_redis.ping = AsyncMock(side_effect=Exception("Connection failed"))
 
-        with patch('redis.from_url', return_value=mock_redis):
+        with patch('redis.asyncio.Redis.from_pool', return_value=mock_redis):
             with patch('asyncio.sleep', new_callable=AsyncMock):
                 with pytest.raises(DatabaseError, match="Redis connection failed"):
                     await connect_redis(max_retries=2)
@@ -144,18 +173,23 @@ class TestNeo4jConnection:
         monkeypatch.setenv("NEO4J_USERNAME", "neo4j")
         monkeypatch.setenv("NEO4J_PASSWORD", "password")
 
+        monkeypatch.setenv("NEO4J_MAX_CONNECTION_POOL_SIZE", "25")
+        monkeypatch.setenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "5")
+
         mock_driver = MagicMock()
-        mock_driver.verify_connectivity.return_value = None
+        mock_driver.verify_connectivity = AsyncMock(return_value=None)
 
-        with patch('neo4j.GraphDatabase.driver', return_value=mock_driver) as mock_driver_create:
+        with patch('neo4j.AsyncGraphDatabase.driver', return_value=mock_driver) as mock_driver_create:
             result = await connect_neo4j()
 
             assert result is mock_driver
             mock_driver_create.assert_called_once_with(
                 "bolt://localhost:7687",
-                auth=("neo4j", "password")
+                auth=("neo4j", "password"),
+                max_connection_pool_size=25,
+                connection_acquisition_timeout=5.0
             )
-            mock_driver.verify_connectivity.assert_called_once()
+            mock_driver.verify_connectivity.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_connect_neo4j_retry_success(self, monkeypatch):
@@ -165,10 +199,11 @@ class TestNeo4jConnection:
         monkeypatch.setenv("NEO4J_PASSWORD", "password")
 
         mock_driver = MagicMock()
+        mock_driver.close = AsyncMock()
         # Fail first attempt, succeed second
-        mock_driver.verify_connectivity.side_effect = [Exception("Connection failed"), None]
+        mock_driver.verify_connectivity = AsyncMock(side_effect=[Exception("Connection failed"), None])
 
-        with patch('neo4j.GraphDatabase.driver', return_value=mock_driver):
+        with patch('neo4j.AsyncGraphDatabase.driver', return_value=mock_driver):
             with patch('asyncio.sleep', new_callable=AsyncMock):
                 result = await connect_neo4j()
 
@@ -183,15 +218,118 @@ class TestNeo4jConnection:
         monkeypatch.setenv("NEO4J_PASSWORD", "password")
 
         mock_driver = MagicMock()
-        mock_driver.verify_connectivity.side_effect = Exception("Connection failed")
+        mock_driver.close = AsyncMock()
+        mock_driver.verify_connectivity = AsyncMock(side_effect=Exception("Connection failed"))
 
-        with patch('neo4j.GraphDatabase.driver', return_value=mock_driver):
+        with patch('neo4j.AsyncGraphDatabase.driver', return_value=mock_driver):
             with patch('asyncio.sleep', new_callable=AsyncMock):
                 with pytest.raises(DatabaseError, match="Neo4j connection failed"):
                     await connect_neo4j(max_retries=2)
 
                 assert mock_driver.verify_connectivity.call_count == 2
 
+    @pytest.mark.asyncio
+    async def test_neo4j_execute_write_uses_shared_driver(self):
+        """Test write helper runs the work function in a managed transaction."""
+        mock_session = MagicMock()
+        mock_session.execute_write = AsyncMock(return_value="user_1")
+        mock_driver = MagicMock()
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+
+        async def work(tx):
+            return None
+
+        with patch('app.db.neo4j_driver', mock_driver):
+            result = await neo4j_execute_write(work)
+
+        assert result == "user_1"
+        mock_session.execute_write.assert_awaited_once_with(work)
+
+    @pytest.mark.asyncio
+    async def test_neo4j_execute_read_without_driver(self):
+        """Test read helper raises when the driver is not initialized."""
+        async def work(tx):
+            return None
+
+        with patch('app.db.neo4j_driver', None):
+            with pytest.raises(DatabaseError, match="Neo4j driver not initialized"):
+                await neo4j_execute_read(work)
+
+
+class TestNeo4jSchema:
+    """Test Neo4j constraint bootstrap."""
+
+    @pytest.mark.asyncio
+    async def test_ensure_schema_creates_user_constraints(self):
+        """Test every :User constraint is applied idempotently."""
+        mock_result = MagicMock()
+        mock_result.consume = AsyncMock()
+        mock_session = MagicMock()
+        mock_session.run = AsyncMock(return_value=mock_result)
+        mock_driver = MagicMock()
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+
+        with patch('app.db.neo4j_driver', mock_driver):
+            applied = await ensure_neo4j_schema()
+
+        assert applied == list(NEO4J_SCHEMA_CONSTRAINTS)
+        statements = [call.args[0] for call in mock_session.run.call_args_list]
+        assert all("IF NOT EXISTS" in statement for statement in statements)
+        assert any("u.email IS UNIQUE" in statement for statement in statements)
+        assert any("u.username IS UNIQUE" in statement for statement in statements)
+        assert any("u.id IS UNIQUE" in statement for statement in statements)
+
+    @pytest.mark.asyncio
+    async def test_ensure_schema_continues_after_failure(self):
+        """Test one failing constraint does not stop the others or startup."""
+        mock_result = MagicMock()
+        mock_result.consume = AsyncMock()
+        mock_session = MagicMock()
+        mock_session.run = AsyncMock(side_effect=[Exception("duplicate emails"), mock_result, mock_result])
+        mock_driver = MagicMock()
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+
+        with patch('app.db.neo4j_driver', mock_driver):
+            applied = await ensure_neo4j_schema()
+
+        assert len(applied) == 2
+
+    @pytest.mark.asyncio
+    async def test_ensure_schema_without_driver(self):
+        """Test schema bootstrap is skipped when Neo4j is not connected."""
+        with patch('app.db.neo4j_driver', None):
+            assert await ensure_neo4j_schema() == []
+
+
+class TestSupabaseClient:
+    """Test shared Supabase client management."""
+
+    @pytest.mark.asyncio
+    async def test_connect_supabase_reuses_single_client(self, monkeypatch):
+        """Test the dependency returns the client created at startup."""
+        monkeypatch.setenv("SUPABASE_URL", "https://project.supabase.co")
+        monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service-role-key")
+
+        mock_client = MagicMock()
+
+        with patch('supabase.acreate_client', new_callable=AsyncMock, return_value=mock_client) as mock_create:
+            with patch('app.db.supabase_client', None), patch('app.db.supabase_http_client', None):
+                result = await connect_supabase()
+
+                assert result is mock_client
+                assert get_supabase() is mock_client
+                assert get_supabase() is mock_client
+                mock_create.assert_awaited_once()
+                options = mock_create.call_args.kwargs["options"]
+                assert options.httpx_client is not None
+                await options.httpx_client.aclose()
+
+    def test_get_supabase_not_initialized(self):
+        """Test the dependency fails fast when startup did not create a client."""
+        with patch('app.db.supabase_client', None):
+            with pytest.raises(DatabaseError, match="Supabase client not initialized"):
+                get_supabase()
+
 
 class TestDatabaseLifecycle:
     """Test database startup and shutdown functions."""
@@ -201,13 +339,18 @@ class TestDatabaseLifecycle:
         """Test successful database startup."""
         with patch('app.db.connect_redis', new_callable=AsyncMock) as mock_redis:
             with patch('app.db.connect_neo4j', new_callable=AsyncMock) as mock_neo4j:
-                mock_redis.return_value = MagicMock()
-                mock_neo4j.return_value = MagicMock()
+                with patch('app.db.connect_supabase', new_callable=AsyncMock) as mock_supabase:
+                    with patch('app.db.ensure_neo4j_schema', new_callable=AsyncMock) as mock_schema:
+                        mock_redis.return_value = MagicMock()
+                        mock_neo4j.return_value = MagicMock()
+                        mock_supabase.return_value = MagicMock()
 
-                await startup_database_connections()
+                        await startup_database_connections()
 
-                mock_redis.assert_called_once()
-                mock_neo4j.assert_called_once()
+                        mock_redis.assert_called_once()
+                        mock_neo4j.assert_called_once()
+                        mock_supabase.assert_called_once()
+                        mock_schema.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_startup_database_connections_redis_failure(self):
@@ -229,6 +372,7 @@ class TestDatabaseLifecycle:
         mock_redis = MagicMock()
         mock_redis.aclose = AsyncMock()
         mock_neo4j = MagicMock()
+        mock_neo4j.close = AsyncMock()
 
         with patch('app.db.redis_client', mock_redis):
             with patch('app.db.neo4j_driver', mock_neo4j):
@@ -243,7 +387,7 @@ class TestDatabaseLifecycle:
         mock_redis = MagicMock()
         mock_redis.aclose = AsyncMock(side_effect=Exception("Redis close failed"))
         mock_neo4j = MagicMock()
-        mock_neo4j.close.side_effect = Exception("Neo4j close failed")
+        mock_neo4j.close = AsyncMock(side_effect=Exception("Neo4j close failed"))
 
         with patch('app.db.redis_client', mock_redis):
             with patch('app.db.neo4j_driver', mock_neo4j):
@@ -251,4 +395,48 @@ class TestDatabaseLifecycle:
                 await shutdown_database_connections()
 
                 mock_redis.aclose.assert_called_once()
-                mock_neo4j.close.assert_called_once()
\ No newline at end of file
+                mock_neo4j.close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_warm_up_connections(self, monkeypatch):
+        """Should make `connections` concurrent calls to every connected dependency"""
+        monkeypatch.setenv("SUPABASE_URL", "https://project.supabase.co")
+        monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service-key")
+        mock_redis = MagicMock()
+        mock_redis.ping = AsyncMock(return_value=True)
+        mock_neo4j = MagicMock()
+        mock_neo4j.verify_connectivity = AsyncMock()
+        mock_http = MagicMock()
+        mock_http.get = AsyncMock()
+
+        with patch('app.db.redis_client', mock_redis), patch('app.db.neo4j_driver', mock_neo4j), \
+                patch('app.db.supabase_http_client', mock_http):
+            await warm_up_connections(3)
+
+        assert mock_redis.ping.await_count == 3
+        assert mock_neo4j.verify_connectivity.await_count == 3
+        assert mock_http.get.await_count == 3
+        assert mock_http.get.call_args.args == ("https://project.supabase.co/auth/v1/health",)
+
+    @pytest.mark.asyncio
+    async def test_warm_up_connections_ignores_failures(self):
+        """Should log failed warm-up calls instead of failing startup"""
+        mock_redis = MagicMock()
+        mock_redis.ping = AsyncMock(side_effect=ConnectionError("refused"))
+
+        with patch('app.db.redis_client', mock_redis), patch('app.db.neo4j_driver', None), \
+                patch('app.db.supabase_http_client', None):
+            await warm_up_connections(2)
+
+        assert mock_redis.ping.await_count == 2
+
+    def test_reset_connections(self):
+        """Should forget inherited clients without closing them"""
+        mock_redis = MagicMock()
+
+        with patch('app.db.redis_client', mock_redis), patch('app.db.neo4j_driver', MagicMock()):
+            reset_connections()
+            assert app.db.redis_client is None
+            assert app.db.neo4j_driver is None
+
+        mock_redis.aclose.assert_not_called()
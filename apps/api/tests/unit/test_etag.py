@@ -0,0 +1,27 @@
+"""
+Unit tests for ETag computation and If-None-Match matching.
+"""
+from app.etag import compute_etag, etag_matches
+
+
+class TestETag:
+    """Test strong ETags and weak If-None-Match comparison."""
+
+    def test_etag_is_strong_and_content_based(self):
+        """Should be stable across key order and change with content or updated_at"""
+        etag = compute_etag({"a": 1, "b": [1, 2], "updated_at": "2025-01-01"})
+
+        assert etag.startswith('"') and etag.endswith('"')
+        assert compute_etag({"updated_at": "2025-01-01", "b": [1, 2], "a": 1}) == etag
+        assert compute_etag({"a": 2, "b": [1, 2], "updated_at": "2025-01-01"}) != etag
+        assert compute_etag({"a": 1, "b": [1, 2], "updated_at": "2025-01-02"}) != etag
+
+    def test_if_none_match(self):
+        """Should match any listed tag, weak tags and *"""
+        etag = '"abc"'
+
+        assert etag_matches('"abc"', etag)
+        assert etag_matches('"x", W/"abc"', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"abd"', etag)
+        assert not etag_matches(None, etag)
@@ -0,0 +1,192 @@
+"""
+Unit tests for the fake Supabase server, driven through the real supabase clients.
+"""
+import time
+
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+from postgrest.exceptions import APIError
+from supabase import acreate_client, create_client
+from supabase_auth.errors import AuthApiError
+
+from app.token_verifier import SupabaseJWTVerifier
+from benchmarks.fake_supabase import FakeSupabase
+
+
+@pytest.fixture
+def fake():
+    with FakeSupabase(seed=1) as server:
+        yield server
+
+
+@pytest_asyncio.fixture
+async def client(fake):
+    return await acreate_client(fake.url, fake.service_key)
+
+
+class TestPostgrest:
+    """Test the PostgREST operations the app and loaders use."""
+
+    @pytest.mark.asyncio
+    async def test_select_filters_order_and_limit(self, fake, client):
+        """Should filter, order and limit like PostgREST"""
+        fake.seed("ai_feedback", [
+            {"agent_type": "sage", "rating": 5, "created_at": "2026-01-01"},
+            {"agent_type": "sage", "rating": 2, "created_at": "2026-01-03"},
+            {"agent_type": "sage", "rating": 4, "created_at": "2026-01-02"},
+            {"agent_type": "lexi", "rating": 1, "created_at": "2026-01-04"},
+        ])
+
+        response = await (client.table("ai_feedback")
+            .select("rating", count="exact")
+            .eq("agent_type", "sage")
+            .gte("created_at", "2026-01-02")
+            .order("created_at", desc=True)
+            .limit(1)
+            .execute())
+
+        assert response.data == [{"rating": 2}]
+        assert response.count == 2
+
+    @pytest.mark.asyncio
+    async def test_upsert_merges_on_conflict(self, fake, client):
+        """Should update the row matching the on_conflict columns instead of adding one"""
+        row = {"profile_id": "user-1", "role_type": "tutor", "bio": "first"}
+        await client.table("role_details").upsert(row, on_conflict="profile_id,role_type").execute()
+        await client.table("role_details").upsert({**row, "bio": "second"}, on_conflict="profile_id,role_type").execute()
+
+        response = await (client.table("role_details")
+            .select("*").eq("profile_id", "user-1").eq("role_type", "tutor").maybe_single().execute())
+
+        assert response.data["bio"] == "second"
+        assert len(fake.rows("role_details")) == 1
+
+    @pytest.mark.asyncio
+    async def test_insert_duplicate_is_rejected(self, fake, client):
+        """Should answer a unique violation as PostgREST does"""
+        fake.seed("onboarding_progress", [{"profile_id": "user-1", "role_type": "tutor"}])
+
+        with pytest.raises(APIError) as exc_info:
+            await client.table("onboarding_progress").insert({"profile_id": "user-1", "role_type": "tutor"}).execute()
+
+        assert exc_info.value.code == "23505"
+
+    @pytest.mark.asyncio
+    async def test_maybe_single_and_delete(self, fake, client):
+        """Should return None for no row and remove only the filtered rows"""
+        fake.seed("sage_messages", [{"session_id": "s1"}, {"session_id": "s2"}])
+
+        missing = await client.table("sage_messages").select("*").eq("session_id", "s3").maybe_single().execute()
+        deleted = await client.table("sage_messages").delete().eq("session_id", "s1").execute()
+
+        assert missing is None
+        assert [row["session_id"] for row in deleted.data] == ["s1"]
+        assert [row["session_id"] for row in fake.rows("sage_messages")] == ["s2"]
+
+    def test_sync_client_loader_queries(self, fake):
+        """Should serve the sync client as the cas/optimization loaders use it"""
+        fake.seed("lexi_sessions", [
+            {"started_at": "2026-01-01", "level": "A2"},
+            {"started_at": "2026-01-02", "level": "B1"},
+        ])
+        client = create_client(fake.url, fake.service_key)
+
+        sessions = (client.table("lexi_sessions")
+            .select("*").gte("started_at", "2026-01-01").eq("level", "B1").order("started_at").limit(10).execute())
+        client.table("lexi_sessions").update({"used_for_optimization": True}).in_("id", [sessions.data[0]["id"]]).execute()
+
+        assert [row.get("used_for_optimization") for row in fake.rows("lexi_sessions")] == [None, True]
+
+    @pytest.mark.asyncio
+    async def test_unknown_table(self, client):
+        """Should answer unknown tables with PostgREST's schema cache error"""
+        with pytest.raises(APIError) as exc_info:
+            await client.table("missing").select("*").execute()
+
+        assert exc_info.value.code == "PGRST205"
+
+
+class TestAuth:
+    """Test the auth endpoints."""
+
+    @pytest.mark.asyncio
+    async def test_get_user_with_issued_token(self, fake, client):
+        """Should resolve a token from issue_token to its user"""
+        response = await client.auth.get_user(fake.issue_token("user-1", email="ada@example.com"))
+
+        assert response.user.id == "user-1"
+        assert response.user.email == "ada@example.com"
+
+    @pytest.mark.asyncio
+    async def test_get_user_rejects_bad_signature(self, client):
+        """Should reject tokens not signed with the fake's secret"""
+        other = FakeSupabase(jwt_secret="another-secret-that-is-long-enough-for-hs256")
+
+        with pytest.raises(AuthApiError):
+            await client.auth.get_user(other.issue_token("user-1"))
+
+
+class TestFaultInjection:
+    """Test latency and error injection."""
+
+    @pytest.mark.asyncio
+    async def test_fail_next_targets_a_path(self, fake, client):
+        """Should fail only the requested number of matching requests"""
+        fake.fail_next(1, status=500, path="role_details")
+
+        await client.table("ai_feedback").select("*").execute()
+        with pytest.raises(APIError) as exc_info:
+            await client.table("role_details").select("*").execute()
+        await client.table("role_details").select("*").execute()
+
+        assert exc_info.value.code == "500"
+
+    def test_error_rate_is_reproducible(self):
+        """Should fail the same requests for the same seed"""
+        def failures(seed: int) -> list[int]:
+            fake = FakeSupabase(error_rate=0.3, seed=seed)
+            return [fake.handle("GET", "/rest/v1/ai_feedback", {}, b"").status for _ in range(50)]
+
+        assert failures(7) == failures(7)
+        assert 0 < failures(7).count(503) < 50
+
+    @pytest.mark.asyncio
+    async def test_table_latency(self, fake, client):
+        """Should delay requests to a table by its configured latency"""
+        fake.table_latency["role_details"] = 0.05
+
+        started = time.perf_counter()
+        await client.table("role_details").select("*").execute()
+
+        assert time.perf_counter() - started >= 0.05
+
+
+class TestAppAgainstFake:
+    """Test app routes end to end against the fake."""
+
+    @pytest.mark.asyncio
+    async def test_professional_info(self, fake, client, async_test_client):
+        """Should verify the fake's token and read role_details through it"""
+        fake.seed("role_details", [{
+            "profile_id": "user-1",
+            "role_type": "tutor",
+            "subjects": ["Mathematics"],
+            "qualifications": [],
+            "teaching_methods": [],
+            "specializations": [],
+            "created_at": "2026-01-01T00:00:00Z",
+            "updated_at": "2026-01-01T00:00:00Z",
+        }])
+        verifier = SupabaseJWTVerifier(supabase_url=fake.url, jwt_secret=fake.jwt_secret)
+
+        with patch('app.db.supabase_client', client), patch('app.db.redis_client', None), \
+                patch('app.api.account.get_token_verifier', return_value=verifier):
+            response = await async_test_client.get(
+                "/api/account/professional-info",
+                params={"role_type": "tutor"},
+                headers={"Authorization": f"Bearer {fake.issue_token('user-1')}"},
+            )
+
+        assert response.status_code == 200
+        assert response.json()["subjects"] == ["Mathematics"]
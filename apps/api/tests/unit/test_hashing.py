@@ -0,0 +1,53 @@
+"""
+Unit tests for the bounded bcrypt executor.
+"""
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.auth import AuthService
+from app.hashing import BcryptExecutor
+
+
+class TestBcryptExecutor:
+    """Test bcrypt offloading and admission control."""
+
+    @pytest.mark.asyncio
+    async def test_runs_off_the_event_loop(self):
+        """Should run the work on a hashing thread, not the loop thread"""
+        executor = BcryptExecutor(max_workers=1, max_queue=1)
+        try:
+            thread_name = await executor.run("hash", lambda: threading.current_thread().name)
+        finally:
+            executor.shutdown()
+
+        assert thread_name.startswith("bcrypt")
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_full(self):
+        """Should fail fast with 503 and Retry-After once the cap is reached"""
+        executor = BcryptExecutor(max_workers=1, max_queue=1)
+        release = threading.Event()
+
+        running = [asyncio.ensure_future(executor.run("verify", release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        try:
+            with pytest.raises(HTTPException) as exc_info:
+                await executor.run("verify", release.wait)
+            assert exc_info.value.status_code == 503
+            assert exc_info.value.headers["Retry-After"] == "1"
+        finally:
+            release.set()
+            await asyncio.gather(*running)
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_password_round_trip(self):
+        """Should hash and verify passwords through the executor"""
+        hashed = await AuthService.hash_password_async("correct horse")
+
+        assert await AuthService.verify_password_async("correct horse", hashed)
+        assert not await AuthService.verify_password_async("wrong horse", hashed)
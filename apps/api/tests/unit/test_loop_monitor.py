@@ -0,0 +1,75 @@
+"""
+Unit tests for the event-loop lag monitor.
+"""
+import asyncio
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.loop_monitor import LoopLagMonitor
+
+
+def blocking_handler():
+    time.sleep(0.3)
+
+
+class TestLoopLagMonitor:
+    """Test lag measurement and stall attribution."""
+
+    @pytest.mark.asyncio
+    async def test_captures_stall_with_route_and_stack(self):
+        """Should attribute a blocking call to the executing route and keep its stack"""
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.1, window=100)
+        scope = {"type": "http", "method": "POST", "path": "/auth/login", "route": None}
+
+        async def request():
+            monitor.request_started(scope)
+            try:
+                blocking_handler()
+            finally:
+                monitor.request_finished()
+
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            await asyncio.create_task(request())
+            await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+
+        assert len(monitor.stalls) == 1
+        stall = monitor.stalls[0]
+        assert stall["route"] == "POST <unmatched>"
+        assert stall["blocked_for_seconds"] >= 0.1
+        assert "blocking_handler" in stall["stack"]
+        assert monitor.active_requests == {}
+
+    @pytest.mark.asyncio
+    async def test_records_lag(self):
+        """Should observe heartbeat lag into the histogram and percentiles"""
+        before = REGISTRY.get_sample_value("tutorwise_event_loop_lag_seconds_count") or 0
+        monitor = LoopLagMonitor(interval=0.01, threshold=1, window=100)
+
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            time.sleep(0.05)
+            await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+
+        assert REGISTRY.get_sample_value("tutorwise_event_loop_lag_seconds_count") > before
+        assert monitor.percentiles()["p99"] >= 0.04
+        assert len(monitor.stalls) == 0
+
+    def test_percentiles(self):
+        """Should report nearest-rank percentiles over the sample window"""
+        monitor = LoopLagMonitor(interval=0.1, threshold=1, window=100)
+        for i in range(100):
+            monitor.record_lag(i / 1000)
+
+        assert monitor.percentiles() == {"p50": 0.05, "p90": 0.09, "p99": 0.099}
+        assert REGISTRY.get_sample_value(
+            "tutorwise_event_loop_lag_quantile_seconds", {"quantile": "0.99"}
+        ) == 0.099
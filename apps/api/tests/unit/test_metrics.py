@@ -0,0 +1,100 @@
+"""
+Unit tests for request and dependency metrics.
+"""
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from app.db import InstrumentedTransport, supabase_operation
+from app.metrics import track_dependency
+from app.middleware import UNMATCHED_ROUTE
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetricsMiddleware:
+    """Test per-route request metrics."""
+
+    def test_records_route_template_and_status(self, test_client):
+        """Should label requests by the prefixed route template, not by raw path"""
+        labels = {"method": "GET", "route": "/api/onboarding/progress/{role_type}", "status": "401"}
+        before = sample("tutorwise_http_requests_total", **labels)
+
+        with patch('app.db.supabase_client', MagicMock()):
+            response = test_client.get("/api/onboarding/progress/tutor")
+
+        assert response.status_code == 401
+        assert sample("tutorwise_http_requests_total", **labels) == before + 1
+        assert sample(
+            "tutorwise_http_request_duration_seconds_count",
+            method="GET", route="/api/onboarding/progress/{role_type}"
+        ) >= 1
+
+    def test_unknown_paths_share_one_label(self, test_client):
+        """Should not create a label value per unknown path"""
+        labels = {"method": "GET", "route": UNMATCHED_ROUTE, "status": "404"}
+        before = sample("tutorwise_http_requests_total", **labels)
+
+        test_client.get("/no-such-path-1")
+        test_client.get("/no-such-path-2")
+
+        assert sample("tutorwise_http_requests_total", **labels) == before + 2
+
+    def test_in_progress_returns_to_zero(self, test_client):
+        """Should decrement the in-flight gauge once the response is sent"""
+        test_client.get("/livez")
+
+        assert sample("tutorwise_http_requests_in_progress") == 0
+
+    def test_metrics_endpoint_exposes_request_metrics(self, test_client):
+        """Should expose request metrics in Prometheus text format"""
+        test_client.get("/livez")
+
+        response = test_client.get("/metrics")
+
+        assert response.status_code == 200
+        assert 'tutorwise_http_requests_total{method="GET",route="/livez",status="200"}' in response.text
+
+
+class TestDependencyMetrics:
+    """Test backing-service timings."""
+
+    def test_track_dependency_counts_errors(self):
+        """Should time the call and count it as an error when it raises"""
+        before = sample("tutorwise_dependency_errors_total", dependency="redis", operation="test_op")
+
+        with pytest.raises(RuntimeError):
+            with track_dependency("redis", "test_op"):
+                raise RuntimeError("boom")
+
+        assert sample("tutorwise_dependency_errors_total", dependency="redis", operation="test_op") == before + 1
+        assert sample(
+            "tutorwise_dependency_duration_seconds_count", dependency="redis", operation="test_op"
+        ) >= 1
+
+    @pytest.mark.parametrize("url,expected", [
+        ("https://x.supabase.co/rest/v1/role_details?select=*", "GET rest:role_details"),
+        ("https://x.supabase.co/auth/v1/user", "GET auth:user"),
+        ("https://x.supabase.co/", "GET root"),
+    ])
+    def test_supabase_operation_label(self, url, expected):
+        """Should label Supabase calls by service and table, not by full URL"""
+        assert supabase_operation(httpx.Request("GET", url)) == expected
+
+    @pytest.mark.asyncio
+    async def test_instrumented_transport_records_server_errors(self):
+        """Should time Supabase requests and count 5xx responses as errors"""
+        labels = {"dependency": "supabase", "operation": "POST rest:onboarding_progress"}
+        before = sample("tutorwise_dependency_errors_total", **labels)
+        transport = InstrumentedTransport(httpx.MockTransport(lambda request: httpx.Response(503)))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.post("https://x.supabase.co/rest/v1/onboarding_progress")
+
+        assert response.status_code == 503
+        assert sample("tutorwise_dependency_errors_total", **labels) == before + 1
+        assert sample("tutorwise_dependency_duration_seconds_count", **labels) >= 1
@@ -0,0 +1,241 @@
+"""
+Unit tests for onboarding API endpoints
+Tests progress caching and patch-based autosave
+"""
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import HTTPException, Response
+
+from app.api.onboarding import (
+    OnboardingProgressPatchRequest,
+    OnboardingProgressRequest,
+    delete_onboarding_progress,
+    get_onboarding_progress,
+    patch_onboarding_progress,
+    save_onboarding_progress,
+)
+from benchmarks.fakes import FakeAsyncRedis
+
+
+def progress_row(step: int = 2) -> dict:
+    return {
+        "id": "progress-1",
+        "profile_id": "user-123",
+        "role_type": "tutor",
+        "current_step": step,
+        "step_data": {"name": "Ada"},
+        "is_complete": False,
+        "updated_at": "2025-01-01T00:00:00",
+        "version": 7,
+    }
+
+
+@pytest.fixture
+def mock_supabase():
+    supabase = MagicMock()
+    table = supabase.table.return_value
+    table.select.return_value.eq.return_value.eq.return_value.maybe_single.return_value.execute = AsyncMock(
+        return_value=MagicMock(data=progress_row())
+    )
+    table.upsert.return_value.execute = AsyncMock(return_value=MagicMock(data=[progress_row(3)]))
+    table.delete.return_value.eq.return_value.eq.return_value.execute = AsyncMock()
+    table.update.return_value.eq.return_value.eq.return_value.eq.return_value.execute = AsyncMock(
+        side_effect=lambda: MagicMock(data=[{**progress_row(), **table.update.call_args.args[0]}])
+    )
+    with patch('app.db.redis_client', FakeAsyncRedis()):
+        yield supabase
+
+
+def select_execute(supabase):
+    return supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.maybe_single.return_value.execute
+
+
+class TestOnboardingProgressCache:
+    """Test the read-through cache on GET /progress/{role_type}."""
+
+    @pytest.mark.asyncio
+    async def test_repeat_reads_skip_supabase(self, mock_supabase):
+        """Should query Supabase once and serve later page loads from the cache"""
+        first = await get_onboarding_progress("tutor", user_id="user-123", supabase=mock_supabase, response=Response())
+        second = await get_onboarding_progress("tutor", user_id="user-123", supabase=mock_supabase, response=Response())
+
+        assert first == second
+        assert second.progress_id == "progress-1"
+        select_execute(mock_supabase).assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_query(self, mock_supabase):
+        """Should load progress once when several tabs open the wizard at the same time"""
+        async def query():
+            await asyncio.sleep(0.02)
+            return MagicMock(data=progress_row())
+
+        select_execute(mock_supabase).side_effect = query
+
+        results = await asyncio.gather(*(
+            get_onboarding_progress("tutor", user_id="user-123", supabase=mock_supabase, response=Response())
+            for _ in range(5)
+        ))
+
+        assert {result.current_step for result in results} == {2}
+        assert select_execute(mock_supabase).call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_save_populates_cache(self, mock_supabase):
+        """Should serve the saved row on the next read without querying Supabase"""
+        request = OnboardingProgressRequest(step=3, role_type="tutor", data={"name": "Ada"})
+
+        await save_onboarding_progress(request, user_id="user-123", supabase=mock_supabase)
+        progress = await get_onboarding_progress(
+            "tutor", user_id="user-123", supabase=mock_supabase, response=Response()
+        )
+
+        assert progress.current_step == 3
+        select_execute(mock_supabase).assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_delete_invalidates_cache(self, mock_supabase):
+        """Should reload from Supabase after progress is deleted"""
+        await get_onboarding_progress("tutor", user_id="user-123", supabase=mock_supabase, response=Response())
+        await delete_onboarding_progress("tutor", user_id="user-123", supabase=mock_supabase)
+        select_execute(mock_supabase).return_value = MagicMock(data=None)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await get_onboarding_progress("tutor", user_id="user-123", supabase=mock_supabase, response=Response())
+
+        assert exc_info.value.status_code == 404
+        assert select_execute(mock_supabase).await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_matching_etag_returns_304(self, mock_supabase):
+        """Should answer If-None-Match from the cached row with a 304"""
+        response = MagicMock(headers={})
+        await get_onboarding_progress("tutor", user_id="user-123", supabase=mock_supabase, response=response)
+        etag = response.headers["ETag"]
+
+        revalidated = await get_onboarding_progress(
+            "tutor", user_id="user-123", supabase=mock_supabase, if_none_match=etag,
+            response=Response()
+        )
+
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == etag
+        select_execute(mock_supabase).assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_save_changes_etag(self, mock_supabase):
+        """Should return the new progress when the client's ETag predates a save"""
+        response = MagicMock(headers={})
+        await get_onboarding_progress("tutor", user_id="user-123", supabase=mock_supabase, response=response)
+        etag = response.headers["ETag"]
+        await save_onboarding_progress(
+            OnboardingProgressRequest(step=3, role_type="tutor", data={"name": "Ada"}),
+            user_id="user-123", supabase=mock_supabase
+        )
+
+        progress = await get_onboarding_progress(
+            "tutor", user_id="user-123", supabase=mock_supabase, if_none_match=etag,
+            response=Response()
+        )
+
+        assert progress.current_step == 3
+
+
+def update_call(supabase):
+    return supabase.table.return_value.update
+
+
+class TestPatchOnboardingProgress:
+    """Test PATCH /progress/{role_type} with merge and JSON patches."""
+
+    @pytest.mark.asyncio
+    async def test_merge_patch_updates_step_data(self, mock_supabase):
+        """Should merge the delta into the current step_data and bump the version"""
+        request = OnboardingProgressPatchRequest(version=7, merge_patch={"subjects": ["maths"], "name": None})
+
+        result = await patch_onboarding_progress("tutor", request, user_id="user-123", supabase=mock_supabase)
+
+        assert result.step_data == {"subjects": ["maths"]}
+        assert result.current_step == 2
+        assert result.version > 7
+        update = update_call(mock_supabase)
+        update.return_value.eq.return_value.eq.return_value.eq.assert_called_once_with("version", 7)
+
+    @pytest.mark.asyncio
+    async def test_json_patch_updates_step_data(self, mock_supabase):
+        """Should apply JSON Patch operations in order"""
+        request = OnboardingProgressPatchRequest.model_validate({
+            "version": 7,
+            "step": 3,
+            "json_patch": [
+                {"op": "add", "path": "/subjects", "value": ["maths"]},
+                {"op": "add", "path": "/subjects/-", "value": "physics"},
+                {"op": "move", "from": "/name", "path": "/full_name"},
+            ],
+        })
+
+        result = await patch_onboarding_progress("tutor", request, user_id="user-123", supabase=mock_supabase)
+
+        assert result.step_data == {"subjects": ["maths", "physics"], "full_name": "Ada"}
+        assert result.current_step == 3
+
+    @pytest.mark.asyncio
+    async def test_stale_version_is_rejected(self, mock_supabase):
+        """Should return 409 with the current version without writing"""
+        request = OnboardingProgressPatchRequest(version=6, merge_patch={"name": "Grace"})
+
+        with pytest.raises(HTTPException) as exc_info:
+            await patch_onboarding_progress("tutor", request, user_id="user-123", supabase=mock_supabase)
+
+        assert exc_info.value.status_code == 409
+        assert exc_info.value.detail["current_version"] == 7
+        update_call(mock_supabase).assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_write_is_rejected(self, mock_supabase):
+        """Should return 409 when the row changed between the read and the conditional update"""
+        update = update_call(mock_supabase)
+        update.return_value.eq.return_value.eq.return_value.eq.return_value.execute = AsyncMock(
+            return_value=MagicMock(data=[])
+        )
+        request = OnboardingProgressPatchRequest(version=7, merge_patch={"name": "Grace"})
+
+        with pytest.raises(HTTPException) as exc_info:
+            await patch_onboarding_progress("tutor", request, user_id="user-123", supabase=mock_supabase)
+
+        assert exc_info.value.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_patch_is_applied_to_cached_progress(self, mock_supabase):
+        """Should patch the cached row and serve the result without reloading"""
+        await get_onboarding_progress("tutor", user_id="user-123", supabase=mock_supabase, response=Response())
+        first = await patch_onboarding_progress(
+            "tutor", OnboardingProgressPatchRequest(version=7, merge_patch={"a": 1}),
+            user_id="user-123", supabase=mock_supabase
+        )
+        await patch_onboarding_progress(
+            "tutor", OnboardingProgressPatchRequest(version=first.version, merge_patch={"b": 2}),
+            user_id="user-123", supabase=mock_supabase
+        )
+        progress = await get_onboarding_progress(
+            "tutor", user_id="user-123", supabase=mock_supabase, response=Response()
+        )
+
+        assert progress.step_data == {"name": "Ada", "a": 1, "b": 2}
+        select_execute(mock_supabase).assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_invalid_patch_is_rejected(self, mock_supabase):
+        """Should return 422 when a JSON Patch operation does not apply"""
+        request = OnboardingProgressPatchRequest.model_validate({
+            "version": 7,
+            "json_patch": [{"op": "remove", "path": "/missing"}],
+        })
+
+        with pytest.raises(HTTPException) as exc_info:
+            await patch_onboarding_progress("tutor", request, user_id="user-123", supabase=mock_supabase)
+
+        assert exc_info.value.status_code == 422
+        update_call(mock_supabase).assert_not_called()
@@ -0,0 +1,306 @@
+"""
+Unit tests for write-behind onboarding autosave.
+"""
+import asyncio
+import json
+import time
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import HTTPException, Response
+
+from app.api.onboarding import (
+    OnboardingProgressPatchRequest,
+    OnboardingProgressRequest,
+    delete_onboarding_progress,
+    get_onboarding_progress,
+    patch_onboarding_progress,
+    save_onboarding_progress,
+)
+from app.cache import onboarding_progress_cache
+from app.onboarding_buffer import (
+    FLUSH_LOCK_KEY,
+    PENDING_KEY,
+    OnboardingWriteBuffer,
+    VersionConflict,
+    onboarding_write_buffer,
+)
+from benchmarks.fakes import FakeAsyncRedis
+
+
+def progress_row(step: int, name: str = "Ada", is_complete: bool = False) -> dict:
+    return {
+        "profile_id": "user-123",
+        "role_type": "tutor",
+        "current_step": step,
+        "step_data": {"name": name},
+        "is_complete": is_complete,
+        "updated_at": f"2025-01-01T00:00:0{step}",
+    }
+
+
+async def buffer_rows(redis: FakeAsyncRedis, *profile_ids: str) -> None:
+    for profile_id in profile_ids:
+        await redis.hset(PENDING_KEY, f"{profile_id}:tutor", json.dumps({**progress_row(2), "profile_id": profile_id}))
+
+
+@pytest.fixture
+def fake_redis():
+    redis = FakeAsyncRedis()
+    with patch('app.db.redis_client', redis):
+        yield redis
+
+
+@pytest.fixture
+def mock_supabase():
+    supabase = MagicMock()
+    supabase.table.return_value.upsert.return_value.execute = AsyncMock(return_value=MagicMock(data=[{}]))
+    # The flush function returns how many rows it wrote; by default all of them
+    supabase.rpc.return_value.execute = AsyncMock(
+        side_effect=lambda: MagicMock(data=len(supabase.rpc.call_args.args[1]["rows"]))
+    )
+    with patch('app.db.supabase_client', supabase):
+        yield supabase
+
+
+class TestOnboardingWriteBuffer:
+    """Test buffering, coalescing and flushing."""
+
+    @pytest.mark.asyncio
+    async def test_coalesces_autosaves_into_one_upsert(self, fake_redis, mock_supabase):
+        """Should write only the latest row per wizard, in one batched upsert"""
+        buffer = OnboardingWriteBuffer(interval=5, batch_size=500)
+        # Remember step 2 so the saves below are not step changes
+        await fake_redis.set("onboarding:step:user-123:tutor", 2)
+
+        for name in ("A", "Ad", "Ada"):
+            assert await buffer.save(progress_row(2, name)) is True
+        other = {**progress_row(2), "profile_id": "user-456"}
+        await fake_redis.set("onboarding:step:user-456:tutor", 2)
+        await buffer.save(other)
+
+        rpc = mock_supabase.rpc
+        rpc.assert_not_called()
+
+        assert await buffer.flush_all() == 2
+
+        rpc.assert_called_once()
+        function, params = rpc.call_args.args
+        assert function == "upsert_onboarding_progress_if_newer"
+        assert {row["profile_id"]: row["step_data"]["name"] for row in params["rows"]} == {
+            "user-123": "Ada", "user-456": "Ada"
+        }
+        assert await fake_redis.hgetall(PENDING_KEY) == {}
+
+    @pytest.mark.asyncio
+    async def test_step_change_flushes_immediately(self, fake_redis, mock_supabase):
+        """Should flush a wizard's row as soon as its step changes"""
+        buffer = OnboardingWriteBuffer(interval=5, batch_size=500)
+        await fake_redis.set("onboarding:step:user-123:tutor", 1)
+
+        await buffer.save(progress_row(2))
+        await buffer.stop()
+
+        assert mock_supabase.rpc.call_args.args[1]["rows"] == [progress_row(2)]
+
+    @pytest.mark.asyncio
+    async def test_flush_keeps_rows_saved_meanwhile(self, fake_redis, mock_supabase):
+        """Should not drop an autosave that lands while its older version is being flushed"""
+        buffer = OnboardingWriteBuffer(interval=5, batch_size=500)
+        await fake_redis.hset(PENDING_KEY, "user-123:tutor", json.dumps(progress_row(2, "old")))
+
+        async def save_during_flush():
+            await fake_redis.hset(PENDING_KEY, "user-123:tutor", json.dumps(progress_row(2, "new")))
+            return MagicMock(data=1)
+
+        mock_supabase.rpc.return_value.execute = AsyncMock(side_effect=save_during_flush)
+
+        await buffer.flush()
+
+        assert json.loads(await fake_redis.hget(PENDING_KEY, "user-123:tutor"))["step_data"] == {"name": "new"}
+
+    @pytest.mark.asyncio
+    async def test_counts_only_rows_written(self, fake_redis, mock_supabase):
+        """Should not count rows the flush function skipped as not newer than the stored ones"""
+        buffer = OnboardingWriteBuffer(interval=5, batch_size=500)
+        await buffer_rows(fake_redis, "user-123", "user-456")
+        mock_supabase.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=1))
+
+        with patch('app.onboarding_buffer.ONBOARDING_FLUSHED_ROWS_TOTAL') as flushed_rows:
+            assert await buffer.flush() == 1
+
+        flushed_rows.inc.assert_called_once_with(1)
+        assert await fake_redis.hgetall(PENDING_KEY) == {}
+
+    @pytest.mark.asyncio
+    async def test_flush_lock_renewed_per_batch(self, fake_redis, mock_supabase):
+        """Should keep the lock for a flush that outlasts its TTL"""
+        buffer = OnboardingWriteBuffer(interval=5, batch_size=1)
+        await buffer_rows(fake_redis, "user-123", "user-456")
+        ttls = []
+
+        async def slow_upsert():
+            ttls.append(await fake_redis.ttl(FLUSH_LOCK_KEY))
+            # As if this batch took nearly the whole lock TTL
+            fake_redis.expiry[FLUSH_LOCK_KEY] = time.monotonic() + 0.5
+            return MagicMock(data=1)
+
+        mock_supabase.rpc.return_value.execute = AsyncMock(side_effect=slow_upsert)
+
+        assert await buffer.flush() == 2
+        assert ttls[1] > 1
+
+    @pytest.mark.asyncio
+    async def test_flush_stops_when_lock_lost(self, fake_redis, mock_supabase):
+        """Should leave the remaining batches buffered once another worker holds the lock"""
+        buffer = OnboardingWriteBuffer(interval=5, batch_size=1)
+        await buffer_rows(fake_redis, "user-123", "user-456")
+
+        async def lock_expires_during_upsert():
+            await fake_redis.set(FLUSH_LOCK_KEY, "other-worker")
+            return MagicMock(data=1)
+
+        mock_supabase.rpc.return_value.execute = AsyncMock(side_effect=lock_expires_during_upsert)
+
+        assert await buffer.flush() == 1
+        mock_supabase.rpc.assert_called_once()
+        assert len(await fake_redis.hgetall(PENDING_KEY)) == 1
+        assert await fake_redis.get(FLUSH_LOCK_KEY) == "other-worker"
+
+    @pytest.mark.asyncio
+    async def test_immediate_flush_waits_for_running_flush(self, fake_redis, mock_supabase):
+        """Should not write a row while another worker's flush holds the lock"""
+        buffer = OnboardingWriteBuffer(interval=1, batch_size=500)
+        await fake_redis.set(FLUSH_LOCK_KEY, "other-worker")
+        await fake_redis.set("onboarding:step:user-123:tutor", 1)
+
+        await buffer.save(progress_row(2))
+        await asyncio.sleep(0.1)
+        mock_supabase.rpc.assert_not_called()
+
+        await fake_redis.delete(FLUSH_LOCK_KEY)
+        await asyncio.gather(*buffer._immediate)
+
+        assert mock_supabase.rpc.call_args.args[1]["rows"] == [progress_row(2)]
+
+    @pytest.mark.asyncio
+    async def test_discard_waits_for_flush_in_flight(self, fake_redis, mock_supabase):
+        """Should drop a row only after a flush that already read it has finished"""
+        buffer = OnboardingWriteBuffer(interval=1, batch_size=500)
+        await fake_redis.hset(PENDING_KEY, "user-123:tutor", json.dumps(progress_row(2)))
+        upserting = asyncio.Event()
+        finish = asyncio.Event()
+        events = []
+
+        async def slow_upsert():
+            upserting.set()
+            await finish.wait()
+            events.append("flushed")
+            return MagicMock(data=1)
+
+        mock_supabase.rpc.return_value.execute = AsyncMock(side_effect=slow_upsert)
+
+        flush = asyncio.create_task(buffer.flush())
+        await upserting.wait()
+        discard = asyncio.create_task(buffer.discard("user-123", "tutor"))
+        await asyncio.sleep(0.1)
+        assert not discard.done()
+
+        finish.set()
+        await asyncio.gather(flush, discard)
+        events.append("discarded")
+
+        assert events == ["flushed", "discarded"]
+        assert await fake_redis.hgetall(PENDING_KEY) == {}
+
+    @pytest.mark.asyncio
+    async def test_versioned_save_rejects_stale_version(self, fake_redis, mock_supabase):
+        """Should only replace a buffered row that is still at the expected version"""
+        buffer = OnboardingWriteBuffer(interval=5, batch_size=500)
+        await fake_redis.set("onboarding:step:user-123:tutor", 2)
+        stored_version = AsyncMock(return_value=0)
+
+        assert await buffer.save({**progress_row(2), "version": 1}, 0, stored_version) is True
+        assert await buffer.save({**progress_row(2, "Ad"), "version": 2}, 1, stored_version) is True
+        with pytest.raises(VersionConflict) as exc_info:
+            await buffer.save({**progress_row(2, "A"), "version": 3}, 1, stored_version)
+
+        assert exc_info.value.current_version == 2
+        assert json.loads(await fake_redis.hget(PENDING_KEY, "user-123:tutor"))["step_data"] == {"name": "Ad"}
+        # Only consulted while nothing was buffered
+        stored_version.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_versioned_save_checks_stored_row_when_nothing_buffered(self, fake_redis, mock_supabase):
+        """Should compare with the stored row once the buffered one has been flushed"""
+        buffer = OnboardingWriteBuffer(interval=5, batch_size=500)
+
+        with pytest.raises(VersionConflict) as exc_info:
+            await buffer.save({**progress_row(2), "version": 3}, 1, AsyncMock(return_value=2))
+
+        assert exc_info.value.current_version == 2
+        assert await fake_redis.hgetall(PENDING_KEY) == {}
+
+    @pytest.mark.asyncio
+    async def test_without_redis_caller_writes_through(self, mock_supabase):
+        """Should report that nothing was buffered when Redis is unavailable"""
+        buffer = OnboardingWriteBuffer(interval=5, batch_size=500)
+
+        with patch('app.db.redis_client', None):
+            assert await buffer.save(progress_row(1)) is False
+
+
+class TestWriteBehindEndpoints:
+    """Test save/get/delete progress with write-behind enabled."""
+
+    @pytest.fixture(autouse=True)
+    def enable_write_behind(self, monkeypatch):
+        monkeypatch.setenv("ONBOARDING_WRITE_BEHIND", "true")
+
+    @pytest.mark.asyncio
+    async def test_save_is_acknowledged_from_buffer(self, fake_redis, mock_supabase):
+        """Should acknowledge autosaves without waiting for Supabase and serve them on read"""
+        await fake_redis.set("onboarding:step:user-123:tutor", 3)
+        request = OnboardingProgressRequest(step=3, role_type="tutor", data={"subjects": ["maths"]})
+
+        saved = await save_onboarding_progress(request, user_id="user-123", supabase=mock_supabase)
+        restored = await get_onboarding_progress(
+            "tutor", user_id="user-123", supabase=mock_supabase, response=Response()
+        )
+
+        assert saved.success is True
+        mock_supabase.table.return_value.upsert.assert_not_called()
+        mock_supabase.rpc.assert_not_called()
+        assert restored.current_step == 3
+        assert restored.step_data == {"subjects": ["maths"]}
+        mock_supabase.table.return_value.select.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_patch_against_row_superseded_on_another_worker(self, fake_redis, mock_supabase):
+        """Should reject a patch based on a cached row older than the one another worker flushed"""
+        # This worker still caches version 1; another worker saved and flushed version 2
+        await onboarding_progress_cache.put("user-123:tutor", {**progress_row(2), "version": 1})
+        select = mock_supabase.table.return_value.select
+        select.return_value.eq.return_value.eq.return_value.maybe_single.return_value.execute = AsyncMock(
+            return_value=MagicMock(data={"version": 2})
+        )
+        request = OnboardingProgressPatchRequest(version=1, merge_patch={"name": "Grace"})
+
+        with pytest.raises(HTTPException) as exc_info:
+            await patch_onboarding_progress("tutor", request, user_id="user-123", supabase=mock_supabase)
+
+        assert exc_info.value.status_code == 409
+        assert exc_info.value.detail["current_version"] == 2
+        select.assert_called_once_with("version")
+        assert await fake_redis.hgetall(PENDING_KEY) == {}
+
+    @pytest.mark.asyncio
+    async def test_delete_discards_buffered_progress(self, fake_redis, mock_supabase):
+        """Should drop buffered autosaves so they are not flushed after a delete"""
+        mock_supabase.table.return_value.delete.return_value.eq.return_value.eq.return_value.execute = AsyncMock()
+        await fake_redis.hset(PENDING_KEY, "user-123:tutor", json.dumps(progress_row(2)))
+
+        await delete_onboarding_progress("tutor", user_id="user-123", supabase=mock_supabase)
+
+        assert await onboarding_write_buffer.flush() == 0
+        mock_supabase.rpc.assert_not_called()
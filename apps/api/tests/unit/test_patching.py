@@ -0,0 +1,60 @@
+"""
+Unit tests for JSON Merge Patch and JSON Patch application.
+"""
+import pytest
+
+from app.patching import PatchError, apply_json_patch, apply_merge_patch
+
+
+class TestMergePatch:
+    """Test RFC 7396 merge patches."""
+
+    def test_merges_recursively_and_deletes_nulls(self):
+        """Should merge nested objects, replace arrays and remove null members"""
+        target = {"a": {"b": 1, "c": 2}, "list": [1, 2], "gone": True}
+
+        result = apply_merge_patch(target, {"a": {"c": 3, "d": 4}, "list": [3], "gone": None})
+
+        assert result == {"a": {"b": 1, "c": 3, "d": 4}, "list": [3]}
+        assert target == {"a": {"b": 1, "c": 2}, "list": [1, 2], "gone": True}
+
+
+class TestJsonPatch:
+    """Test RFC 6902 JSON patches."""
+
+    def test_applies_operations_in_order(self):
+        """Should support add, remove, replace, move, copy and test"""
+        document = {"name": "Ada", "subjects": ["maths"], "a/b": 1}
+
+        result = apply_json_patch(document, [
+            {"op": "test", "path": "/name", "value": "Ada"},
+            {"op": "add", "path": "/subjects/0", "value": "physics"},
+            {"op": "add", "path": "/subjects/-", "value": "chemistry"},
+            {"op": "replace", "path": "/name", "value": "Grace"},
+            {"op": "copy", "from": "/name", "path": "/display_name"},
+            {"op": "move", "from": "/a~1b", "path": "/count"},
+            {"op": "remove", "path": "/subjects/1"},
+        ])
+
+        assert result == {
+            "name": "Grace",
+            "display_name": "Grace",
+            "subjects": ["physics", "chemistry"],
+            "count": 1,
+        }
+        assert document == {"name": "Ada", "subjects": ["maths"], "a/b": 1}
+
+    @pytest.mark.parametrize("operations", [
+        [{"op": "remove", "path": "/missing"}],
+        [{"op": "replace", "path": "/missing", "value": 1}],
+        [{"op": "add", "path": "/subjects/5", "value": "x"}],
+        [{"op": "add", "path": "/name"}],
+        [{"op": "test", "path": "/name", "value": "Grace"}],
+        [{"op": "move", "from": "/subjects", "path": "/subjects/0"}],
+        [{"op": "add", "path": "name", "value": 1}],
+        [{"op": "frobnicate", "path": "/name"}],
+    ])
+    def test_rejects_invalid_operations(self, operations):
+        """Should raise PatchError for operations that cannot be applied"""
+        with pytest.raises(PatchError):
+            apply_json_patch({"name": "Ada", "subjects": ["maths"]}, operations)
@@ -0,0 +1,91 @@
+"""
+Unit tests for the on-demand request profiler.
+"""
+import json
+
+import pytest
+
+from app.profiling import request_profiler
+
+
+@pytest.fixture
+def profiles_dir(tmp_path, monkeypatch):
+    """Write profiles to a temporary directory with a known debug token."""
+    monkeypatch.setenv("DEBUG_TOKEN", "debug-secret")
+    monkeypatch.setattr(request_profiler, "directory", tmp_path)
+    monkeypatch.setattr(request_profiler, "sample_rate", 0.0)
+    return tmp_path
+
+
+class TestProfilingMiddleware:
+    """Test which requests are profiled and how profiles are exposed."""
+
+    def test_profiles_request_with_debug_token(self, test_client, profiles_dir):
+        """Should write a speedscope profile and link it in X-Profile-Url"""
+        response = test_client.get("/livez", headers={"X-Profile": "debug-secret"})
+
+        assert response.status_code == 200
+        url = response.headers["X-Profile-Url"]
+        name = url.rsplit("/", 1)[-1]
+        profile = json.loads((profiles_dir / name).read_text())
+        assert "speedscope" in profile["$schema"]
+
+    def test_ignores_wrong_token(self, test_client, profiles_dir):
+        """Should not profile when the header does not match DEBUG_TOKEN"""
+        response = test_client.get("/livez", headers={"X-Profile": "guess"})
+
+        assert "X-Profile-Url" not in response.headers
+        assert list(profiles_dir.iterdir()) == []
+
+    def test_header_disabled_without_debug_token(self, test_client, profiles_dir, monkeypatch):
+        """Should never profile on header when DEBUG_TOKEN is unset"""
+        monkeypatch.delenv("DEBUG_TOKEN")
+
+        response = test_client.get("/livez", headers={"X-Profile": ""})
+
+        assert "X-Profile-Url" not in response.headers
+
+    def test_samples_requests(self, test_client, profiles_dir, monkeypatch):
+        """Should profile requests selected by PROFILING_SAMPLE_RATE"""
+        monkeypatch.setattr(request_profiler, "sample_rate", 1.0)
+
+        response = test_client.get("/livez")
+
+        assert "X-Profile-Url" in response.headers
+        assert len(request_profiler.list_profiles()) == 1
+
+    def test_prunes_old_profiles(self, test_client, profiles_dir, monkeypatch):
+        """Should keep at most PROFILING_MAX_FILES profiles"""
+        monkeypatch.setattr(request_profiler, "max_files", 2)
+
+        for _ in range(3):
+            test_client.get("/livez", headers={"X-Profile": "debug-secret"})
+
+        assert len(request_profiler.list_profiles()) == 2
+
+
+class TestDebugProfileRoutes:
+    """Test downloading stored profiles."""
+
+    def test_download_profile(self, test_client, profiles_dir):
+        """Should serve a stored profile to holders of the debug token"""
+        url = test_client.get("/livez", headers={"X-Profile": "debug-secret"}).headers["X-Profile-Url"]
+
+        response = test_client.get(url, headers={"X-Debug-Token": "debug-secret"})
+
+        assert response.status_code == 200
+        assert "speedscope" in response.json()["$schema"]
+
+    def test_requires_debug_token(self, test_client, profiles_dir):
+        """Should hide debug routes from callers without the token"""
+        response = test_client.get("/debug/profiles")
+
+        assert response.status_code == 404
+
+    def test_rejects_path_traversal(self, test_client, profiles_dir):
+        """Should only serve plain profile names from the profile directory"""
+        response = test_client.get(
+            "/debug/profiles/..%2F..%2Fetc%2Fpasswd", headers={"X-Debug-Token": "debug-secret"}
+        )
+
+        assert response.status_code == 404
@@ -0,0 +1,160 @@
+"""
+Unit tests for the auth rate limiter.
+"""
+import pytest
+import redis.exceptions
+from unittest.mock import AsyncMock, MagicMock, patch
+from starlette.requests import Request
+
+from app.rate_limit import RateLimit, RateLimiter, RateLimitExceeded, client_ip
+
+
+def redis_with_script(*results):
+    """Redis client whose token-bucket script returns the given results in turn"""
+    script = AsyncMock(side_effect=list(results))
+    client = MagicMock()
+    client.register_script.return_value = script
+    return client, script
+
+
+def request_from(client: str, forwarded_for: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return Request({"type": "http", "headers": headers, "client": (client, 50000)})
+
+
+IP_LIMIT = RateLimit("test_ip", 3, 60)
+EMAIL_LIMIT = RateLimit("test_email", 2, 60)
+
+
+class TestRateLimiter:
+    """Test bucket checks with and without Redis."""
+
+    @pytest.mark.asyncio
+    async def test_redis_checks_every_bucket_in_one_call(self):
+        """Should send all buckets with their capacity and refill rate to a single script call"""
+        client, script = redis_with_script([0, 0])
+        limiter = RateLimiter()
+
+        with patch('app.rate_limit.get_redis_client', return_value=client):
+            await limiter.check([(IP_LIMIT, "ip-key"), (EMAIL_LIMIT, "email-key")])
+
+        script.assert_awaited_once()
+        assert script.call_args.kwargs["keys"] == ["ip-key", "email-key"]
+        assert script.call_args.kwargs["args"] == [3, 3 / 60 / 1000, 2, 2 / 60 / 1000]
+
+    @pytest.mark.asyncio
+    async def test_refused_key_is_refused_locally_afterwards(self):
+        """Should report the refusing bucket and refuse that key again without asking Redis"""
+        client, script = redis_with_script([2, 1500])
+        limiter = RateLimiter()
+
+        with patch('app.rate_limit.get_redis_client', return_value=client):
+            with pytest.raises(RateLimitExceeded) as first:
+                await limiter.check([(IP_LIMIT, "ip-key"), (EMAIL_LIMIT, "email-key")])
+            with pytest.raises(RateLimitExceeded) as second:
+                await limiter.check([(IP_LIMIT, "other-ip"), (EMAIL_LIMIT, "email-key")])
+
+        assert first.value.limit == "test_email"
+        assert first.value.retry_after == 1.5
+        assert second.value.limit == "test_email"
+        assert 0 < second.value.retry_after <= 1.5
+        script.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_limits_per_worker_without_redis(self):
+        """Should keep the buckets in-process when Redis is unavailable"""
+        limiter = RateLimiter()
+
+        with patch('app.rate_limit.get_redis_client', return_value=None):
+            await limiter.check([(EMAIL_LIMIT, "email-key")])
+            await limiter.check([(EMAIL_LIMIT, "email-key")])
+            with pytest.raises(RateLimitExceeded) as exc_info:
+                await limiter.check([(EMAIL_LIMIT, "email-key")])
+            await limiter.check([(EMAIL_LIMIT, "other-email")])
+
+        assert exc_info.value.retry_after == pytest.approx(30, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_refusal_takes_no_tokens(self):
+        """Should leave the other buckets untouched when one bucket refuses"""
+        limiter = RateLimiter()
+
+        with patch('app.rate_limit.get_redis_client', return_value=None):
+            await limiter.check([(EMAIL_LIMIT, "email-key")])
+            await limiter.check([(EMAIL_LIMIT, "email-key")])
+            with pytest.raises(RateLimitExceeded):
+                await limiter.check([(IP_LIMIT, "ip-key"), (EMAIL_LIMIT, "email-key")])
+            for _ in range(3):
+                await limiter.check([(IP_LIMIT, "ip-key")])
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_fall_back_to_local_buckets(self):
+        """Should keep limiting when the Redis call fails"""
+        client = MagicMock()
+        client.register_script.return_value = AsyncMock(side_effect=redis.exceptions.ConnectionError("refused"))
+        limiter = RateLimiter()
+
+        with patch('app.rate_limit.get_redis_client', return_value=client):
+            await limiter.check([(EMAIL_LIMIT, "email-key")])
+            await limiter.check([(EMAIL_LIMIT, "email-key")])
+            with pytest.raises(RateLimitExceeded):
+                await limiter.check([(EMAIL_LIMIT, "email-key")])
+
+
+class TestClientIp:
+    """Test client address resolution behind proxies."""
+
+    def test_ignores_forwarded_for_by_default(self):
+        """Should not trust X-Forwarded-For unless proxies are configured"""
+        assert client_ip(request_from("10.0.0.1", "1.2.3.4")) == "10.0.0.1"
+
+    def test_uses_entry_added_by_trusted_proxy(self, monkeypatch):
+        """Should skip entries the client could have forged"""
+        monkeypatch.setenv("RATE_LIMIT_TRUSTED_PROXIES", "1")
+
+        assert client_ip(request_from("10.0.0.1", "6.6.6.6, 1.2.3.4")) == "1.2.3.4"
+
+
+class TestAuthRateLimit:
+    """Test the dependency on the auth routes."""
+
+    @pytest.mark.asyncio
+    async def test_login_is_limited_per_email_before_hashing(self, async_test_client):
+        """Should answer 429 with Retry-After once an email used up its attempts"""
+        body = {"email": "ada@example.com", "password": "wrong-password"}
+
+        with patch('app.db.redis_client', None), patch('app.db.neo4j_driver', None), \
+                patch('app.api.auth.AuthService.verify_password_async') as verify:
+            statuses = [(await async_test_client.post("/auth/login", json=body)).status_code for _ in range(5)]
+            limited = await async_test_client.post("/auth/login", json={**body, "email": "ADA@example.com"})
+            other = await async_test_client.post("/auth/login", json={**body, "email": "grace@example.com"})
+
+        assert statuses == [401] * 5
+        assert limited.status_code == 429
+        assert 1 <= int(limited.headers["retry-after"]) <= 60
+        assert other.status_code == 401
+        verify.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_register_is_limited_per_ip(self, async_test_client):
+        """Should limit registrations from one address across different emails"""
+        with patch('app.db.redis_client', None), patch('app.db.neo4j_driver', None):
+            statuses = [
+                (await async_test_client.post("/auth/register", json={
+                    "email": f"user{i}@example.com", "password": "password123", "username": f"user{i}", "full_name": "User",
+                })).status_code
+                for i in range(11)
+            ]
+
+        assert statuses == [503] * 10 + [429]
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, async_test_client, monkeypatch):
+        """Should not limit when RATE_LIMIT_ENABLED is false"""
+        monkeypatch.setenv("RATE_LIMIT_ENABLED", "false")
+        body = {"email": "ada@example.com", "password": "wrong-password"}
+
+        with patch('app.db.redis_client', None), patch('app.db.neo4j_driver', None):
+            statuses = {(await async_test_client.post("/auth/login", json=body)).status_code for _ in range(8)}
+
+        assert statuses == {401}
@@ -0,0 +1,72 @@
+"""
+Unit tests for orjson request parsing and response rendering.
+"""
+from unittest.mock import patch
+
+import orjson
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.serialization import FastJSONRoute, OrjsonResponse
+
+
+class Item(BaseModel):
+    name: str
+    data: dict
+
+
+def build_client() -> TestClient:
+    app = FastAPI()
+    router = APIRouter(route_class=FastJSONRoute)
+
+    @router.post("/items", response_model=Item)
+    async def create_item(item: Item):
+        return item
+
+    @router.get("/plain")
+    async def plain():
+        return {"numbers": {1: "one"}, "ok": True}
+
+    app.include_router(router)
+    return TestClient(app)
+
+
+class TestFastJSONRoute:
+    """Test FastJSONRoute across request parsing and both response paths."""
+
+    def test_model_less_routes_render_with_orjson(self):
+        """Should render dict responses with orjson, including non-string keys"""
+        client = build_client()
+
+        with patch('app.serialization.orjson.dumps', wraps=orjson.dumps) as dumps:
+            response = client.get("/plain")
+
+        assert response.json() == {"numbers": {"1": "one"}, "ok": True}
+        dumps.assert_called_once()
+
+    def test_response_model_routes_keep_pydantic_serialization(self):
+        """Should parse the body with orjson and leave response_model routes to Pydantic"""
+        client = build_client()
+
+        with patch('app.serialization.orjson.loads', wraps=orjson.loads) as loads, \
+                patch('app.serialization.orjson.dumps', wraps=orjson.dumps) as dumps:
+            response = client.post("/items", json={"name": "ada", "data": {"nested": [1, 2]}})
+
+        assert response.status_code == 200
+        assert response.json() == {"name": "ada", "data": {"nested": [1, 2]}}
+        loads.assert_called_once()
+        dumps.assert_not_called()
+
+    def test_malformed_body_is_422(self):
+        """Should report orjson decode errors as FastAPI's json_invalid validation error"""
+        client = build_client()
+
+        response = client.post("/items", content=b'{"name": ', headers={"content-type": "application/json"})
+
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["type"] == "json_invalid"
+
+    def test_orjson_response(self):
+        """Should render compact JSON"""
+        assert OrjsonResponse({"a": [1, 2]}).body == b'{"a":[1,2]}'
@@ -0,0 +1,148 @@
+"""
+Unit tests for single-flight request coalescing.
+"""
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import Response
+
+from app.api.account import get_professional_info
+from app.api.auth import get_user_credentials
+from app.cache import MISSING
+from app.singleflight import SingleFlight
+from benchmarks.fakes import FakeAsyncRedis
+
+
+def slow(result, delay: float = 0.05, calls: list | None = None):
+    async def fn():
+        if calls is not None:
+            calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+    return fn
+
+
+class TestSingleFlight:
+    """Test coalescing on one worker and across workers."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """Should run the call once and hand every concurrent caller its result"""
+        flight = SingleFlight("test-shared")
+        calls = []
+
+        results = await asyncio.gather(*(flight.do("k", slow("v", calls=calls)) for _ in range(10)))
+
+        assert results == ["v"] * 10
+        assert len(calls) == 1
+        assert flight.stats() == {"executed": 1, "coalesced": 9, "waited_remote": 0, "in_flight": 0}
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_and_other_keys_are_not_coalesced(self):
+        """Should only share calls that overlap in time and have the same key"""
+        flight = SingleFlight("test-sequential")
+        calls = []
+
+        await flight.do("k", slow(1, delay=0, calls=calls))
+        await flight.do("k", slow(1, delay=0, calls=calls))
+        await asyncio.gather(flight.do("a", slow(1, calls=calls)), flight.do("b", slow(2, calls=calls)))
+
+        assert len(calls) == 4
+
+    @pytest.mark.asyncio
+    async def test_errors_are_shared_and_not_remembered(self):
+        """Should raise the leader's error in every waiter, then try again on the next call"""
+        flight = SingleFlight("test-errors")
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("down")
+
+        results = await asyncio.gather(flight.do("k", failing), flight.do("k", failing), return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert await flight.do("k", slow("ok", delay=0)) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Should keep the shared call running when the caller that started it goes away"""
+        flight = SingleFlight("test-cancel")
+
+        leader = asyncio.ensure_future(flight.do("k", slow("v")))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", slow("other")))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "v"
+
+    @pytest.mark.asyncio
+    async def test_cross_worker_coalescing(self, monkeypatch):
+        """Should let a second worker reuse the first worker's cached result instead of calling again"""
+        monkeypatch.setenv("SINGLEFLIGHT_DISTRIBUTED", "true")
+        # Two flights with one name stand in for the same flight on two workers
+        worker_a = SingleFlight("test-remote", poll_interval=0.005)
+        worker_b = SingleFlight("test-remote", poll_interval=0.005)
+        shared_cache = {}
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            shared_cache["k"] = "v"
+            return "v"
+
+        async def recheck():
+            return shared_cache.get("k", MISSING)
+
+        with patch('app.singleflight.get_redis_client', return_value=FakeAsyncRedis()):
+            first = asyncio.ensure_future(worker_a.do("k", load, recheck=recheck))
+            await asyncio.sleep(0.01)
+            second = await worker_b.do("k", load, recheck=recheck)
+
+        assert await first == second == "v"
+        assert len(calls) == 1
+        assert worker_b.stats()["waited_remote"] == 1
+
+
+class TestCoalescedReads:
+    """Test that the hot read paths coalesce."""
+
+    @pytest.mark.asyncio
+    async def test_professional_info(self):
+        """Should send one role_details query for concurrent identical reads"""
+        supabase = MagicMock()
+
+        async def query():
+            await asyncio.sleep(0.02)
+            return MagicMock(data=[{"id": "test-id", "role_type": "provider", "updated_at": "2025-10-05T00:00:00Z"}])
+
+        execute = supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute
+        execute.side_effect = query
+
+        with patch('app.cache.get_redis_client', return_value=None):
+            results = await asyncio.gather(*(
+                get_professional_info(role_type="provider", user_id="user-123", supabase=supabase, response=Response())
+                for _ in range(5)
+            ))
+
+        assert {result["id"] for result in results} == {"test-id"}
+        assert execute.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_user_by_email(self):
+        """Should send one Neo4j query for concurrent logins of the same email"""
+        user = {"id": "user_1", "email": "burst@example.com", "password_hash": "hashed"}
+
+        async def read(work):
+            await asyncio.sleep(0.02)
+            return user
+
+        with patch('app.cache.get_redis_client', return_value=None), \
+                patch('app.api.auth.get_neo4j_driver', return_value=MagicMock()), \
+                patch('app.api.auth.neo4j_execute_read', AsyncMock(side_effect=read)) as neo4j_read:
+            results = await asyncio.gather(*(get_user_credentials("burst@example.com") for _ in range(5)))
+
+        assert results == [user] * 5
+        neo4j_read.assert_awaited_once()
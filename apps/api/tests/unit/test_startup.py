@@ -0,0 +1,155 @@
+"""
+Unit tests for worker startup: concurrent connections, lazy imports and phase timing.
+"""
+import asyncio
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+import app.db
+from app.db import DatabaseError, startup_database_connections
+from app.startup import StartupTimer
+
+
+def slow(seconds: float, error: Exception | None = None) -> AsyncMock:
+    async def connect(*args, **kwargs):
+        await asyncio.sleep(seconds)
+        if error:
+            raise error
+    return AsyncMock(side_effect=connect)
+
+
+class TestStartupConnections:
+    """Test connecting to the dependencies at startup."""
+
+    @pytest.mark.asyncio
+    async def test_connects_concurrently(self):
+        """Should wait for the slowest dependency, not for all of them in turn"""
+        timer = StartupTimer()
+
+        with patch('app.db.connect_redis', slow(0.1)), patch('app.db.connect_neo4j', slow(0.1)), \
+                patch('app.db.ensure_neo4j_schema', slow(0)), patch('app.db.connect_supabase', slow(0.1)), \
+                patch('app.db.startup_timer', timer):
+            started = time.perf_counter()
+            await startup_database_connections()
+            elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.25
+        phases = timer.report()["phases"]
+        assert {phase["name"] for phase in phases} == {"redis", "neo4j", "supabase"}
+        assert all(phase["duration_ms"] >= 100 for phase in phases)
+
+    @pytest.mark.asyncio
+    async def test_failed_dependency_does_not_stop_the_others(self):
+        """Should still connect the other dependencies when one fails"""
+        connect_supabase = slow(0.05)
+
+        with patch('app.db.connect_redis', slow(0, DatabaseError("refused"))), \
+                patch('app.db.connect_neo4j', slow(0, DatabaseError("refused"))), \
+                patch('app.db.connect_supabase', connect_supabase), patch('app.db.startup_timer', StartupTimer()):
+            await startup_database_connections()
+
+        connect_supabase.assert_awaited_once()
+
+
+class TestStartupTimer:
+    """Test the phase timing report."""
+
+    def test_report_orders_phases(self):
+        """Should list phases by start, enclosing phases before the ones they contain"""
+        timer = StartupTimer()
+
+        with timer.phase("imports"):
+            time.sleep(0.01)
+        with timer.phase("connections"):
+            with timer.phase("redis"):
+                time.sleep(0.01)
+        timer.mark_ready()
+        report = timer.report()
+
+        assert [phase["name"] for phase in report["phases"]] == ["imports", "connections", "redis"]
+        assert report["phases"][0]["duration_ms"] >= 10
+        assert report["ready_ms"] >= 20
+
+    def test_reports_time_from_fork(self):
+        """Should report how long a forked worker took to become ready"""
+        timer = StartupTimer()
+        timer.mark_forked()
+        time.sleep(0.01)
+        timer.mark_ready()
+
+        assert timer.report()["ready_after_fork_ms"] >= 10
+
+    def test_app_import_defers_client_packages(self):
+        """Should not import the Redis, Neo4j or Supabase clients when importing the app"""
+        code = (
+            "import sys, app.main; "
+            "print(sorted(m for m in ('redis', 'neo4j', 'supabase', 'postgrest') if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+        assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+class TestStartupEndpoint:
+    """Test GET /debug/startup."""
+
+    def test_requires_debug_token(self, test_client, monkeypatch):
+        """Should look like a missing route without the debug token"""
+        monkeypatch.setenv("DEBUG_TOKEN", "debug-secret")
+
+        assert test_client.get("/debug/startup").status_code == 404
+
+    def test_reports_module_phases(self, test_client, monkeypatch):
+        """Should report the import, app and route registration phases"""
+        monkeypatch.setenv("DEBUG_TOKEN", "debug-secret")
+
+        response = test_client.get("/debug/startup", headers={"X-Debug-Token": "debug-secret"})
+
+        assert response.status_code == 200
+        assert {"imports", "app", "routes"} <= {phase["name"] for phase in response.json()["phases"]}
+
+
+def load_gunicorn_config():
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "gunicorn.conf.py")
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestGunicornConfig:
+    """Test the gunicorn hooks."""
+
+    def test_preloads_and_resets_metrics_dir_once(self, tmp_path, monkeypatch):
+        """Should empty the metrics directory on the first read of the config only"""
+        multiproc_dir = tmp_path / "metrics"
+        multiproc_dir.mkdir()
+        (multiproc_dir / "counter_1.db").write_bytes(b"")
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(multiproc_dir))
+        # Unset for the config, restored by monkeypatch after the config sets it
+        monkeypatch.setenv("TUTORWISE_GUNICORN_MASTER", "")
+
+        config = load_gunicorn_config()
+        (multiproc_dir / "counter_2.db").write_bytes(b"")
+        load_gunicorn_config()
+
+        assert config.preload_app is True
+        assert [path.name for path in multiproc_dir.iterdir()] == ["counter_2.db"]
+
+    def test_post_fork_drops_inherited_connections(self, monkeypatch):
+        """Should leave the worker to open its own pools"""
+        monkeypatch.setenv("TUTORWISE_GUNICORN_MASTER", "1")
+        config = load_gunicorn_config()
+        timer = StartupTimer()
+
+        with patch('app.db.redis_client', object()), patch('app.startup.startup_timer', timer):
+            config.post_fork(None, None)
+            assert app.db.redis_client is None
+
+        assert timer.forked_at is not None
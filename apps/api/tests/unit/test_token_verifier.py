@@ -0,0 +1,130 @@
+"""
+Unit tests for local Supabase JWT verification.
+"""
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.token_verifier import (
+    SigningKeyUnavailable,
+    SupabaseJWTVerifier,
+    TokenVerificationError,
+)
+
+SUPABASE_URL = "https://project.supabase.co"
+JWT_SECRET = "super-secret-jwt-token-with-at-least-32-characters"
+
+
+def make_claims(**overrides):
+    claims = {
+        "sub": "user-123",
+        "aud": "authenticated",
+        "iss": f"{SUPABASE_URL}/auth/v1",
+        "exp": int(time.time()) + 3600,
+    }
+    claims.update(overrides)
+    return claims
+
+
+class TestHS256Verification:
+    """Test tokens signed with the project JWT secret."""
+
+    @pytest.mark.asyncio
+    async def test_valid_token(self):
+        """Should return claims for a correctly signed token"""
+        verifier = SupabaseJWTVerifier(SUPABASE_URL, jwt_secret=JWT_SECRET)
+        token = jwt.encode(make_claims(), JWT_SECRET, algorithm="HS256")
+
+        claims = await verifier.verify(token)
+        assert claims["sub"] == "user-123"
+
+    @pytest.mark.asyncio
+    async def test_expired_token(self):
+        """Should reject expired tokens"""
+        verifier = SupabaseJWTVerifier(SUPABASE_URL, jwt_secret=JWT_SECRET)
+        token = jwt.encode(make_claims(exp=int(time.time()) - 10), JWT_SECRET, algorithm="HS256")
+
+        with pytest.raises(TokenVerificationError, match="expired"):
+            await verifier.verify(token)
+
+    @pytest.mark.asyncio
+    async def test_wrong_secret(self):
+        """Should reject tokens signed with another secret"""
+        verifier = SupabaseJWTVerifier(SUPABASE_URL, jwt_secret=JWT_SECRET)
+        token = jwt.encode(make_claims(), "another-secret-with-at-least-32-characters", algorithm="HS256")
+
+        with pytest.raises(TokenVerificationError, match="Invalid token"):
+            await verifier.verify(token)
+
+    @pytest.mark.asyncio
+    async def test_wrong_audience(self):
+        """Should reject tokens issued for another audience"""
+        verifier = SupabaseJWTVerifier(SUPABASE_URL, jwt_secret=JWT_SECRET)
+        token = jwt.encode(make_claims(aud="anon"), JWT_SECRET, algorithm="HS256")
+
+        with pytest.raises(TokenVerificationError):
+            await verifier.verify(token)
+
+    @pytest.mark.asyncio
+    async def test_missing_secret(self):
+        """Should signal that no local key is available"""
+        verifier = SupabaseJWTVerifier(SUPABASE_URL)
+        token = jwt.encode(make_claims(), JWT_SECRET, algorithm="HS256")
+
+        with pytest.raises(SigningKeyUnavailable):
+            await verifier.verify(token)
+
+    @pytest.mark.asyncio
+    async def test_malformed_token(self):
+        """Should reject tokens that are not JWTs"""
+        verifier = SupabaseJWTVerifier(SUPABASE_URL, jwt_secret=JWT_SECRET)
+
+        with pytest.raises(TokenVerificationError, match="Malformed"):
+            await verifier.verify("not-a-jwt")
+
+
+class TestJWKSVerification:
+    """Test tokens signed with asymmetric keys published in the JWKS."""
+
+    @pytest.fixture
+    def signing_key(self):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        public_jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+        public_jwk.update({"kid": "key-1", "alg": "RS256", "use": "sig"})
+        return private_key, {"keys": [public_jwk]}
+
+    @pytest.mark.asyncio
+    async def test_jwks_fetched_once_and_cached(self, signing_key):
+        """Should fetch the JWKS once and reuse it for later tokens"""
+        private_key, jwks = signing_key
+        verifier = SupabaseJWTVerifier(SUPABASE_URL)
+        token = jwt.encode(make_claims(), private_key, algorithm="RS256", headers={"kid": "key-1"})
+
+        mock_response = AsyncMock()
+        mock_response.raise_for_status = lambda: None
+        mock_response.json = lambda: jwks
+        mock_client = AsyncMock()
+        mock_client.get = AsyncMock(return_value=mock_response)
+
+        with patch('app.token_verifier.get_supabase_http_client', return_value=mock_client):
+            assert (await verifier.verify(token))["sub"] == "user-123"
+            assert (await verifier.verify(token))["sub"] == "user-123"
+
+        mock_client.get.assert_awaited_once_with(
+            f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json", headers={}
+        )
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid(self, signing_key):
+        """Should signal a missing key when the kid is not published"""
+        private_key, jwks = signing_key
+        verifier = SupabaseJWTVerifier(SUPABASE_URL)
+        token = jwt.encode(make_claims(), private_key, algorithm="RS256", headers={"kid": "rotated"})
+
+        with patch.object(verifier, 'refresh_jwks', new_callable=AsyncMock):
+            with pytest.raises(SigningKeyUnavailable):
+                await verifier.verify(token)
@@ -80,26 +80,28 @@ class DatabaseTestUtils:
 
     @staticmethod
     def create_mock_redis_client():
-        """Create a mock Redis client."""
+        """Create a mock asyncio Redis client."""
         mock_redis = MagicMock()
-        mock_redis.ping.return_value = True
-        mock_redis.get.return_value = None
-        mock_redis.set.return_value = True
-        mock_redis.delete.return_value = 1
-        mock_redis.exists.return_value = False
-        mock_redis.hget.return_value = None
-        mock_redis.hset.return_value = True
-        mock_redis.expire.return_value = True
+        mock_redis.ping = AsyncMock(return_value=True)
+        mock_redis.get = AsyncMock(return_value=None)
+        mock_redis.set = AsyncMock(return_value=True)
+        mock_redis.setex = AsyncMock(return_value=True)
+        mock_redis.delete = AsyncMock(return_value=1)
+        mock_redis.exists = AsyncMock(return_value=False)
+        mock_redis.hget = AsyncMock(return_value=None)
+        mock_redis.hset = AsyncMock(return_value=True)
+        mock_redis.expire = AsyncMock(return_value=True)
+        mock_redis.aclose = AsyncMock()
         return mock_redis
 
     @staticmethod
     def create_mock_neo4j_driver():
-        """Create a mock Neo4j driver."""
+        """Create a mock async Neo4j driver."""
         mock_driver = MagicMock()
         mock_session = MagicMock()
-        mock_driver.session.return_value.__enter__.return_value = mock_session
-        mock_driver.session.return_value.__exit__.return_value = None
-        mock_driver.verify_connectivity.return_value = None
+        mock_driver.session.return_value.__aenter__.return_value = mock_session
+        mock_driver.verify_connectivity = AsyncMock(return_value=None)
+        mock_driver.close = AsyncMock()
         return mock_driver, mock_session
 
     @staticmethod
@@ -278,4 +280,4 @@ class TestDataFactory:
             "created_at": "2024-01-01T00:00:00Z"
         }
         defaults.update(kwargs)
-        return defaults
\ No newline at end of file
+        return defaults
@@ -0,0 +1,8 @@
+-- Migration 430: onboarding_progress.version for patch-based autosave
+-- The API writes a new version on every save and PATCH /api/onboarding/progress/{role_type}
+-- only applies a delta when the client's version still matches (optimistic concurrency).
+
+ALTER TABLE onboarding_progress
+  ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN onboarding_progress.version IS 'Optimistic concurrency version, replaced by the API on every save';
@@ -0,0 +1,42 @@
+-- Migration 431: version-conditional upsert for buffered onboarding autosaves
+-- With ONBOARDING_WRITE_BEHIND the API buffers save-progress rows in Redis and
+-- flushes them in batches through this function. A buffered row only replaces
+-- the stored one when its version is newer, so a flush that lands after a
+-- later save (or after a flush of a newer row) is a no-op instead of
+-- overwriting newer progress. Versions are the millisecond timestamps the API
+-- assigns on every save (migration 430).
+
+CREATE OR REPLACE FUNCTION public.upsert_onboarding_progress_if_newer(rows JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+  v_written INTEGER;
+BEGIN
+  INSERT INTO onboarding_progress (profile_id, role_type, current_step, step_data, is_complete, updated_at, version)
+  SELECT r.profile_id, r.role_type, r.current_step, COALESCE(r.step_data, '{}'::jsonb), r.is_complete, r.updated_at, r.version
+  FROM jsonb_to_recordset(rows) AS r(
+    profile_id UUID,
+    role_type VARCHAR(20),
+    current_step INT,
+    step_data JSONB,
+    is_complete BOOLEAN,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    version BIGINT
+  )
+  ON CONFLICT (profile_id, role_type) DO UPDATE SET
+    current_step = EXCLUDED.current_step,
+    step_data = EXCLUDED.step_data,
+    is_complete = EXCLUDED.is_complete,
+    updated_at = EXCLUDED.updated_at,
+    version = EXCLUDED.version
+  WHERE onboarding_progress.version < EXCLUDED.version;
+
+  GET DIAGNOSTICS v_written = ROW_COUNT;
+  RETURN v_written;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the API (service role) flushes the buffer
+REVOKE EXECUTE ON FUNCTION public.upsert_onboarding_progress_if_newer(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.upsert_onboarding_progress_if_newer(JSONB) TO service_role;
+
+COMMENT ON FUNCTION public.upsert_onboarding_progress_if_newer(JSONB) IS 'Upsert onboarding_progress rows, skipping any not newer than the stored version; returns rows written';